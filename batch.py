@@ -0,0 +1,230 @@
+"""
+Transposes whole directories of chord text files in parallel, writing the results
+into a mirrored output tree.
+"""
+import fnmatch
+import glob
+import logging
+import os
+import sys
+from multiprocessing import Pool
+from optparse import OptionParser
+
+import chordpro
+import ctransposer
+import diagnostics
+import line_memo
+import parse_cache
+
+# Comma separated file name patterns: plain text and ChordPro songs.
+DEFAULT_PATTERN = ','.join(('*.txt',) + tuple('*' + extension for extension in chordpro.CHORDPRO_EXTENSIONS))
+DEFAULT_CHUNK_SIZE = 16
+DEFAULT_LINE_MEMO_MB = 16
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+
+GLOB_CHARS = ('*', '?', '[')
+
+# Parse caches opened by this (worker) process, by database path.
+_parse_caches = {}
+
+
+def _glob_root(pattern):
+    """Returns the directory part of a glob pattern before the first wildcard."""
+    root_parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if any(char in part for char in GLOB_CHARS):
+            break
+        root_parts.append(part)
+    return os.sep.join(root_parts) or os.curdir
+
+
+def find_song_files(sources, pattern=DEFAULT_PATTERN):
+    """
+    Expands directories (searched recursively for files matching any of the comma separated
+    patterns in pattern), glob patterns and plain file names into a list of (root, path) pairs,
+    where root is the directory that the output tree mirrors.
+    """
+    song_files = []
+    patterns = pattern.split(',')
+    for source in sources:
+        if os.path.isdir(source):
+            for dir_path, dir_names, file_names in os.walk(source):
+                dir_names.sort()
+                for file_name in sorted(name for name in file_names
+                                        if any(fnmatch.fnmatch(name, name_pattern) for name_pattern in patterns)):
+                    song_files.append((source, os.path.join(dir_path, file_name)))
+        elif any(char in source for char in GLOB_CHARS):
+            root = _glob_root(source)
+            for path in sorted(glob.glob(source, recursive=True)):
+                if not os.path.isdir(path):
+                    song_files.append((root, path))
+        else:
+            song_files.append((os.path.dirname(source) or os.curdir, source))
+    return song_files
+
+
+def _get_parse_cache(cache_path):
+    """Returns this process's connection to the parse cache at cache_path."""
+    if cache_path not in _parse_caches:
+        _parse_caches[cache_path] = parse_cache.ParseCache(cache_path)
+    return _parse_caches[cache_path]
+
+
+def _close_parse_cache(cache_path):
+    """Closes this process's connection to the parse cache at cache_path, if it has one."""
+    cache = _parse_caches.pop(cache_path, None)
+    if cache is not None:
+        cache.close()
+
+
+def transpose_file(job, collector=None):
+    """
+    Transposes a single file. job is a tuple of (path, output_path, semitones, auto, cache_path) so that
+    it can be sent to a worker process. cache_path is the parse cache to use, or None.
+    Invalid chords are recorded into collector (a diagnostics.Diagnostics) if given, otherwise reported
+    for the file.
+    Returns (path, status, message) where message is the output path or the error.
+    """
+    path, output_path, semitones, auto, cache_path = job
+    try:
+        with open(path, mode='r') as song_file:
+            song_lines = song_file.readlines()
+        if chordpro.is_chordpro_file(path):
+            transposed_song = ctransposer.transpose_song(song_lines, semitones, auto, True)
+        else:
+            if cache_path:
+                song_chords = _get_parse_cache(cache_path).get_song_chords(path, song_lines, collector)
+            else:
+                song_chords = ctransposer.get_chords_from_song(song_lines, collector, path)
+            transposed_song = ctransposer.transpose_song_chords(song_lines, song_chords, semitones, auto)
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(output_path, mode='w') as tran_file:
+            tran_file.writelines(transposed_song)
+    except Exception as err:
+        logging.warning("Failed to transpose %s: %s", path, err)
+        return path, STATUS_ERROR, "{}: {}".format(type(err).__name__, err)
+    return path, STATUS_OK, output_path
+
+
+def _transpose_job(job):
+    """
+    Returns (transpose_file(job), cache updates, diagnostics) where the updates are the changes to the
+    parse cache made by this process for the file (see ParseCache.take_updates), or None if no cache is
+    used, and diagnostics has the file's invalid chords.
+    """
+    file_diagnostics = diagnostics.Diagnostics()
+    result = transpose_file(job, file_diagnostics)
+    cache_path = job[4]
+    return result, _get_parse_cache(cache_path).take_updates() if cache_path else None, file_diagnostics
+
+
+def _write_cache_updates(cache_path, job_results):
+    """Writes the parse cache changes from _transpose_job() results in one transaction."""
+    with parse_cache.ParseCache(cache_path) as cache:
+        for result, updates, file_diagnostics in job_results:
+            cache.add_updates(updates)
+
+
+def transpose_files(sources, output_dir, semitones=0, auto=False, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    pattern=DEFAULT_PATTERN, cache_path=None, line_memo_bytes=None):
+    """
+    Transposes every song file found in sources (see find_song_files) across a pool of worker processes.
+    :param sources: Directories, glob patterns or file names.
+    :param output_dir: Root of the mirrored output tree.
+    :param semitones: Positive/negative semitones by which to transpose each song.
+    :param auto: Transpose each song to its easiest key instead, using get_lowest_difficulty().
+    :param workers: Number of worker processes. Default (None) uses one per CPU, 1 runs in this process.
+    :param chunk_size: Number of files sent to a worker at a time.
+    :param pattern: Comma separated file name patterns used when searching directories.
+    :param cache_path: SQLite parse cache (see parse_cache.py) used to skip re-parsing unchanged files.
+    :param line_memo_bytes: Memory cap of a line memo (see line_memo.py) shared by the songs parsed in each
+        process. Default (None) uses the memo only if this process has already enabled one.
+    :return: list of (path, status, message) in the order the files were found.
+    """
+    jobs = []
+    for root, path in find_song_files(sources, pattern):
+        output_path = os.path.join(output_dir, os.path.relpath(path, root))
+        jobs.append((path, output_path, semitones, auto, cache_path))
+
+    # Workers only read the parse cache, returning their changes to be written here once for the whole run.
+    if workers == 1:
+        enable_memo = line_memo_bytes and line_memo.get_memo() is None
+        if enable_memo:
+            line_memo.enable(line_memo_bytes)
+        try:
+            job_results = [_transpose_job(job) for job in jobs]
+        finally:
+            if enable_memo:
+                line_memo.disable()
+            if cache_path:
+                _close_parse_cache(cache_path)
+    else:
+        if line_memo_bytes:
+            pool = Pool(processes=workers, initializer=line_memo.enable, initargs=(line_memo_bytes,))
+        else:
+            pool = Pool(processes=workers)
+        with pool:
+            job_results = pool.map(_transpose_job, jobs, chunksize=chunk_size)
+    if cache_path:
+        _write_cache_updates(cache_path, job_results)
+    batch_diagnostics = diagnostics.Diagnostics()
+    for result, updates, file_diagnostics in job_results:
+        batch_diagnostics.merge(file_diagnostics)
+    batch_diagnostics.report('batch')
+    return [result for result, updates, file_diagnostics in job_results]
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options and sources. """
+    ops = OptionParser(usage="batch.py [options] DIRECTORY|GLOB|FILE ...")
+    ops.add_option("--output", "-o", action="store", dest="output_dir", default="",
+                   help="Directory in which to write the mirrored output tree.")
+    ops.add_option("--semitones", "-s", action="store",
+                   dest="semitones", default=0, type="int",
+                   help="Positive/negative semitones by which to transpose the songs. "
+                        "Defaults to '%default', unless --auto specified.")
+    ops.add_option("--auto", "-a", action="store_true", dest="auto", default=False,
+                   help="Transpose each song to a key which is easy to play using open chords.")
+    ops.add_option("--workers", "-w", action="store", dest="workers", default=None, type="int",
+                   help="Number of worker processes. Defaults to one per CPU.")
+    ops.add_option("--chunk-size", "-c", action="store", dest="chunk_size", default=DEFAULT_CHUNK_SIZE,
+                   type="int", help="Files sent to each worker at a time. Defaults to '%default'.")
+    ops.add_option("--cache", action="store", dest="cache_path", default=None,
+                   help="SQLite file caching parsed songs between runs.")
+    ops.add_option("--line-memo-mb", action="store", dest="line_memo_mb", default=DEFAULT_LINE_MEMO_MB,
+                   type="int", help="Memory cap in MB of each process's memo of parsed lines, shared "
+                                    "across songs. 0 disables it. Defaults to '%default'.")
+    ops.add_option("--pattern", "-p", action="store", dest="pattern", default=DEFAULT_PATTERN,
+                   help="Comma separated file name patterns used when searching directories. Defaults to '%default'.")
+
+    options, sources = ops.parse_args()
+
+    if not sources or options.output_dir == '':
+        logging.error("Sources and --output must be specified - nothing to do!")
+        sys.exit(1)
+
+    return options, sources
+
+
+def main():
+    """
+    Batch entry point: transposes everything and exits with an error if any file failed.
+    """
+    options, sources = handle_options()
+    results = transpose_files(sources, options.output_dir, options.semitones, options.auto,
+                              options.workers, options.chunk_size, options.pattern, options.cache_path,
+                              options.line_memo_mb * 1024 * 1024)
+    errors = [(path, message) for path, status, message in results if status == STATUS_ERROR]
+    for path, message in errors:
+        print("{}: {}".format(path, message), file=sys.stderr)
+    print("Transposed {} of {} files.".format(len(results) - len(errors), len(results)))
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmarks the main parsing and transposition stages on synthetic songs of several sizes.
+Results are written as JSON and can be compared against a stored baseline, failing if any
+benchmark has regressed by more than the tolerance.
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import timeit
+from optparse import OptionParser
+
+import chord
+import ctransposer
+import parse_cache
+import ranking
+import songgen
+
+DEFAULT_SIZES = [20, 200, 2000]
+DEFAULT_BASELINE = 'bench_baseline.json'
+DEFAULT_TOLERANCE = 1.5
+BENCH_SEED = 42
+# Lines in each song of the catalogues ranked by the ranking benchmarks.
+RANKING_SONG_LINES = 60
+
+
+def _get_benchmarks(song):
+    """
+    Returns a list of (name, function) pairs, each running one stage over the whole song as
+    get_chords_from_song() and the transposition functions do.
+    """
+    chord_texts = [chord_text for line in song for chord_text, col in ctransposer.tokenize_chord_line(line)[1]]
+
+    def run_tokenize_chord_line():
+        for line in song:
+            ctransposer.tokenize_chord_line(line)
+
+    def run_intern_chord():
+        for chord_text in chord_texts:
+            chord.intern_chord(chord_text)
+
+    def run_parse_chord_line():
+        for line in song:
+            ctransposer.parse_chord_line(line)
+
+    return [('tokenize_chord_line', run_tokenize_chord_line),
+            ('intern_chord', run_intern_chord),
+            ('parse_chord_line', run_parse_chord_line),
+            ('transpose_song_lines', lambda: ctransposer.transpose_song_lines(song, 3)),
+            ('get_lowest_difficulty', lambda: ctransposer.get_lowest_difficulty(song))]
+
+
+def _get_ranking_benchmarks(size):
+    """
+    Returns a list of (name, function) pairs ranking a catalogue of size songs with each backend of
+    ranking.best_offsets(), the NumPy one only if it is installed.
+    """
+    catalogue = [ctransposer.get_chords_from_song(songgen.generate_song(BENCH_SEED + song_no, RANKING_SONG_LINES))
+                 for song_no in range(size)]
+    benchmarks = [('rank_python', lambda: ranking.best_offsets(catalogue, use_numpy=False))]
+    if ranking.numpy is not None:
+        benchmarks.append(('rank_numpy', lambda: ranking.best_offsets(catalogue, use_numpy=True)))
+    return benchmarks
+
+
+def _get_cache_benchmarks(song, cache):
+    """
+    Returns a list of (name, function) pairs getting the chords of the song, saved to a file next to the
+    parse cache, by parsing it and from the (warm) cache.
+    """
+    path = os.path.join(os.path.dirname(cache.db_path), 'song.txt')
+    with open(path, mode='w') as song_file:
+        song_file.writelines(song)
+    cache.get_song_chords(path, song)
+    cache.flush()
+    return [('parse_no_cache', lambda: ctransposer.get_chords_from_song(song)),
+            ('parse_cache_hit', lambda: cache.get_song_chords(path, song))]
+
+
+def run_benchmarks(sizes=None, repeat=3, min_time=0.05):
+    """
+    Times each benchmark at each song size (in lines, or in songs for the ranking benchmarks),
+    returning a dictionary of "name@size" to the best time in seconds for a single run.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            parse_cache.ParseCache(os.path.join(temp_dir, 'cache.db')) as cache:
+        for size in sizes or DEFAULT_SIZES:
+            song = songgen.generate_song(BENCH_SEED, lines=size)
+            for name, func in _get_benchmarks(song) + _get_ranking_benchmarks(size) + \
+                    _get_cache_benchmarks(song, cache):
+                timer = timeit.Timer(func)
+                number, _ = _autorange(timer, min_time)
+                results["{}@{}".format(name, size)] = min(timer.repeat(repeat=repeat, number=number)) / number
+    return results
+
+
+def _autorange(timer, min_time):
+    """Returns (number, time taken) for the smallest power of ten of runs taking at least min_time."""
+    number = 1
+    while True:
+        time_taken = timer.timeit(number)
+        if time_taken >= min_time:
+            return number, time_taken
+        number *= 10
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns a list of (name, baseline time, new time) for every benchmark which is more than
+    tolerance times slower than the baseline. Benchmarks missing from either are ignored here
+    (see get_missing_baselines).
+    """
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        if name in baseline and seconds > baseline[name] * tolerance:
+            regressions.append((name, baseline[name], seconds))
+    return regressions
+
+
+def get_missing_baselines(results, baseline):
+    """Returns the sorted names of the benchmarks in results which have no baseline time."""
+    return sorted(name for name in results if name not in baseline)
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options. """
+    ops = OptionParser(usage="bench.py [options]")
+    ops.add_option("--sizes", action="store", dest="sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                   help="Comma separated song sizes in lines. Defaults to '%default'.")
+    ops.add_option("--output", "-o", action="store", dest="output", default="",
+                   help="File to write JSON results to. Defaults to stdout.")
+    ops.add_option("--baseline", "-b", action="store", dest="baseline", default=DEFAULT_BASELINE,
+                   help="Baseline JSON file to compare against. Defaults to '%default'.")
+    ops.add_option("--save-baseline", action="store_true", dest="save_baseline", default=False,
+                   help="Overwrite the baseline with these results instead of comparing.")
+    ops.add_option("--tolerance", "-t", action="store", dest="tolerance", default=DEFAULT_TOLERANCE, type="float",
+                   help="Fail if any benchmark is this many times slower than the baseline. "
+                        "Defaults to '%default'.")
+
+    options, _ = ops.parse_args()
+    return options
+
+
+def main():
+    """
+    Runs the benchmarks, writes the results and exits with an error on any regression.
+    """
+    # Invalid chords in the synthetic songs would otherwise flood the output.
+    logging.disable(logging.WARNING)
+    options = handle_options()
+    results = run_benchmarks([int(size) for size in options.sizes.split(',')])
+    results_json = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, mode='w') as output_file:
+            output_file.write(results_json + '\n')
+    else:
+        print(results_json)
+
+    if options.save_baseline:
+        with open(options.baseline, mode='w') as baseline_file:
+            baseline_file.write(results_json + '\n')
+        return
+
+    try:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    except FileNotFoundError:
+        print("No baseline found at {} - run with --save-baseline to create it.".format(options.baseline),
+              file=sys.stderr)
+        sys.exit(1)
+
+    regressions = compare_with_baseline(results, baseline, options.tolerance)
+    for name, baseline_seconds, seconds in regressions:
+        print("REGRESSION: {} took {:.6f}s, baseline {:.6f}s ({:.1f}x)".format(
+            name, seconds, baseline_seconds, seconds / baseline_seconds), file=sys.stderr)
+    missing = get_missing_baselines(results, baseline)
+    for name in missing:
+        print("MISSING BASELINE: {} - run with --save-baseline to add it.".format(name), file=sys.stderr)
+    if regressions or missing:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Joint capo and key search. For each sounding key (semitones from the original) and capo fret,
+the chord shapes actually played are scored from precomputed shape difficulty tables covering
+7ths, sus, add9 and slash chords as well as plain major and minor chords.
+"""
+import json
+import logging
+import sys
+from optparse import OptionParser
+
+import chord
+import chordpro
+import ctransposer
+
+MAX_CAPO = 7
+# Sounding keys searched by default, as semitones from the original: only the original key, so that the
+# search chooses a capo and shapes for the song as written.
+DEFAULT_SOUNDING_SEMITONES = (0,)
+
+# Subjective difficulty of each chord shape (0=Easy, 5=Hard) by quality (the suffix, without any
+# sub-chord) and root, for qualities beyond the major and minor shapes scored by chord.CHORD_DIFFICULTY.
+# Roots which aren't listed are usually barre shapes.
+QUALITY_DIFFICULTY = {'7': {'A': 0, 'B': 1, 'C': 1, 'D': 0, 'E': 0, 'F': 3, 'G': 0},
+                      'm7': {'A': 0, 'B': 2, 'D': 1, 'E': 0, 'F#': 3},
+                      'maj7': {'A': 1, 'C': 0, 'D': 1, 'E': 1, 'F': 1, 'G': 2},
+                      'sus2': {'A': 0, 'C': 2, 'D': 0, 'E': 1, 'G': 2},
+                      'sus4': {'A': 0, 'C': 2, 'D': 0, 'E': 0, 'G': 1},
+                      'add9': {'A': 1, 'C': 0, 'D': 1, 'E': 1, 'G': 1}}
+# Difficulty of roots missing from QUALITY_DIFFICULTY, and of qualities missing altogether.
+BARRE_DIFFICULTY = 4
+UNKNOWN_QUALITY_DIFFICULTY = 3
+# Bass notes on open strings are easy to add to a shape (eg: G/B, C/G), others usually aren't (eg: D/F#).
+OPEN_BASS_NOTES = ('E', 'A', 'D', 'G', 'B')
+SLASH_DIFFICULTY = 1
+
+
+def _build_shape_table():
+    """
+    Returns {quality: (difficulty by index 0-12)}, where index 0 (invalid) is unused.
+    Major and minor shapes (chord.DIFFICULTY_SUFFIXES) are scored as chord.get_difficulty() scores them,
+    so that the capo search and --auto agree on what is easy. In QUALITY_DIFFICULTY, roots without a
+    difficulty of their own use BARRE_DIFFICULTY.
+    """
+    table = {quality: tuple(by_index[0] for by_index in chord.DIFFICULTY_TABLES[quality])
+             for quality in chord.DIFFICULTY_SUFFIXES}
+    for quality, difficulties in QUALITY_DIFFICULTY.items():
+        row = [BARRE_DIFFICULTY] * (chord.ST_IN_OCTAVE + 1)
+        for root, difficulty in difficulties.items():
+            row[chord.CHORD_MAP[root]] = difficulty
+        table[quality] = tuple(row)
+    return table
+
+
+SHAPE_TABLE = _build_shape_table()
+OPEN_BASS_INDEXES = frozenset(chord.CHORD_MAP[note] for note in OPEN_BASS_NOTES)
+
+
+def get_quality(chord_obj):
+    """Returns the chord's suffixes without any sub-chord, eg: 'm7' for Am7/G."""
+    return chord_obj.get_suffixes().split(chord.DEFAULT_SUB_SEP)[0]
+
+
+def get_shape_difficulty(index, quality, sub_index=0):
+    """
+    Returns the difficulty of playing the shape with the given root index (1-12), quality and optional
+    sub-chord root index, falling back to a major or minor shape for qualities which aren't in the tables.
+    """
+    row = SHAPE_TABLE.get(quality)
+    if row is not None:
+        difficulty = row[index]
+    elif quality.startswith('m') and not quality.startswith('maj'):
+        difficulty = max(SHAPE_TABLE['m'][index], UNKNOWN_QUALITY_DIFFICULTY)
+    else:
+        difficulty = max(SHAPE_TABLE[''][index], UNKNOWN_QUALITY_DIFFICULTY)
+    if sub_index and sub_index not in OPEN_BASS_INDEXES:
+        difficulty += SLASH_DIFFICULTY
+    return difficulty
+
+
+def get_shape_counts(chords_dict):
+    """
+    Counts the distinct valid chords in a dictionary structure from get_chords_from_song().
+    Returns a dictionary indexed by (index, quality, sub_index) with counts as values; sub_index is 0
+    for chords without a sub-chord.
+    """
+    counts = {}
+    for line_no, chord_list in chords_dict.items():
+        for chord_obj, col in chord_list:
+            if type(chord_obj) in ctransposer.CHORD_TYPES and chord_obj.is_valid():
+                chord_obj = chord.intern_chord(chord_obj.get_chord_text())
+                sub_chord = chord_obj.get_sub_chord()
+                sub_index = sub_chord.get_index() if sub_chord else 0
+                key = (chord_obj.get_index(), get_quality(chord_obj), sub_index)
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _transpose_index(index, semitones):
+    """Returns the index (1-12) transposed by the semitones, or 0 for 0 (no sub-chord)."""
+    if index == 0:
+        return 0
+    return ((index + semitones - 1) % chord.ST_IN_OCTAVE) + 1
+
+
+def get_shape_vector(shape_counts):
+    """Returns the total shape difficulty of the song when its shapes are transposed by 0 to 11 semitones."""
+    vector = [0] * chord.ST_IN_OCTAVE
+    for (index, quality, sub_index), count in shape_counts.items():
+        for semitones in range(chord.ST_IN_OCTAVE):
+            vector[semitones] += count * get_shape_difficulty(_transpose_index(index, semitones), quality,
+                                                              _transpose_index(sub_index, semitones))
+    return vector
+
+
+def find_capo_and_key(chords_dict, sounding_semitones=DEFAULT_SOUNDING_SEMITONES, capos=range(MAX_CAPO + 1),
+                      capo_penalty=0):
+    """
+    Finds the easiest (capo fret, sounding key) pair for a song. The song's shapes are scored once for
+    each of the 12 transpositions, so each pair is a single lookup.
+    :param chords_dict: Dictionary structure from get_chords_from_song().
+    :param sounding_semitones: Keys to consider, as semitones from the original. Default keeps the original.
+    :param capos: Capo frets to consider.
+    :param capo_penalty: Added to the score for each fret the capo is up the neck.
+    :return: dictionary with the capo, sounding_semitones, shape_semitones (the transposition of the
+        chords to play), score, breakdown of the score and shapes: [[shape text, count, difficulty], ...].
+        None if there is nothing to search.
+    """
+    shape_counts = get_shape_counts(chords_dict)
+    shape_vector = get_shape_vector(shape_counts)
+    best = None
+    for sounding in sounding_semitones:
+        for capo in capos:
+            shape_semitones = sounding - capo
+            score = shape_vector[shape_semitones % chord.ST_IN_OCTAVE] + capo * capo_penalty
+            if best is None or score < best[0]:
+                best = (score, capo, sounding, shape_semitones)
+    if best is None:
+        return None
+
+    score, capo, sounding, shape_semitones = best
+    shapes = []
+    for (index, quality, sub_index), count in sorted(shape_counts.items()):
+        shape = chord.intern_chord_parts(index, quality,
+                                         chord.intern_chord_parts(sub_index, '') if sub_index else None)
+        shape = shape.transpose(shape_semitones)
+        sub_chord = shape.get_sub_chord()
+        difficulty = get_shape_difficulty(shape.get_index(), quality, sub_chord.get_index() if sub_chord else 0)
+        shapes.append([shape.get_chord_text(), count, difficulty])
+    return {'capo': capo,
+            'sounding_semitones': sounding,
+            'shape_semitones': shape_semitones,
+            'score': score,
+            'breakdown': {'shapes': score - capo * capo_penalty, 'capo': capo * capo_penalty},
+            'shapes': shapes}
+
+
+def get_written_capo(directives):
+    """Returns the capo fret from a ChordPro song's {capo:} directive (see chordpro.read_directives), or 0."""
+    capo_fret = directives.get('capo', 0)
+    return capo_fret if isinstance(capo_fret, int) else 0
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options. """
+    ops = OptionParser(usage="capo.py [options]")
+    ops.add_option("--file", "-f", action="store", dest="filename", default="",
+                   help="Text file containing *single* song.")
+    ops.add_option("--down", "-d", action="store", dest="semitones_down", default=0, type="int",
+                   help="Semitones the song may be moved down. Defaults to '%default'.")
+    ops.add_option("--up", "-u", action="store", dest="semitones_up", default=0, type="int",
+                   help="Semitones the song may be moved up. Defaults to '%default'.")
+    ops.add_option("--max-capo", action="store", dest="max_capo", default=MAX_CAPO, type="int",
+                   help="Highest capo fret to use. Defaults to '%default'.")
+    ops.add_option("--capo-penalty", "-p", action="store", dest="capo_penalty", default=0, type="int",
+                   help="Difficulty added for each fret the capo is up the neck. Defaults to '%default'.")
+
+    options, _ = ops.parse_args()
+
+    if options.filename == '':
+        logging.error("No file specified - nothing to do!")
+        sys.exit(1)
+
+    return options
+
+
+def main():
+    """
+    Capo entry point: prints the easiest capo fret, sounding key and chord shapes for a song as JSON.
+    """
+    options = handle_options()
+    with open(options.filename, mode='r') as song_file:
+        song = song_file.readlines()
+    written_capo = 0
+    if chordpro.is_chordpro_file(options.filename):
+        chords_dict = chordpro.get_chords_from_chordpro(song)
+        written_capo = get_written_capo(chordpro.read_directives(song))
+    else:
+        chords_dict = ctransposer.get_chords_from_song(song)
+    # The song sounds written_capo semitones above its chords, so its sounding keys are moved up to match.
+    sounding = range(written_capo - options.semitones_down, written_capo + options.semitones_up + 1)
+    result = find_capo_and_key(chords_dict, sounding, range(options.max_capo + 1), options.capo_penalty)
+    if result is None:
+        logging.error("No capo and key choices to search.")
+        sys.exit(1)
+    result['written_capo'] = written_capo
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,13 @@
 Module containing chord class and related constants.
 """
 import logging
+from functools import lru_cache
 
 ST_IN_OCTAVE = 12
 
+# Maximum number of distinct chords kept by the interning caches below.
+CHORD_CACHE_SIZE = 4096
+
 DEFAULT_CHORD_ROOTS = ['A', 'A#', 'B', 'C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#']
 ILLEGAL_CHORD_NAMES = ['Chorus', 'Bridge', 'Capo']
 
@@ -67,6 +71,16 @@ CHORD_DIFFICULTY = {'A': 1,
                     'G#': 5,
                     'Ab': 5}
 
+VALID_LETTERS = frozenset(name[0] for name in CHORD_MAP)
+ACCIDENTALS = ('#', 'b')
+
+# Spelling tables give, for each chord index (1-12, 0 is unused), which of its SCALE_MAP names to write:
+# SHARP or FLAT. The choice for a chord's root is also used for its sub-chord.
+SHARP = 0
+FLAT = 1
+SHARP_SPELLING = (SHARP,) * (ST_IN_OCTAVE + 1)
+FLAT_SPELLING = (SHARP,) + (FLAT,) * ST_IN_OCTAVE
+
 
 class Chord(object):
     """
@@ -86,7 +100,7 @@ class Chord(object):
         elif len(args) == 2 and type(args[0] == int):
             self._setup_with_index(args[0], args[1])
         else:
-            logging.warning("Invalid chord parameters: {}".format(args))
+            logging.warning("Invalid chord parameters: %s", args)
 
     def __str__(self):
         """Returns the string used when class instance is printed"""
@@ -118,7 +132,7 @@ class Chord(object):
         which are not checked.
         """
         if index not in SCALE_MAP:
-            logging.warning("Invalid index: {}".format(index))
+            logging.warning("Invalid index: %s", index)
         else:
             self.__index = index
             self.__sharp_name = SCALE_MAP[index][0]
@@ -142,7 +156,7 @@ class Chord(object):
             self.__index = CHORD_MAP[self.__flat_name]
             self._setup_with_index(self.__index, self.__suffixes)
         else:
-            logging.warning("Invalid chord: '{}'".format(chord_text))
+            logging.warning("Invalid chord: '%s'", chord_text)
 
     def _populate_names_and_suffixes(self, chord_text):
         """
@@ -152,15 +166,14 @@ class Chord(object):
         suffixes.
         """
         # Check it starts with a valid letter
-        valid_letters = set([a[0] for a in CHORD_MAP.keys()])
-        if not chord_text[0].upper() in valid_letters:
-            logging.warning("Invalid chord: '{}'".format(chord_text))
+        if not chord_text[0].upper() in VALID_LETTERS:
+            logging.warning("Invalid chord: '%s'", chord_text)
         else:
             # Start name with first letter of chord text in upper case.
             name = chord_text[0].upper()
             suffs = ''
             for char in chord_text[1:]:
-                if char in ['#', 'b']:
+                if char in ACCIDENTALS:
                     name = chord_text[:2]
                 else:
                     suffs = suffs + char
@@ -194,6 +207,22 @@ class Chord(object):
         """Returns the chord's root flat name, or an empty string."""
         return self.__flat_name + self.get_suffixes()
 
+    def get_spelled_text(self, spelling):
+        """
+        Returns the chord text using the sharp or flat name given by the spelling table (eg: FLAT_SPELLING)
+        for the chord's index, with any sub-chord spelled the same way.
+        """
+        if spelling[self.__index] != FLAT:
+            return self.get_chord_text()
+        if self.__sub_chord:
+            return (self.__flat_name + self.__suffixes + DEFAULT_SUB_SEP +
+                    self.__sub_chord.get_spelled_text(FLAT_SPELLING))
+        return self.__flat_name + self.__suffixes
+
+    def get_index(self):
+        """Returns the chord's semitone index within the octave (1-12), or 0 if invalid."""
+        return self.__index
+
     def get_suffixes(self):
         """Returns the chord's suffixes (and sub-chord), or an empty string."""
         if self.__sub_chord:
@@ -227,13 +256,247 @@ class Chord(object):
             return CHORD_DIFFICULTY[self.get_chord_text()]
         elif self.__sharp_name in CHORD_DIFFICULTY:
             return CHORD_DIFFICULTY[self.__sharp_name]
-        elif self.__sharp_name[0] in CHORD_DIFFICULTY:
+        elif self.__sharp_name and self.__sharp_name[0] in CHORD_DIFFICULTY:
             return CHORD_DIFFICULTY[self.__sharp_name[0]]
         else:
-            logging.ERROR("Could not match difficulty from chord text '{}', defaulting to 3"
-                          .format(self.get_chord_text()))
+            logging.error("Could not match difficulty from chord text '%s', defaulting to 3",
+                          self.get_chord_text())
             return 3
 
 
+class FrozenChord(object):
+    """
+    Immutable chord value, shared between all occurrences of the same chord.
+    Instances should be created with intern_chord() or intern_chord_parts() rather than directly.
+    Provides the same getters as Chord, but transpose() returns another (interned) FrozenChord.
+    """
+    __slots__ = ('_index', '_suffixes', '_sub_chord', '_text', '_texts')
+
+    def __init__(self, index, suffixes, sub_chord, text, flat_text=None):
+        object.__setattr__(self, '_index', index)
+        object.__setattr__(self, '_suffixes', suffixes)
+        object.__setattr__(self, '_sub_chord', sub_chord)
+        object.__setattr__(self, '_text', text)
+        # Text by spelling (SHARP or FLAT), so that spelled lookups don't build strings.
+        object.__setattr__(self, '_texts', (text, flat_text or text))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenChord is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FrozenChord is immutable")
+
+    def __str__(self):
+        """Returns the string used when class instance is printed"""
+        return "Chord object %s" % self._text
+
+    def __repr__(self):
+        """Returns the string used when class instance is output"""
+        return "Chord object: %s" % self._text
+
+    def is_valid(self):
+        """Returns true if the chord appears to be valid."""
+        return self._index != 0
+
+    def get_index(self):
+        """Returns the chord's semitone index within the octave (1-12), or 0 if invalid."""
+        return self._index
+
+    def get_chord_text(self):
+        """
+        Returns a string representing the chord, including all suffixes
+        and any sub-chord.
+        This is the sharp name by default, or the original text if the chord is invalid.
+        """
+        return self._text
+
+    def get_sharp_name(self):
+        """Returns the chord's root sharp name, or an empty string."""
+        return self._text
+
+    def get_flat_name(self):
+        """Returns the chord's root flat name, or an empty string."""
+        if not self.is_valid():
+            return self._text
+        return SCALE_MAP[self._index][-1] + self.get_suffixes()
+
+    def get_spelled_text(self, spelling):
+        """
+        Returns the chord text using the sharp or flat name given by the spelling table (eg: FLAT_SPELLING)
+        for the chord's index, with any sub-chord spelled the same way. Both texts are built when the
+        chord is interned, so this is a table lookup.
+        """
+        return self._texts[spelling[self._index]]
+
+    def get_suffixes(self):
+        """Returns the chord's suffixes (and sub-chord), or an empty string."""
+        if self._sub_chord:
+            return self._suffixes + DEFAULT_SUB_SEP + self._sub_chord.get_chord_text()
+        return self._suffixes
+
+    def get_sub_chord(self):
+        """Returns the sub-chord (eg: the B of C/B) as a FrozenChord, or None."""
+        return self._sub_chord
+
+    def transpose(self, semitones):
+        """
+        Returns the interned chord transposed up or down the specified number of semitones,
+        including any sub-chord. Invalid chords are returned unchanged.
+        """
+        if not self.is_valid():
+            return self
+        sub_chord = self._sub_chord.transpose(semitones) if self._sub_chord else None
+        # Offset of 1 prevents zero result, as in Chord.transpose().
+        return intern_chord_parts(((self._index + semitones - 1) % ST_IN_OCTAVE) + 1,
+                                  self._suffixes, sub_chord)
+
+    def get_difficulty(self):
+        """
+        Returns an int 0-5 representing how hard the chord is to play, matching Chord.get_difficulty().
+        Invalid chords default to 3.
+        :return: int 0-5
+        """
+        if self._text in CHORD_DIFFICULTY:
+            return CHORD_DIFFICULTY[self._text]
+        if self.is_valid():
+            return CHORD_DIFFICULTY[SCALE_MAP[self._index][0]]
+        return 3
+
+
+def _split_chord_text(chord_text):
+    """
+    Splits chord text without any sub-chord into (index, suffixes) using the same rules as
+    Chord._populate_names_and_suffixes. The index is 0 if the root is not recognised.
+    """
+    if not chord_text or chord_text[0].upper() not in VALID_LETTERS:
+        return 0, ''
+    name = chord_text[0].upper()
+    suffixes = ''
+    for char in chord_text[1:]:
+        if char in ACCIDENTALS:
+            name = chord_text[:2]
+        else:
+            suffixes = suffixes + char
+    return CHORD_MAP.get(name, 0), suffixes
+
+
+def intern_chord_parts(index, suffixes, sub_chord=None):
+    """
+    Returns the shared FrozenChord with the given index (1-12), suffixes and optional FrozenChord sub-chord.
+    """
+    # Always pass every argument, as lru_cache keys calls with and without defaults separately.
+    return _intern_chord_parts(index, suffixes, sub_chord)
+
+
+@lru_cache(maxsize=CHORD_CACHE_SIZE)
+def _intern_chord_parts(index, suffixes, sub_chord):
+    """Builds the FrozenChord for intern_chord_parts()."""
+    if index not in SCALE_MAP:
+        raise ValueError("Invalid index: {}".format(index))
+    text = SCALE_MAP[index][0] + suffixes
+    flat_text = SCALE_MAP[index][-1] + suffixes
+    if sub_chord:
+        text += DEFAULT_SUB_SEP + sub_chord.get_chord_text()
+        flat_text += DEFAULT_SUB_SEP + sub_chord.get_spelled_text(FLAT_SPELLING)
+    return FrozenChord(index, suffixes, sub_chord, text, flat_text)
+
+
+@lru_cache(maxsize=CHORD_CACHE_SIZE)
+def intern_chord(chord_text):
+    """
+    Returns the shared FrozenChord for chord_text, parsing it only the first time it is seen.
+    Unlike Chord, a sub-chord is split off before the root, so sub-chords may have sharps or flats (eg: D/F#).
+    """
+    chord_text = chord_text.strip()
+    sub_chord = None
+    main_text = chord_text
+    for sep in SUBCHORD_SEPS:
+        if sep in main_text:
+            main_text, sub_text = main_text.split(sep, 1)
+            sub_chord = intern_chord(sub_text)
+            break
+
+    index, suffixes = _split_chord_text(main_text)
+    if index == 0:
+        return FrozenChord(0, '', None, chord_text)
+    return intern_chord_parts(index, suffixes, sub_chord)
+
+
+def _build_transpose_table():
+    """Returns TRANSPOSE_TABLE: the index (1-12) reached from each index by 0-11 semitones, with 0 kept as 0."""
+    return tuple(tuple(((index + semitones - 1) % ST_IN_OCTAVE) + 1 if index else 0
+                       for semitones in range(ST_IN_OCTAVE))
+                 for index in range(ST_IN_OCTAVE + 1))
+
+
+TRANSPOSE_TABLE = _build_transpose_table()
+# Root names by spelling (SHARP or FLAT) and index, with '' for index 0.
+ROOT_NAMES = (('',) + tuple(SCALE_MAP[index][0] for index in range(1, ST_IN_OCTAVE + 1)),
+              ('',) + tuple(SCALE_MAP[index][-1] for index in range(1, ST_IN_OCTAVE + 1)))
+# Suffixes with difficulties of their own in CHORD_DIFFICULTY (eg: Am), others use the root's.
+DIFFICULTY_SUFFIXES = tuple(sorted({_split_chord_text(name)[1] for name in CHORD_DIFFICULTY}))
+
+
+def _build_difficulty_tables():
+    """
+    Returns {suffixes: table} for DIFFICULTY_SUFFIXES, where table[index][semitones] is the difficulty
+    of the chord with that root index and suffixes once transposed, matching FrozenChord.get_difficulty().
+    """
+    tables = {}
+    for suffixes in DIFFICULTY_SUFFIXES:
+        by_index = [CHORD_DIFFICULTY.get(name + suffixes, CHORD_DIFFICULTY.get(name, 3)) for name in ROOT_NAMES[SHARP]]
+        tables[suffixes] = tuple(tuple(by_index[new_index] for new_index in TRANSPOSE_TABLE[index])
+                                 for index in range(ST_IN_OCTAVE + 1))
+    return tables
+
+
+DIFFICULTY_TABLES = _build_difficulty_tables()
+
+
+def _transpose_parts(index, suffixes, sub_chord, semitones, spelling):
+    """Returns (text, difficulty) for a valid chord's parts transposed, for transpose_chord_texts()."""
+    new_index = TRANSPOSE_TABLE[index][semitones]
+    flag = spelling[new_index]
+    if sub_chord is None:
+        table = DIFFICULTY_TABLES.get(suffixes, DIFFICULTY_TABLES[''])
+        return ROOT_NAMES[flag][new_index] + suffixes, table[index][semitones]
+    # Chords with sub-chords are scored by their root, and the sub-chord follows the root's spelling.
+    sub_index = sub_chord.get_index()
+    if sub_chord.get_sub_chord() is None and sub_index:
+        sub_text = ROOT_NAMES[flag][TRANSPOSE_TABLE[sub_index][semitones]] + sub_chord.get_suffixes()
+    else:
+        sub_text = sub_chord.transpose(semitones).get_spelled_text(FLAT_SPELLING if flag == FLAT else SHARP_SPELLING)
+    return (ROOT_NAMES[flag][new_index] + suffixes + DEFAULT_SUB_SEP + sub_text,
+            DIFFICULTY_TABLES[''][index][semitones])
+
+
+def transpose_chord_texts(chord_texts, semitones, spelling=SHARP_SPELLING):
+    """
+    Transposes a whole vocabulary of chord strings at once, returning (texts, difficulties): lists of the
+    transposed text and difficulty (as get_difficulty()) of each chord in chord_texts, in order.
+    Each distinct text is parsed once and each distinct (root, suffixes, sub-chord) resolved once through
+    the precomputed TRANSPOSE_TABLE and DIFFICULTY_TABLES. Invalid chords are returned unchanged, with
+    difficulty 3. Roots are named by the spelling table (see SHARP_SPELLING).
+    """
+    semitones %= ST_IN_OCTAVE
+    by_parts = {}
+    by_text = {}
+    for chord_text in chord_texts:
+        if chord_text in by_text:
+            continue
+        chord_obj = intern_chord(chord_text)
+        if not chord_obj.is_valid():
+            by_text[chord_text] = (chord_obj.get_chord_text(), 3)
+            continue
+        sub_chord = chord_obj.get_sub_chord()
+        parts = (chord_obj.get_index(), chord_obj.get_suffixes().split(DEFAULT_SUB_SEP)[0] if sub_chord
+                 else chord_obj.get_suffixes(), sub_chord)
+        if parts not in by_parts:
+            by_parts[parts] = _transpose_parts(parts[0], parts[1], sub_chord, semitones, spelling)
+        by_text[chord_text] = by_parts[parts]
+    results = [by_text[chord_text] for chord_text in chord_texts]
+    return [text for text, difficulty in results], [difficulty for text, difficulty in results]
+
+
 if __name__ == '__main__':
     logging.info("Chord class loaded as main")
@@ -0,0 +1,117 @@
+"""
+ChordPro support: chords written inline in square brackets, eg: "[Am]Somewhere [C]over the rainbow",
+and directives in braces, eg: "{key: G}" or "{capo: 2}".
+Lines are handled one at a time, so songs can be streamed.
+"""
+import os
+import re
+
+import chord
+import stats
+
+CHORDPRO_EXTENSIONS = ('.cho', '.crd', '.chopro', '.chordpro', '.pro')
+
+CHORD_PATTERN = re.compile(r'\[([^\[\]]+)\]')
+DIRECTIVE_PATTERN = re.compile(r'^\s*\{\s*([A-Za-z_-]+)\s*(?::\s*(.*?))?\s*\}\s*$')
+
+# Directives whose values are chords and are transposed with the song.
+CHORD_DIRECTIVES = ('key',)
+
+
+def is_chordpro_file(filename):
+    """Returns True if the file name has a ChordPro extension."""
+    return os.path.splitext(filename)[1].lower() in CHORDPRO_EXTENSIONS
+
+
+def parse_directive(line):
+    """Returns (name, value) for a directive line, with the name in lower case, or None."""
+    if '{' not in line:
+        return None
+    match = DIRECTIVE_PATTERN.match(line)
+    if not match:
+        return None
+    return match.group(1).lower(), match.group(2) or ''
+
+
+def read_directives(song):
+    """
+    Returns a dictionary of the directives in a song (list of strings), keeping the first value of each.
+    Values of key and capo directives are converted to a chord and an int respectively where possible.
+    """
+    directives = {}
+    for line in song:
+        directive = parse_directive(line)
+        if directive and directive[0] not in directives:
+            name, value = directive
+            if name == 'key' and chord.intern_chord(value).is_valid():
+                value = chord.intern_chord(value)
+            elif name == 'capo' and value.isdigit():
+                value = int(value)
+            directives[name] = value
+    return directives
+
+
+def _transpose_chord_text(chord_text, semitones, spelling=None):
+    """
+    Returns the transposed text of a chord, or the text unchanged if it is not a valid chord (eg: N.C.).
+    Chords are written with sharp names, or as chosen by the spelling table if given (see keys.py).
+    """
+    transposed = chord.intern_chord(chord_text).transpose(semitones)
+    return transposed.get_chord_text() if spelling is None else transposed.get_spelled_text(spelling)
+
+
+def transpose_chordpro_line(line, semitones, spelling=None):
+    """
+    Returns the line with its inline chords, and any key directive, transposed by the semitones specified
+    and spelled as _transpose_chord_text() does.
+    """
+    if '[' in line:
+        return CHORD_PATTERN.sub(lambda match: '[' + _transpose_chord_text(match.group(1), semitones, spelling) + ']',
+                                 line)
+    directive = parse_directive(line)
+    if directive and directive[0] in CHORD_DIRECTIVES and chord.intern_chord(directive[1]).is_valid():
+        value_start = line.index(directive[1], line.index(':'))
+        value_end = value_start + len(directive[1])
+        return line[:value_start] + _transpose_chord_text(directive[1], semitones, spelling) + line[value_end:]
+    return line
+
+
+def split_chordpro_spans(line, chord_list):
+    """
+    Returns (spans, widths) for a line with inline chords found by get_chords_from_chordpro(): the text
+    around each bracketed chord in chord_list ([[chord_obj, column_of_bracket], ...]) and the width of
+    each chord including its brackets.
+    """
+    spans = []
+    widths = []
+    end = 0
+    for chord_obj, col in chord_list:
+        spans.append(line[end:col])
+        end = line.index(']', col) + 1
+        widths.append(end - col)
+    spans.append(line[end:])
+    return spans, widths
+
+
+def iter_transposed_chordpro(lines, semitones, spelling=None):
+    """Lazily transposes lines of ChordPro text from any iterable of strings, yielding each output line."""
+    for line in lines:
+        yield transpose_chordpro_line(line, semitones, spelling)
+
+
+def get_chords_from_chordpro(song):
+    """
+    Extracts inline chords from a ChordPro song (list of strings) into the same dictionary structure as
+    ctransposer.get_chords_from_song(): {line_no: [[chord_obj, column_of_bracket], ...]}.
+    """
+    indexed_chord_lines = {}
+    with stats.stage('parse'):
+        for line_no, line_text in enumerate(song):
+            if '[' in line_text:
+                chord_list = [[chord.intern_chord(match.group(1)), match.start()]
+                              for match in CHORD_PATTERN.finditer(line_text)]
+                if chord_list:
+                    indexed_chord_lines[line_no] = chord_list
+    if stats.get_stats() is not None:
+        stats.get_stats().count_song(song, indexed_chord_lines)
+    return indexed_chord_lines
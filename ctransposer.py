@@ -2,20 +2,43 @@
 Transposes chords text files into other keys.
 Can be helpful for acoustic players with a capo.
 """
+import json
 import logging
+import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import chord
+import chordpro
+import diagnostics
+import keys
+import line_memo
+import songtemplate
+import stats
+import watch
+from functools import lru_cache
 # from string import letters, digits
 from optparse import OptionParser
 
 """
 Todo:
 1. Auto-tune for easy 12-string playing with open chords
-2. Chord pro compatible mode.
+2. Chord pro compatible mode. - DONE
 3. Handle compound/sub-chords - DONE
 4. Fix bug where line 21 of 74-75.txt is not included. - DONE
 """
 
+CHORD_TYPES = (chord.Chord, chord.FrozenChord)
+
+# Maximal runs of non-space characters, ie: the "words" checked by is_chord_line().
+WORD_PATTERN = re.compile(r'[^ ]+')
+# Letters which start a chord in split_chord_line(), ie: the single letter chord roots.
+CHORD_ROOT_LETTERS = ''.join(root for root in chord.DEFAULT_CHORD_ROOTS if len(root) == 1)
+# A chord token as found by split_chord_line(): a chord root followed by anything up to the next space.
+CHORD_TOKEN_PATTERN = re.compile('[' + re.escape(CHORD_ROOT_LETTERS) + '][^ ]*')
+# First letters which count as chordy in is_chord_line().
+CHORDY_LETTERS = frozenset(CHORD_ROOT_LETTERS + CHORD_ROOT_LETTERS.lower())
+
 
 def is_chord_line(line):
     """
@@ -40,8 +63,8 @@ def is_chord_line(line):
     
     if line.strip(' ').startswith('C '):
         result = (chordy >= 1 + (non_chordy * 2)) and not illegal_items
-        logging.debug("DEBUG: result: {}, illegal: {}, ch: {}, n_ch: {}".format(result, illegal_items, chordy,
-                                                                                non_chordy))
+        logging.debug("DEBUG: result: %s, illegal: %s, ch: %s, n_ch: %s", result, illegal_items, chordy,
+                      non_chordy)
 
     return (chordy >= 1 + (non_chordy * 2)) and not illegal_items
 
@@ -49,9 +72,19 @@ def is_chord_line(line):
 def split_chord_line(c_line):
     """
     Splits a chord line into chord object and the column in which it starts.
+    Chord objects are interned FrozenChords, so repeated chords share one instance.
     Only works on lines containing chords.
     A column of -1 indicates an error.
     """  
+    return [[chord.intern_chord(chord_text), chord_text_col]
+            for chord_text, chord_text_col in split_chord_line_text(c_line)]
+
+
+def split_chord_line_text(c_line):
+    """
+    Splits a chord line into the raw text of each chord and the column in which it starts, as
+    split_chord_line() does: [[chord_text, column_chord_starts], ...].
+    """
     chords = []
     chord_text = ''
     chord_text_col = -1
@@ -59,8 +92,7 @@ def split_chord_line(c_line):
         if chord_text != '':
             # End of chord
             if char == ' ':
-                chords.append([chord.Chord(chord_text),
-                               chord_text_col])
+                chords.append([chord_text, chord_text_col])
                 chord_text = ''
             else:
                 chord_text += char
@@ -71,41 +103,114 @@ def split_chord_line(c_line):
                            
     # Append final chord, if any                
     if chord_text != '':
-        chords.append([chord.Chord(chord_text), chord_text_col])
+        chords.append([chord_text, chord_text_col])
 
     return chords
 
 
-def get_chords_from_song(song):
+def tokenize_chord_line(line):
+    """
+    Classifies a line and finds its chord tokens in a single pass, giving the same results as
+    is_chord_line() and split_chord_line() without walking the line character by character.
+    Returns (is_chord_line, [[chord_text, column_chord_starts], ...]), the token list being
+    empty if the line is not a chord line.
+    """
+    if any(name in line for name in chord.ILLEGAL_CHORD_NAMES):
+        return False, []
+
+    chordy = 0
+    non_chordy = 0
+    tokens = []
+    for word in WORD_PATTERN.finditer(line):
+        first_char = word.group()[0]
+        if first_char in CHORDY_LETTERS:
+            chordy += 1
+        # Count any other "ordinary" chars as non-chordy
+        elif 33 <= ord(first_char) <= 126:
+            non_chordy += 1
+        token = CHORD_TOKEN_PATTERN.search(line, word.start(), word.end())
+        if token:
+            tokens.append([token.group(), token.start()])
+
+    if chordy >= 1 + (non_chordy * 2):
+        return True, tokens
+    return False, []
+
+
+def parse_chord_line(line):
+    """
+    Returns None if the line is not a chord line, otherwise a tuple of (chord_obj, column_chord_starts,
+    width) for each chord token, with interned chords and the width of the token in the line.
+    Lines are looked up in the shared line memo first, if enabled (see line_memo.py).
+    """
+    memo = line_memo.get_memo()
+    if memo is not None:
+        return memo.get(line, _parse_chord_line)
+    return _parse_chord_line(line)
+
+
+def _parse_chord_line(line):
+    """Parses a line for parse_chord_line() without the memo."""
+    chord_line, tokens = tokenize_chord_line(line)
+    if not chord_line:
+        return None
+    return tuple((chord.intern_chord(chord_text), col, len(chord_text.rstrip())) for chord_text, col in tokens)
+
+
+def get_chords_from_song(song, collector=None, source=''):
     """
     Extracts chords from a list of strings (eg: file) and stores them in a
     dictionary indexed by line number with values in the following form:
     [[chord_obj, column_chord_starts], [..], ...]
     Assumes that a line with chords contains *only* chords.
+    Invalid chord tokens are recorded into collector (a diagnostics.Diagnostics) if given, for the
+    caller to report once per batch, otherwise they are summarised in a single warning for the song.
+    source is the file name the song was read from, if any, used in their locations.
     """
     indexed_chord_lines = {}
     found_some_chords = False
-    for line_no, line_text in enumerate(song):
-        if is_chord_line(line_text):
-            found_some_chords = True
-            indexed_chord_lines[line_no] = split_chord_line(line_text)
+    with stats.stage('parse'):
+        for line_no, line_text in enumerate(song):
+            chord_tokens = parse_chord_line(line_text)
+            if chord_tokens is not None:
+                found_some_chords = True
+                indexed_chord_lines[line_no] = [[chord_obj, col] for chord_obj, col, width in chord_tokens]
     if not found_some_chords:
         logging.error("Could not find any chords in song!")
-        
+
+    if collector is not None:
+        collector.record_invalid_chords(indexed_chord_lines, source)
+    elif logging.getLogger().isEnabledFor(logging.WARNING):
+        # The source names the song in the report, so it is left out of each location.
+        song_diagnostics = diagnostics.Diagnostics()
+        song_diagnostics.record_invalid_chords(indexed_chord_lines)
+        song_diagnostics.report(source or 'song')
+
+    if stats.get_stats() is not None:
+        stats.get_stats().count_song(song, indexed_chord_lines)
+
     return indexed_chord_lines
 
 
 def transpose_song_dict(chords_dict, semitones):
     """
     Transposes all chords in the dictionary structure by the specified number
-    of semitones. chords_dict is modified in place.
+    of semitones. chords_dict is modified in place: Chord objects are transposed and
+    FrozenChord objects are replaced by their transposed instances.
     """
     if semitones != 0:
+        # Each distinct FrozenChord is only transposed once.
+        transposed_chords = {}
         for line_no, line_list in chords_dict.items():
-            for chord_obj, col in line_list:
+            for chord_pair in line_list:
+                chord_obj = chord_pair[0]
                 # Check the object type first
                 if type(chord_obj) == chord.Chord:
                     chord_obj.transpose(semitones)
+                elif type(chord_obj) == chord.FrozenChord:
+                    if chord_obj not in transposed_chords:
+                        transposed_chords[chord_obj] = chord_obj.transpose(semitones)
+                    chord_pair[0] = transposed_chords[chord_obj]
 
 
 def get_total_difficulty(chords_dict):
@@ -114,63 +219,350 @@ def get_total_difficulty(chords_dict):
     total = 0
     for line_no, chord_list in chords_dict.items():
         for chord_obj, col in chord_list:
-            if type(chord_obj) == chord.Chord:
+            if type(chord_obj) in CHORD_TYPES:
                 total += chord_obj.get_difficulty()
     return total
 
 
+@lru_cache(maxsize=chord.CHORD_CACHE_SIZE)
+def _get_difficulty_row(index, suffixes):
+    """
+    Returns a tuple of the difficulties of the chord with the given index and suffixes
+    (including any sub-chord) when transposed by 0 to 11 semitones.
+    """
+    chord_obj = chord.intern_chord(chord.SCALE_MAP[index][0] + suffixes)
+    return tuple(chord_obj.transpose(offset).get_difficulty() for offset in range(chord.ST_IN_OCTAVE))
+
+
+def get_difficulty_table(chords_dict):
+    """
+    Counts the distinct chords in the dictionary structure and precomputes their difficulty at every offset.
+    Returns a dictionary indexed by (index, suffixes) with values in the form: [count, (difficulty at +0..+11)]
+    Invalid chords are ignored as they cannot be transposed meaningfully.
+    """
+    table = {}
+    for line_no, chord_list in chords_dict.items():
+        for chord_obj, col in chord_list:
+            if type(chord_obj) in CHORD_TYPES and chord_obj.is_valid():
+                key = (chord_obj.get_index(), chord_obj.get_suffixes())
+                if key in table:
+                    table[key][0] += 1
+                else:
+                    table[key] = [1, _get_difficulty_row(*key)]
+    return table
+
+
+def get_difficulty_vector(chords_dict):
+    """
+    Returns a list of the total difficulty of the song when transposed by 0 to 11 semitones,
+    so that vector[semitones % 12] is comparable with get_total_difficulty() after transposing.
+    The song is only scored from the difficulty table - chords_dict is not modified.
+    """
+    vector = [0] * chord.ST_IN_OCTAVE
+    for count, row in get_difficulty_table(chords_dict).values():
+        for offset, difficulty in enumerate(row):
+            vector[offset] += count * difficulty
+    return vector
+
+
+def join_chord_spans(spans, chord_texts, widths):
+    """
+    Returns a chord line built from the literal text spans around its chords: spans[i] comes before
+    chord_texts[i], which replaces a chord originally widths[i] characters wide, and spans[-1] ends the line.
+    Chords longer than the original use up following spaces, keeping at least one before any following text,
+    and push later text right only when there are no spaces left. Shorter chords are padded with spaces so
+    that later chords stay in their columns.
+    """
+    parts = [spans[0]]
+    append = parts.append
+    last = len(chord_texts) - 1
+    shift = 0
+    for chord_no, chord_text in enumerate(chord_texts):
+        append(chord_text)
+        span = spans[chord_no + 1]
+        shift += len(chord_text) - widths[chord_no]
+        if shift:
+            more_text = chord_no < last or span.strip()
+            if shift > 0:
+                spaces = len(span) - len(span.lstrip(' ')) - (1 if more_text else 0)
+                if spaces > 0:
+                    absorbed = min(shift, spaces)
+                    span = span[absorbed:]
+                    shift -= absorbed
+            elif more_text:
+                append(' ' * -shift)
+                shift = 0
+        append(span)
+    return "".join(parts)
+
+
+def split_chord_line_spans(line, chord_list):
+    """
+    Returns (spans, widths) for join_chord_spans(): the literal text around the chords in chord_list
+    ([[chord_obj, column_chord_starts], ...]) and the width of the chord text originally at each column.
+    """
+    spans = []
+    widths = []
+    end = 0
+    for chord_obj, col in chord_list:
+        spans.append(line[end:col])
+        # Chords end at the next space or, keeping any newline in the following span, the end of the line.
+        end = line.find(' ', col)
+        if end < 0:
+            end = col + len(line[col:].rstrip())
+        widths.append(end - col)
+    spans.append(line[end:])
+    return spans, widths
+
+
+def render_chord_line(line, chord_list, spelling=None):
+    """
+    Returns the line with each chord in chord_list ([[chord_obj, column_chord_starts], ...]) replacing the
+    chord text originally at its column, built from slices of the line (see join_chord_spans).
+    Chords are written with sharp names, or as chosen by the spelling table if given (see keys.py).
+    """
+    spans, widths = split_chord_line_spans(line, chord_list)
+    if spelling is None:
+        chord_texts = [chord_obj.get_chord_text() for chord_obj, col in chord_list]
+    else:
+        chord_texts = [chord_obj.get_spelled_text(spelling) for chord_obj, col in chord_list]
+    return join_chord_spans(spans, chord_texts, widths)
+
+
+def render_song_lines(song, chords_dict, spelling=None):
+    """
+    Returns a copy of the song (list of strings) with the chords in the dictionary structure written into
+    their lines at their columns, spelled as render_chord_line() does.
+    """
+    # Make a copy of song list of strings.
+    rendered_song = song[:]
+    for line_no, chord_list in chords_dict.items():
+        rendered_song[line_no] = render_chord_line(rendered_song[line_no], chord_list, spelling)
+
+    return rendered_song
+
+
 def transpose_song_lines(song, semitones):
     """
     Transposes all chords in the file by the number of semitones specified.
     If there are any errors, then, by default, an empty list is returned.
     """
-    # Make a copy of song list of strings.
-    transposed_song = song[:]
     song_chords = get_chords_from_song(song)
     # Modify song chords in place
-    # print("Pre-transpose difficulty: ", get_total_difficulty(chords_dict=song_chords))
-    transpose_song_dict(song_chords, semitones)
-    # print("Post-transpose difficulty: ", get_total_difficulty(chords_dict=song_chords))
-
+    with stats.stage('transpose'):
+        transpose_song_dict(song_chords, semitones)
     # Put new chords into song lines.
-    for line_no in song_chords.keys():
-        line_list = list(transposed_song[line_no])
-        for chord_pair in song_chords[line_no]:
-            chord_text = chord_pair[0].get_chord_text()
-            for offset, char in enumerate(chord_text):
-                line_list[chord_pair[1] + offset] = char
-        transposed_song[line_no] = "".join(line_list)
-            
-    return transposed_song
+    with stats.stage('render'):
+        return render_song_lines(song, song_chords)
+
+
+def find_lowest_difficulty(difficulty_vector, max_semitones_down=0, max_semitones_up=5):
+    """
+    Returns (semitones, difficulty) for the easiest transposition in the difficulty vector within the
+    semitone limits set, preferring the first found on a tie. Returns (None, -1) if the limits are empty.
+    """
+    best_semitones = None
+    best_difficulty = -1
+    if stats.get_stats() is not None:
+        stats.get_stats().count('offsets_tried', max(0, max_semitones_up + 1 - max_semitones_down))
+    for semitone_offset in range(max_semitones_down, max_semitones_up + 1):
+        song_difficulty = difficulty_vector[semitone_offset % chord.ST_IN_OCTAVE]
+        logging.debug("Tried %s semitones, got difficulty: %s", semitone_offset, song_difficulty)
+        if best_difficulty == -1 or song_difficulty < best_difficulty:
+            best_semitones = semitone_offset
+            best_difficulty = song_difficulty
+            logging.info("Found new best difficulty: %s, when transposed by %s semitones.", best_difficulty,
+                         semitone_offset)
+    return best_semitones, best_difficulty
 
 
 def get_lowest_difficulty(song, max_semitones_down=0, max_semitones_up=5):
     """
     Returns the transposed song with the lowest difficulty within the semitone limits set.
+    The song is parsed once, every offset is scored from a difficulty table and only the best is rendered.
     :param song: List of strings representing song text file.
     :param max_semitones_down: Transposes down to this limit. Default (0) assumes open chords.
     :param max_semitones_up: Transposes up to this limit. Default 5 should be playable on most guitars.
     :return: transposed song as a list of strings.
     """
-    best_difficulty = -1
-    best_transposed_song = []
-    for semitone_offset in range(max_semitones_down, max_semitones_up + 1):
-        song_chords = get_chords_from_song(song=song)
-        transpose_song_dict(chords_dict=song_chords, semitones=semitone_offset)
-        song_difficulty = get_total_difficulty(chords_dict=song_chords)
-        logging.debug("Tried {} semitones, got difficulty: {}".format(semitone_offset, song_difficulty))
-        if best_difficulty == -1 or song_difficulty < best_difficulty:
-            best_transposed_song = transpose_song_lines(song=song, semitones=semitone_offset)
-            best_difficulty = song_difficulty
-            logging.info("Found new best difficulty: {}, when transposed by {} semitones.".format(best_difficulty,
-                                                                                                  semitone_offset))
+    song_chords = get_chords_from_song(song=song)
+    with stats.stage('difficulty_search'):
+        best_semitones, best_difficulty = find_lowest_difficulty(get_difficulty_vector(song_chords),
+                                                                 max_semitones_down, max_semitones_up)
+    logging.info("Final difficulty:%s", best_difficulty)
+    if best_semitones is None:
+        return []
+
+    with stats.stage('transpose'):
+        transpose_song_dict(chords_dict=song_chords, semitones=best_semitones)
+    with stats.stage('render'):
+        return render_song_lines(song, song_chords)
+
+
+def transpose_song(song, semitones=0, auto=False, chord_pro=False, key_spelling=False):
+    """
+    Returns the song transposed by the number of semitones specified or, if auto is set,
+    transposed to its easiest key using get_lowest_difficulty().
+    If chord_pro is set, the song is ChordPro text with inline chords.
+    If key_spelling is set, chords are written with the sharp or flat names of the new key (eg: Bb in F)
+    rather than always with sharps.
+    """
+    return transpose_song_with_offset(song, semitones, auto, chord_pro, key_spelling)[1]
+
+
+def transpose_song_with_offset(song, semitones=0, auto=False, chord_pro=False, key_spelling=False, key=None):
+    """
+    Returns (semitones, transposed song) for the song transposed as transpose_song() does, where semitones
+    is the offset actually applied, eg: the one chosen when auto is set.
+    If key (eg: 'G') is given, the song is moved to that key instead, estimated from the chords parsed once
+    for both steps (see get_chords_semitones_to_key). A ChordPro song's {key:} directive is used as its key.
+    """
+    if chord_pro:
+        spelling = None
+        # Songs are only parsed when needed, or to be counted.
+        if auto or key_spelling or key or stats.get_stats() is not None:
+            song_chords = chordpro.get_chords_from_chordpro(song)
+            directives = chordpro.read_directives(song) if key_spelling or key else None
+            if key:
+                semitones = get_chords_semitones_to_key(song_chords, key, directives)
+            elif auto:
+                semitones, difficulty = find_lowest_difficulty(get_difficulty_vector(song_chords))
+            if key_spelling or key:
+                spelling = keys.get_transposed_spelling(song_chords, semitones, directives)
+        return semitones, list(chordpro.iter_transposed_chordpro(song, semitones, spelling))
+    song_chords = get_chords_from_song(song)
+    if key:
+        semitones, auto, key_spelling = get_chords_semitones_to_key(song_chords, key), False, True
+    return _transpose_parsed_song(song, song_chords, semitones, auto, key_spelling)
+
+
+def transpose_song_chords(song, song_chords, semitones=0, auto=False, key_spelling=False):
+    """
+    Returns the song transposed as transpose_song() does, for a song which has already been parsed into
+    song_chords by get_chords_from_song(). song_chords is modified in place.
+    """
+    return _transpose_parsed_song(song, song_chords, semitones, auto, key_spelling)[1]
+
+
+def _transpose_parsed_song(song, song_chords, semitones, auto, key_spelling):
+    """Returns (semitones, transposed song) for transpose_song_chords(), semitones being the offset applied."""
+    if auto:
+        with stats.stage('difficulty_search'):
+            semitones, difficulty = find_lowest_difficulty(get_difficulty_vector(song_chords))
+    spelling = keys.get_transposed_spelling(song_chords, semitones) if key_spelling else None
+    with stats.stage('transpose'):
+        transpose_song_dict(song_chords, semitones)
+    with stats.stage('render'):
+        return semitones, render_song_lines(song, song_chords, spelling)
+
+
+def get_semitones_to_key(song, key, chord_pro=False):
+    """
+    Returns the semitones (-5 to +6) by which to transpose the song so that it is in key, a name such as
+    'G' or 'F#m' (see get_chords_semitones_to_key). Returns 0 if no key can be estimated.
+    If chord_pro is set, the song is ChordPro text with inline chords, and any {key:} directive gives its key.
+    """
+    if chord_pro:
+        return get_chords_semitones_to_key(chordpro.get_chords_from_chordpro(song), key, chordpro.read_directives(song))
+    return get_chords_semitones_to_key(get_chords_from_song(song), key)
+
 
-    logging.info("Final difficulty:{}".format(best_difficulty))
-    return best_transposed_song
+def get_chords_semitones_to_key(song_chords, key, directives=None):
+    """
+    Returns the semitones (-5 to +6) by which to transpose a song already parsed into song_chords so that
+    its key becomes key, a name such as 'G' or 'F#m'. The song's key is taken from its ChordPro directives
+    if given (see chordpro.read_directives), otherwise estimated from its chords. If the modes differ, the
+    song is moved to the relative key of the song's mode, eg: a song in G moved to 'Am' ends up in C.
+    Returns 0 if the song has no key.
+    """
+    target_key = keys.parse_key(key)
+    key_name, song_key = keys.get_song_key(song_chords, directives)
+    if song_key is None:
+        return 0
+    logging.info("Song key: %s", key_name)
+    return keys.get_semitones_between(song_key, target_key)
+
+
+def get_transposed_filename(filename, semitones):
+    """Returns the name of the file for a song transposed by semitones, eg: song[+2].txt for song.txt."""
+    name, extension = os.path.splitext(filename)
+    return "%s[%+d]%s" % (name, semitones, extension)
+
+
+def get_summary_filename(filename):
+    """Returns the name of the per-key difficulty summary written by write_all_keys(), eg: song[keys].json."""
+    return "%s[keys].json" % os.path.splitext(filename)[0]
+
+
+def _write_song(path, song):
+    """Writes a song (string) to path, returning the path."""
+    with open(path, mode='w') as tran_file:
+        tran_file.write(song)
+    return path
+
+
+def write_all_keys(filename, song, chord_pro=False, key_spelling=False, workers=None):
+    """
+    Parses the song (list of strings) read from filename once and writes it transposed by 0 to 11
+    semitones, concurrently, to files named by get_transposed_filename(), along with a JSON summary of
+    the key and difficulty of each (see get_summary_filename()).
+    If chord_pro is set, the song is ChordPro text, whose {key:} directive gives its key if it has one; if
+    key_spelling is set, each key is written with its own sharps or flats. workers is the number of writer
+    threads (default: the executor's default).
+    Returns the summary as a dictionary.
+    """
+    song_chords = chordpro.get_chords_from_chordpro(song) if chord_pro else get_chords_from_song(song)
+    difficulty_vector = get_difficulty_vector(song_chords)
+    key_name, key_index = keys.get_song_key(song_chords, chordpro.read_directives(song) if chord_pro else None)
+
+    with stats.stage('render'):
+        template = songtemplate.SongTemplate.from_chords(song, song_chords, chord_pro)
+        songs = template.render_all_keys(key_spelling, key_index)
+
+    paths = [get_transposed_filename(filename, semitones) for semitones in range(chord.ST_IN_OCTAVE)]
+    with stats.stage('write'), ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_write_song, paths, songs))
+
+    easiest, difficulty = find_lowest_difficulty(difficulty_vector, 0, chord.ST_IN_OCTAVE - 1)
+    summary = {'file': filename,
+               'key': keys.get_key_name(key_index) if key_index is not None else None,
+               'easiest_semitones': easiest,
+               'keys': [{'semitones': semitones,
+                         'file': os.path.basename(paths[semitones]),
+                         'key': (keys.get_key_name(keys.transpose_key(key_index, semitones))
+                                 if key_index is not None else None),
+                         'difficulty': difficulty_vector[semitones]}
+                        for semitones in range(chord.ST_IN_OCTAVE)]}
+    with open(get_summary_filename(filename), mode='w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+    logging.info("Wrote %s keys of %s", chord.ST_IN_OCTAVE, filename)
+    return summary
+
+
+def write_transposed_file(filename, song_lines, semitones=0, auto=False, chord_pro=False, key=None,
+                          key_spelling=False, all_keys=False):
+    """
+    Writes the song (list of strings) read from filename transposed as main() does: by the semitones, to its
+    easiest key if auto is set, to key (eg: 'G') if given, or in all 12 keys if all_keys is set.
+    Returns the list of files written.
+    """
+    if all_keys:
+        write_all_keys(filename, song_lines, chord_pro, key_spelling)
+        return [get_transposed_filename(filename, offset) for offset in range(chord.ST_IN_OCTAVE)] + \
+            [get_summary_filename(filename)]
+
+    semitones, transposed_song = transpose_song_with_offset(song_lines, semitones, auto, chord_pro,
+                                                            key_spelling, key)
+
+    new_filename = get_transposed_filename(filename, semitones)
+    with stats.stage('write'), open(new_filename, mode='w') as tran_file:
+        tran_file.writelines(transposed_song)
+        logging.info("Wrote: %s lines to file %s", len(transposed_song), new_filename)
+    return [new_filename]
 
 
 def handle_options():
-    """ Processes the command-line parameters returning resulting variables. """
+    """ Processes the command-line parameters returning resulting options. """
     ops = OptionParser(usage="ctransposer.py [options]")
     ops.add_option("--file", "-f",
                    action="store", dest="filename", default="",
@@ -182,51 +574,88 @@ def handle_options():
     ops.add_option("--auto", "-a", action="store_true", dest="auto",
                    default=False,
                    help="Automatically find a key which is easy to play using open "
-                        "chords. NOT IMPLEMENTED.")
+                        "chords.")
+    ops.add_option("--key", "-k", action="store", dest="key", default=None,
+                   help="Transpose the song to this key (eg: G, Em), estimated from its chords, or to its "
+                        "relative key if the modes differ. Overrides --semitones and --auto.")
+    ops.add_option("--key-spelling", action="store_true", dest="key_spelling", default=False,
+                   help="Write sharps or flats to suit the new key (eg: Bb rather than A# in F). "
+                        "Implied by --key.")
+    ops.add_option("--all-keys", action="store_true", dest="all_keys", default=False,
+                   help="Write the song in all 12 keys, parsing it once, with a JSON summary of the "
+                        "difficulty of each. Overrides --semitones, --auto and --key.")
+    ops.add_option("--watch", "-w", action="store", dest="watch_dir", default="",
+                   help="Watch a folder, transposing its .txt and ChordPro songs whenever they change, "
+                        "instead of a single --file.")
+    ops.add_option("--interval", action="store", dest="interval", default=watch.DEFAULT_INTERVAL, type="float",
+                   help="Seconds between checks for changes in --watch mode. Defaults to '%default'.")
+    ops.add_option("--chordpro", "-c", action="store_true", dest="chord_pro", default=False,
+                   help="Treat the file as ChordPro, with chords inline in [brackets]. "
+                        "Assumed for files with a ChordPro extension such as .cho or .pro.")
+    ops.add_option("--stats", action="store_true", dest="stats", default=False,
+                   help="Print timings and counters for each stage as JSON. Not available with --watch.")
     ops.add_option("--log-level", "-l", action="store", dest="log_level", choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                    help="Set the logging level")
 
     # Throw away any spare parameters.
     options, _ = ops.parse_args()
     
-    if options.filename == '':
+    if options.filename == '' and options.watch_dir == '':
         logging.error("No file specified - nothing to do!")
         sys.exit(1)
+    if options.watch_dir and options.stats:
+        logging.error("--stats can't be used with --watch - nothing to do!")
+        sys.exit(1)
+    if options.key:
+        try:
+            keys.parse_key(options.key)
+        except ValueError as err:
+            logging.error("%s - nothing to do!", err)
+            sys.exit(1)
 
     # logging.basicConfig(level=getattr(logging, options.log_level))
 
-    return options.filename, options.semitones, options.auto
+    return options
+
+
+def watch_folder(options):
+    """Transposes songs in options.watch_dir as they change, as main() does for one file, until interrupted."""
+    def process(path, song_lines):
+        """Writes the transposed versions of a changed song."""
+        write_transposed_file(path, song_lines, options.semitones, options.auto,
+                              options.chord_pro or chordpro.is_chordpro_file(path), options.key,
+                              options.key_spelling, options.all_keys)
+
+    watcher = watch.SongWatcher(options.watch_dir, process)
+    logging.info("Watching %s", options.watch_dir)
+    try:
+        watcher.run(options.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
 
 def main():
     """
     Main entry point where it all kicks off.
     """
-    filename, semitones, auto = handle_options()
-       
-    with open(filename, mode='r') as song_file:
+    options = handle_options()
+    filename, semitones = options.filename, options.semitones
+    if options.watch_dir:
+        watch_folder(options)
+        return
+    if options.stats:
+        stats.enable()
+
+    with stats.stage('read'), open(filename, mode='r') as song_file:
         song_lines = song_file.readlines()
-        # song_chords = get_chords_from_song(song_lines)
-        transposed_song = transpose_song_lines(song_lines, semitones)
-        
-        logging.info("orig: {}".format(song_lines[21]))
-        logging.info("tran: {}".format(transposed_song[21]))
-
-    get_lowest_difficulty(song=song_lines)
-  
-    if semitones > 0:
-        file_suffix = '+' + str(semitones)
-    elif semitones < 0:
-        file_suffix = str(semitones)
-    else:
-        file_suffix = ''
+    write_transposed_file(filename, song_lines, semitones, options.auto,
+                          options.chord_pro or chordpro.is_chordpro_file(filename), options.key,
+                          options.key_spelling, options.all_keys)
 
-    new_filename = "%s[%+d].%s" % (filename.split('.')[0], semitones, filename.split('.')[1])
-        
-    with open(new_filename, mode='w') as tran_file:
-        tran_file.writelines(transposed_song)
-        logging.info("Wrote: %s line to file {}".format(len(transposed_song),
-                                                        filename + file_suffix))
+    if options.stats:
+        print(json.dumps(stats.disable().to_dict(), indent=2, sort_keys=True))
         
     
 if __name__ == '__main__':
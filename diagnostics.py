@@ -0,0 +1,78 @@
+"""
+Aggregated diagnostics for chord parsing: rather than logging every invalid chord token as it
+is found, tokens are counted with their first location and reported once per song or batch.
+"""
+import logging
+
+# Number of distinct tokens named in a report before the rest are summarised as a count.
+REPORT_LIMIT = 10
+
+
+class Diagnostics(object):
+    """
+    Counts invalid chord tokens, keeping the first location each was seen at as (source, line, column),
+    where source is the file name, or '' if unknown.
+    """
+
+    def __init__(self):
+        self.tokens = {}
+
+    def record(self, text, line_no, col, source=''):
+        """Records one occurrence of an invalid chord token."""
+        entry = self.tokens.get(text)
+        if entry is None:
+            self.tokens[text] = [1, source, line_no, col]
+        else:
+            entry[0] += 1
+
+    def record_invalid_chords(self, chords_dict, source=''):
+        """Records every invalid chord in a dictionary from ctransposer.get_chords_from_song, read from source."""
+        for line_no, chord_pairs in chords_dict.items():
+            for chord_obj, col in chord_pairs:
+                if not chord_obj.is_valid():
+                    self.record(chord_obj.get_chord_text(), line_no, col, source)
+
+    def merge(self, other):
+        """
+        Adds the counts from another Diagnostics, keeping the earliest first location of each token
+        by source, then line, then column.
+        """
+        for text, (count, source, line_no, col) in other.tokens.items():
+            entry = self.tokens.get(text)
+            if entry is None:
+                self.tokens[text] = [count, source, line_no, col]
+            else:
+                entry[0] += count
+                if (source, line_no, col) < tuple(entry[1:]):
+                    entry[1:] = [source, line_no, col]
+
+    def get_total(self):
+        """Returns the total number of invalid tokens recorded."""
+        return sum(entry[0] for entry in self.tokens.values())
+
+    def summary(self, limit=None):
+        """
+        Returns [(text, count, first_source, first_line_no, first_col), ...] sorted by descending count
+        then text, truncated to limit entries if given.
+        """
+        rows = sorted(((text,) + tuple(entry) for text, entry in self.tokens.items()),
+                      key=lambda row: (-row[1], row[0]))
+        return rows if limit is None else rows[:limit]
+
+    def report(self, label='song', logger=None, limit=REPORT_LIMIT):
+        """
+        Logs a single warning summarising the invalid tokens, if there are any and the logger
+        is enabled for warnings. Returns True if a warning was logged.
+        """
+        logger = logger or logging.getLogger()
+        if not self.tokens or not logger.isEnabledFor(logging.WARNING):
+            return False
+        rows = self.summary(limit)
+        details = ', '.join("'%s' x%d (first at %sline %d, col %d)" % (text, count, source + ' ' if source else '',
+                                                                        line_no, col)
+                            for text, count, source, line_no, col in rows)
+        hidden = len(self.tokens) - len(rows)
+        if hidden > 0:
+            details += ' and %d more' % hidden
+        logger.warning("%s invalid chord tokens in %s: %s", self.get_total(), label, details)
+        return True
@@ -0,0 +1,71 @@
+"""
+Incremental song document for live editing: the classification and chords of each line are kept,
+so an edit only re-parses and re-renders the lines it touches.
+"""
+import chord
+import ctransposer
+
+
+class SongDocument(object):
+    """
+    A song (list of strings) with its parsed chord lines and output for the current transposition.
+    """
+
+    def __init__(self, song=(), semitones=0):
+        self.semitones = semitones
+        self.lines = []
+        self.chord_lists = []
+        self.output = []
+        self.edit(0, 0, song)
+
+    @staticmethod
+    def _parse_line(line):
+        """Returns [[chord_obj, column_chord_starts], ...] for a chord line, or None for any other line."""
+        chord_line, tokens = ctransposer.tokenize_chord_line(line)
+        if not chord_line:
+            return None
+        return [[chord.intern_chord(chord_text), col] for chord_text, col in tokens]
+
+    def _render_line(self, line, chord_list):
+        """Returns the output for a line in the current transposition."""
+        if chord_list is None:
+            return line
+        if self.semitones != 0:
+            chord_list = [[chord_obj.transpose(self.semitones), col] for chord_obj, col in chord_list]
+        return ctransposer.render_chord_line(line, chord_list)
+
+    def edit(self, start, end, new_lines):
+        """
+        Replaces lines[start:end] with new_lines, parsing only the new lines.
+        Returns the output lines which replace output[start:end].
+        """
+        new_lines = list(new_lines)
+        chord_lists = [self._parse_line(line) for line in new_lines]
+        output = [self._render_line(line, chord_list) for line, chord_list in zip(new_lines, chord_lists)]
+        self.lines[start:end] = new_lines
+        self.chord_lists[start:end] = chord_lists
+        self.output[start:end] = output
+        return output
+
+    def set_semitones(self, semitones):
+        """
+        Changes the transposition, re-rendering only the chord lines.
+        Returns a dictionary of the changed output lines, indexed by line number.
+        """
+        self.semitones = semitones
+        changed = {}
+        for line_no, chord_list in enumerate(self.chord_lists):
+            if chord_list is not None:
+                output_line = self._render_line(self.lines[line_no], chord_list)
+                if output_line != self.output[line_no]:
+                    self.output[line_no] = changed[line_no] = output_line
+        return changed
+
+    def get_chords(self):
+        """Returns the chords in the same dictionary structure as ctransposer.get_chords_from_song()."""
+        return {line_no: [chord_pair[:] for chord_pair in chord_list]
+                for line_no, chord_list in enumerate(self.chord_lists) if chord_list is not None}
+
+    def render(self):
+        """Returns a copy of the whole output song as a list of strings."""
+        return self.output[:]
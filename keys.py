@@ -0,0 +1,227 @@
+"""
+Key estimation. Parsed chords are reduced to a weighted pitch-class histogram (chord tones from the
+root and major/minor quality), which is scored against all 24 major and minor key profiles at once
+using a precomputed matrix. Each key also has a precomputed spelling table choosing sharp or flat
+names for chords written in it.
+"""
+import chord
+
+# Krumhansl-Kessler key profiles: how well each pitch class (semitones above the tonic) fits the key.
+MAJOR_PROFILE = (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88)
+MINOR_PROFILE = (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17)
+
+# Weights added to the histogram for each chord played: its root, third and fifth.
+ROOT_WEIGHT = 2
+THIRD_WEIGHT = 1
+FIFTH_WEIGHT = 1
+# Extra occurrences counted for the final chord, which is usually the tonic.
+FINAL_CHORD_WEIGHT = 2
+
+MAJOR_THIRD = 4
+MINOR_THIRD = 3
+FIFTH = 7
+
+# Keys are numbered 0-11 for the majors and 12-23 for the minors, with tonics in chord index order (A=0).
+KEY_NAMES = tuple(chord.DEFAULT_CHORD_ROOTS) + tuple(root + 'm' for root in chord.DEFAULT_CHORD_ROOTS)
+
+# Major keys whose signatures have flats. Minor keys are spelled as their relative major, RELATIVE_MAJOR
+# semitones above. C major has no signature, so borrowed chords use the usual names: Bb, Eb, Ab but C#, F#.
+FLAT_MAJOR_KEYS = ('F', 'Bb', 'Eb', 'Ab', 'Db')
+NATURAL_MAJOR_KEY = 'C'
+NATURAL_FLATS = ('Bb', 'Eb', 'Ab')
+RELATIVE_MAJOR = 3
+
+
+def _normalise(profile):
+    """Returns the profile shifted to zero mean and scaled to unit length."""
+    mean = sum(profile) / len(profile)
+    centred = [value - mean for value in profile]
+    length = sum(value * value for value in centred) ** 0.5
+    return tuple(value / length for value in centred)
+
+
+def _build_key_profiles():
+    """
+    Returns a 24 x 12 matrix with a row for each key, giving the normalised profile value of each
+    pitch class, so that a histogram's dot product with a row is proportional to their correlation.
+    """
+    rows = []
+    for profile in (_normalise(MAJOR_PROFILE), _normalise(MINOR_PROFILE)):
+        for tonic in range(chord.ST_IN_OCTAVE):
+            rows.append(tuple(profile[(pitch_class - tonic) % chord.ST_IN_OCTAVE]
+                              for pitch_class in range(chord.ST_IN_OCTAVE)))
+    return tuple(rows)
+
+
+KEY_PROFILES = _build_key_profiles()
+
+
+def is_minor_quality(suffixes):
+    """Returns True if the chord suffixes (eg: 'm7', 'maj7', 'sus4') describe a minor chord."""
+    return suffixes.startswith('m') and not suffixes.startswith('maj')
+
+
+def get_key_index(tonic_index, minor):
+    """Returns the key number (0-23) for a tonic chord index (1-12) and mode."""
+    return tonic_index - 1 + (chord.ST_IN_OCTAVE if minor else 0)
+
+
+def get_key_tonic(key_index):
+    """Returns the tonic pitch class (0-11, A=0) of a key number."""
+    return key_index % chord.ST_IN_OCTAVE
+
+
+def transpose_key(key_index, semitones):
+    """Returns the key number (0-23) of a key transposed by the number of semitones specified."""
+    tonic = (get_key_tonic(key_index) + semitones) % chord.ST_IN_OCTAVE
+    return tonic + (chord.ST_IN_OCTAVE if key_index >= chord.ST_IN_OCTAVE else 0)
+
+
+def parse_key(key_text):
+    """
+    Returns the key number (0-23) for a key name such as 'G', 'Bb', 'F#m' or 'Amin'.
+    Raises ValueError for names which don't start with a valid chord root.
+    """
+    key_chord = chord.intern_chord(key_text.strip())
+    if not key_chord.is_valid():
+        raise ValueError("Invalid key: '{}'".format(key_text))
+    return get_key_index(key_chord.get_index(), is_minor_quality(key_chord.get_suffixes()))
+
+
+def _add_chord_tones(histogram, chord_obj, weight):
+    """Adds the weighted root, third and fifth of a valid chord to histogram."""
+    root = chord_obj.get_index() - 1
+    third = MINOR_THIRD if is_minor_quality(chord_obj.get_suffixes()) else MAJOR_THIRD
+    histogram[root] += ROOT_WEIGHT * weight
+    histogram[(root + third) % chord.ST_IN_OCTAVE] += THIRD_WEIGHT * weight
+    histogram[(root + FIFTH) % chord.ST_IN_OCTAVE] += FIFTH_WEIGHT * weight
+
+
+def get_pitch_class_histogram(chords_dict):
+    """
+    Returns a list of 12 weights (A=0) from the chords in a dictionary structure from
+    get_chords_from_song(), adding the root, third and fifth of every valid chord played.
+    Returns all zeros if there are no valid chords.
+    """
+    histogram = [0] * chord.ST_IN_OCTAVE
+    final_chord = None
+    for line_no in sorted(chords_dict):
+        for chord_obj, col in chords_dict[line_no]:
+            if chord_obj.is_valid():
+                _add_chord_tones(histogram, chord_obj, 1)
+                final_chord = chord_obj
+    if final_chord is not None:
+        _add_chord_tones(histogram, final_chord, FINAL_CHORD_WEIGHT)
+    return histogram
+
+
+def score_keys(histogram):
+    """Returns a list of 24 scores for a pitch-class histogram, indexed by key number (see KEY_NAMES)."""
+    return [sum(weight * fit for weight, fit in zip(histogram, profile)) for profile in KEY_PROFILES]
+
+
+def estimate_key(chords_dict):
+    """
+    Returns (key_name, key_index) for the key which best fits the chords in a dictionary structure
+    from get_chords_from_song(), or (None, None) if there are no valid chords.
+    """
+    histogram = get_pitch_class_histogram(chords_dict)
+    if not any(histogram):
+        return None, None
+    scores = score_keys(histogram)
+    key_index = max(range(len(scores)), key=scores.__getitem__)
+    return KEY_NAMES[key_index], key_index
+
+
+def is_minor_key(key_index):
+    """Returns True if the key number is a minor key."""
+    return key_index >= chord.ST_IN_OCTAVE
+
+
+def get_relative_key(key_index):
+    """Returns the key number of the relative minor of a major key, or the relative major of a minor key."""
+    if is_minor_key(key_index):
+        return transpose_key(key_index, RELATIVE_MAJOR) - chord.ST_IN_OCTAVE
+    return transpose_key(key_index, -RELATIVE_MAJOR) + chord.ST_IN_OCTAVE
+
+
+def get_song_key(chords_dict, directives=None):
+    """
+    Returns (key_name, key_index) for a song: the key given by its ChordPro {key:} directive if it has a
+    valid one (see chordpro.read_directives), otherwise the key estimated from its chords (see estimate_key).
+    """
+    key_chord = (directives or {}).get('key')
+    if isinstance(key_chord, chord.FrozenChord):
+        key_index = get_key_index(key_chord.get_index(), is_minor_quality(key_chord.get_suffixes()))
+        return KEY_NAMES[key_index], key_index
+    return estimate_key(chords_dict)
+
+
+def get_semitones_between(from_key_index, to_key_index):
+    """
+    Returns the smallest transposition (-5 to +6 semitones) moving one key to another. Transposing can't
+    change the mode, so if the modes differ the result moves to the relative key of the target in the
+    mode of the first, which has the same signature: a song in Em moved to 'G' stays in Em, and a song
+    in G moved to 'Am' ends up in C.
+    """
+    if is_minor_key(from_key_index) != is_minor_key(to_key_index):
+        to_key_index = get_relative_key(to_key_index)
+    semitones = (get_key_tonic(to_key_index) - get_key_tonic(from_key_index)) % chord.ST_IN_OCTAVE
+    return semitones - chord.ST_IN_OCTAVE if semitones > chord.ST_IN_OCTAVE // 2 else semitones
+
+
+def _build_key_spellings():
+    """Returns a tuple of 24 spelling tables (see chord.SHARP_SPELLING), indexed by key number."""
+    flat_tonics = frozenset(chord.CHORD_MAP[name] - 1 for name in FLAT_MAJOR_KEYS)
+    natural_tonic = chord.CHORD_MAP[NATURAL_MAJOR_KEY] - 1
+    natural_spelling = (chord.SHARP,) + tuple(chord.FLAT if chord.SCALE_MAP[index][-1] in NATURAL_FLATS
+                                              else chord.SHARP for index in range(1, chord.ST_IN_OCTAVE + 1))
+    spellings = []
+    for key_index in range(len(KEY_NAMES)):
+        major_tonic = get_key_tonic(key_index)
+        if key_index >= chord.ST_IN_OCTAVE:
+            major_tonic = (major_tonic + RELATIVE_MAJOR) % chord.ST_IN_OCTAVE
+        if major_tonic in flat_tonics:
+            spellings.append(chord.FLAT_SPELLING)
+        elif major_tonic == natural_tonic:
+            spellings.append(natural_spelling)
+        else:
+            spellings.append(chord.SHARP_SPELLING)
+    return tuple(spellings)
+
+
+KEY_SPELLINGS = _build_key_spellings()
+
+
+def get_key_name(key_index):
+    """Returns the name of a key number written with its own spelling, eg: 'Bb' rather than 'A#'."""
+    return chord.intern_chord(KEY_NAMES[key_index]).get_spelled_text(KEY_SPELLINGS[key_index])
+
+
+def get_all_key_spellings(key_index):
+    """
+    Returns the spelling tables for a song in the key number given transposed by 0 to 11 semitones,
+    or chord.SHARP_SPELLING for each if the key is None.
+    """
+    if key_index is None:
+        return [chord.SHARP_SPELLING] * chord.ST_IN_OCTAVE
+    return [KEY_SPELLINGS[transpose_key(key_index, semitones)] for semitones in range(chord.ST_IN_OCTAVE)]
+
+
+def get_key_spelling(key_index):
+    """Returns the spelling table for a key number, or chord.SHARP_SPELLING if it is None."""
+    if key_index is None:
+        return chord.SHARP_SPELLING
+    return KEY_SPELLINGS[key_index]
+
+
+def get_transposed_spelling(chords_dict, semitones, directives=None):
+    """
+    Returns the spelling table for the key that the chords in a dictionary structure from
+    get_chords_from_song() will be in once transposed by the semitones specified, taking the key
+    before they are transposed from the directives or the chords (see get_song_key).
+    """
+    key_name, key_index = get_song_key(chords_dict, directives)
+    if key_index is None:
+        return chord.SHARP_SPELLING
+    return KEY_SPELLINGS[transpose_key(key_index, semitones)]
@@ -0,0 +1,93 @@
+"""
+Bounded memo of parsed lines keyed by their exact text. Chord sheets repeat the same chord and lyric
+lines within and across songs, so a memo shared by every song parsed in a process (see enable())
+classifies and tokenizes each distinct line only once.
+Disabled by default, when parsing costs one check per song rather than per line.
+"""
+import sys
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# Lines longer than this are parsed every time rather than cached.
+MAX_LINE_LENGTH = 1024
+# Rough bytes held by an entry besides its line text, and by each token cached for it.
+ENTRY_OVERHEAD = 200
+TOKEN_OVERHEAD = 100
+
+_MISSING = object()
+
+
+class LineMemo(object):
+    """
+    LRU memo of parse results by line text, evicting the least recently used lines once the
+    estimated memory held passes max_bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lines = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _get_size(line, result):
+        """Returns the estimated memory held by an entry. result is None or a sequence of tokens."""
+        return sys.getsizeof(line) + ENTRY_OVERHEAD + (TOKEN_OVERHEAD * len(result) if result else 0)
+
+    def get(self, line, parse):
+        """
+        Returns parse(line), calling parse only if the line is not in the memo. parse must return None
+        or a tuple, which is shared by every caller and must not be modified.
+        """
+        result = self.lines.get(line, _MISSING)
+        if result is not _MISSING:
+            self.hits += 1
+            self.lines.move_to_end(line)
+            return result
+
+        self.misses += 1
+        result = parse(line)
+        if len(line) <= MAX_LINE_LENGTH:
+            self.lines[line] = result
+            self.bytes += self._get_size(line, result)
+            while self.bytes > self.max_bytes and self.lines:
+                old_line, old_result = self.lines.popitem(last=False)
+                self.bytes -= self._get_size(old_line, old_result)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        """Removes every line, keeping the counters."""
+        self.lines.clear()
+        self.bytes = 0
+
+    def get_stats(self):
+        """Returns the memo counters, estimated size and hit rate as a dictionary."""
+        lookups = self.hits + self.misses
+        return {'entries': len(self.lines), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+_shared_memo = None
+
+
+def enable(max_bytes=DEFAULT_MAX_BYTES):
+    """Starts sharing a new LineMemo between every song parsed in this process, returning it."""
+    global _shared_memo
+    _shared_memo = LineMemo(max_bytes)
+    return _shared_memo
+
+
+def disable():
+    """Stops sharing the memo, returning it (or None)."""
+    global _shared_memo
+    memo, _shared_memo = _shared_memo, None
+    return memo
+
+
+def get_memo():
+    """Returns the shared LineMemo, or None if disabled."""
+    return _shared_memo
@@ -0,0 +1,242 @@
+"""
+Optional persistent cache of parsed songs, stored in SQLite, so that repeated batch runs
+over unchanged files skip line classification and tokenization.
+Each file's chord-line index (line number, column, pitch class and suffixes of every chord)
+is keyed by its path and checked against its size, modification time and content hash.
+Lookups only read the database: new entries and last used times are held in memory and
+written in a single transaction by flush(), which a batch run calls once at its end.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from optparse import OptionParser
+
+import chord
+import ctransposer
+
+DEFAULT_MAX_ENTRIES = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    chords TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS songs_last_used ON songs (last_used);
+"""
+
+
+def get_content_hash(song):
+    """Returns the SHA-256 hex digest of a song (list of strings)."""
+    sha = hashlib.sha256()
+    for line in song:
+        sha.update(line.encode('utf-8', 'surrogateescape'))
+    return sha.hexdigest()
+
+
+def encode_chords(chords_dict):
+    """
+    Returns the chords dictionary structure as a JSON list of [line_no, column, index, suffixes] rows.
+    Suffixes include any sub-chord; invalid chords have index 0 and their text as suffixes.
+    """
+    rows = []
+    for line_no, chord_list in sorted(chords_dict.items()):
+        for chord_obj, col in chord_list:
+            if chord_obj.is_valid():
+                rows.append([line_no, col, chord_obj.get_index(), chord_obj.get_suffixes()])
+            else:
+                rows.append([line_no, col, 0, chord_obj.get_chord_text()])
+    return json.dumps(rows, separators=(',', ':'))
+
+
+def decode_chords(text):
+    """Returns the chords dictionary structure from encode_chords() text, using interned chords."""
+    chords_dict = {}
+    for line_no, col, index, suffixes in json.loads(text):
+        if index:
+            chord_obj = chord.intern_chord(chord.SCALE_MAP[index][0] + suffixes)
+        else:
+            chord_obj = chord.intern_chord(suffixes)
+        chords_dict.setdefault(line_no, []).append([chord_obj, col])
+    return chords_dict
+
+
+class ParseCache(object):
+    """
+    SQLite-backed cache of chord-line indexes. Entries beyond max_entries are evicted, least
+    recently used first. Can be used as a context manager, which closes the connection.
+    """
+
+    def __init__(self, db_path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Rows to store and {path: mtime_ns} of hits, both by absolute path, waiting for flush().
+        self.pending = {}
+        self.used = {}
+        # Allow for other processes writing at the same time.
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Writes any pending changes (see flush) and closes the database connection."""
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+    def get(self, path, song):
+        """
+        Returns the cached chords dictionary structure for the file at path, which has been read
+        into song (list of strings), or None if it is not cached or the file has changed.
+        """
+        file_stat = os.stat(path)
+        abs_path = os.path.abspath(path)
+        row = self.pending.get(abs_path)
+        if row is None:
+            row = self.connection.execute("SELECT path, size, mtime_ns, hash, chords FROM songs WHERE path = ?",
+                                          (abs_path,)).fetchone()
+        # An unchanged size and modification time is trusted, otherwise the content must match.
+        if row is None or row[1] != file_stat.st_size or \
+                (row[2] != file_stat.st_mtime_ns and row[3] != get_content_hash(song)):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.used[abs_path] = file_stat.st_mtime_ns
+        return decode_chords(row[4])
+
+    def put(self, path, song, chords_dict):
+        """
+        Stores the chords dictionary structure for the file at path, which has been read into song,
+        when changes are next flushed.
+        """
+        file_stat = os.stat(path)
+        abs_path = os.path.abspath(path)
+        self.pending[abs_path] = (abs_path, file_stat.st_size, file_stat.st_mtime_ns, get_content_hash(song),
+                                  encode_chords(chords_dict), time.time())
+        self.used.pop(abs_path, None)
+
+    def get_song_chords(self, path, song, collector=None):
+        """
+        Returns the chords dictionary structure for the file at path, which has been read into song,
+        parsing it with get_chords_from_song() and storing the result only if it is not cached.
+        Invalid chords, cached or not, are recorded into collector (a diagnostics.Diagnostics) if given.
+        """
+        chords_dict = self.get(path, song)
+        if chords_dict is None:
+            chords_dict = ctransposer.get_chords_from_song(song, collector, path)
+            self.put(path, song, chords_dict)
+        elif collector is not None:
+            collector.record_invalid_chords(chords_dict, path)
+        return chords_dict
+
+    def take_updates(self):
+        """
+        Returns and forgets the pending changes as (rows, [(path, mtime_ns), ...]), so that a worker
+        process can pass them to the process which writes them (see add_updates).
+        """
+        updates = (list(self.pending.values()), list(self.used.items()))
+        self.pending = {}
+        self.used = {}
+        return updates
+
+    def add_updates(self, updates):
+        """Adds pending changes returned by take_updates() in another process."""
+        rows, used = updates
+        for row in rows:
+            self.pending[row[0]] = row
+        self.used.update(used)
+
+    def flush(self):
+        """
+        Writes the pending entries and the last used time of every hit in a single transaction, then
+        evicts the least recently used entries beyond max_entries.
+        """
+        if not self.pending and not self.used:
+            return
+        now = time.time()
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO songs VALUES (?, ?, ?, ?, ?, ?)",
+                                        self.pending.values())
+            self.connection.executemany("UPDATE songs SET mtime_ns = ?, last_used = ? WHERE path = ?",
+                                        [(mtime_ns, now, path) for path, mtime_ns in self.used.items()])
+            self.connection.execute("DELETE FROM songs WHERE path IN (SELECT path FROM songs "
+                                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        self.pending = {}
+        self.used = {}
+
+    def invalidate(self, path=None):
+        """Removes the entry for path, or every entry if path is None. Returns the number removed."""
+        self.flush()
+        with self.connection:
+            if path is None:
+                return self.connection.execute("DELETE FROM songs").rowcount
+            return self.connection.execute("DELETE FROM songs WHERE path = ?", (os.path.abspath(path),)).rowcount
+
+    def entries(self):
+        """
+        Returns a list of (path, size, mtime_ns, hash, chord count, last_used) for every entry, after
+        writing any pending changes.
+        """
+        self.flush()
+        return [(path, size, mtime_ns, content_hash, len(json.loads(chords)), last_used)
+                for path, size, mtime_ns, content_hash, chords, last_used in
+                self.connection.execute("SELECT * FROM songs ORDER BY path")]
+
+    def get_stats(self):
+        """Returns the number of entries (after writing any pending changes), hits and misses as a dictionary."""
+        self.flush()
+        entries = self.connection.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+        return {'entries': entries, 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options and the cache file. """
+    ops = OptionParser(usage="parse_cache.py [options] CACHE_FILE")
+    ops.add_option("--list", action="store_true", dest="list", default=False,
+                   help="List the cached files.")
+    ops.add_option("--invalidate", action="append", dest="invalidate", default=[],
+                   help="Remove the cache entry for a file. May be repeated.")
+    ops.add_option("--clear", action="store_true", dest="clear", default=False,
+                   help="Remove every cache entry.")
+
+    options, args = ops.parse_args()
+    if len(args) != 1:
+        ops.error("A single cache file must be specified.")
+    return options, args[0]
+
+
+def main():
+    """
+    Inspects or invalidates a cache file.
+    """
+    options, db_path = handle_options()
+    with ParseCache(db_path) as cache:
+        if options.clear:
+            print("Removed {} entries.".format(cache.invalidate()))
+        for path in options.invalidate:
+            print("Removed {} entries for {}.".format(cache.invalidate(path), path))
+        if options.list:
+            for path, size, mtime_ns, content_hash, chord_count, last_used in cache.entries():
+                print("{}\t{} bytes\t{} chords\t{}".format(path, size, chord_count, content_hash[:12]))
+        print(json.dumps(cache.get_stats()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
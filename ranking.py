@@ -0,0 +1,118 @@
+"""
+Difficulty ranking for whole catalogues of songs, using NumPy when it is installed
+and falling back to pure Python when it isn't.
+"""
+from collections import defaultdict
+from itertools import chain, count
+from operator import itemgetter
+
+import chord
+import ctransposer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class DifficultyTable(object):
+    """
+    Difficulty lookup table indexed by chord quality and pitch class (0-11, where 0 is A).
+    A quality is a chord with its root moved to A, so C7 and D7 share a quality, as do C/B and D/C#.
+    """
+
+    def __init__(self):
+        self.quality_ids = {}
+        self.rows = []
+
+    def get_quality_id(self, chord_obj):
+        """Returns the id of the chord's quality, adding a table row the first time it is seen."""
+        quality = chord_obj.transpose(1 - chord_obj.get_index())
+        if quality not in self.quality_ids:
+            self.quality_ids[quality] = len(self.rows)
+            self.rows.append(tuple(quality.transpose(pitch_class).get_difficulty()
+                                   for pitch_class in range(chord.ST_IN_OCTAVE)))
+        return self.quality_ids[quality]
+
+    def encode_song(self, chords_dict):
+        """
+        Encodes the valid chords in a dictionary structure from get_chords_from_song()
+        as parallel lists of pitch classes and quality ids.
+        """
+        pitch_classes = []
+        quality_ids = []
+        for line_no, chord_list in chords_dict.items():
+            for chord_obj, col in chord_list:
+                code = self.get_chord_code(chord_obj)
+                if code is not None:
+                    pitch_classes.append(code[0])
+                    quality_ids.append(code[1])
+        return pitch_classes, quality_ids
+
+    def get_chord_code(self, chord_obj):
+        """Returns the chord's (pitch class, quality id), or None if it is invalid."""
+        if type(chord_obj) in ctransposer.CHORD_TYPES and chord_obj.is_valid():
+            return chord_obj.get_index() - 1, self.get_quality_id(chord.intern_chord(chord_obj.get_chord_text()))
+        return None
+
+
+def difficulty_matrix(songs, use_numpy=None):
+    """
+    Returns the (songs x 12 offsets) matrix of total difficulties for a list of songs, each being a
+    dictionary structure from get_chords_from_song(). Row i is the difficulty vector of songs[i].
+    :param use_numpy: True/False to force the backend. Default (None) uses NumPy if it is installed.
+    :return: a NumPy array if NumPy was used, otherwise a list of lists.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if not use_numpy:
+        return [ctransposer.get_difficulty_vector(chords_dict) for chords_dict in songs]
+    if numpy is None:
+        raise ImportError("NumPy is not installed")
+
+    # Tokens are numbered by distinct chord object with C-level maps, so Python code only runs once per
+    # distinct chord (to encode it) and the per-token lookups and sums are vectorised.
+    chord_ids = defaultdict(count().__next__)
+    get_chord = itemgetter(0)
+    token_ids = []
+    song_lengths = []
+    for chords_dict in songs:
+        token_count = len(token_ids)
+        token_ids.extend(map(chord_ids.__getitem__, map(get_chord, chain.from_iterable(chords_dict.values()))))
+        song_lengths.append(len(token_ids) - token_count)
+
+    matrix = numpy.zeros((len(songs), chord.ST_IN_OCTAVE), dtype=numpy.int64)
+    if not token_ids:
+        return matrix
+    table = DifficultyTable()
+    pitch_classes = numpy.zeros(len(chord_ids), dtype=numpy.intp)
+    # Chords which aren't scored keep quality id -1: a row of zeros added after the table is complete.
+    quality_ids = numpy.full(len(chord_ids), -1, dtype=numpy.intp)
+    for chord_obj, chord_id in chord_ids.items():
+        code = table.get_chord_code(chord_obj)
+        if code is not None:
+            pitch_classes[chord_id], quality_ids[chord_id] = code
+    difficulties = numpy.array(table.rows + [(0,) * chord.ST_IN_OCTAVE], dtype=numpy.int64)
+    offsets = (pitch_classes[:, None] + numpy.arange(chord.ST_IN_OCTAVE)) % chord.ST_IN_OCTAVE
+    chord_rows = difficulties[quality_ids[:, None], offsets]
+
+    token_ids = numpy.array(token_ids, dtype=numpy.intp)
+    song_ids = numpy.repeat(numpy.arange(len(songs)), song_lengths)
+    for offset in range(chord.ST_IN_OCTAVE):
+        matrix[:, offset] = numpy.bincount(song_ids, weights=chord_rows[token_ids, offset], minlength=len(songs))
+    return matrix
+
+
+def best_offsets(songs, max_semitones_down=0, max_semitones_up=5, use_numpy=None):
+    """
+    Returns the easiest semitone offset for each song within the limits set, preferring the first found on
+    a tie as get_lowest_difficulty() does. Returns an empty list if the limits are empty.
+    """
+    offsets = list(range(max_semitones_down, max_semitones_up + 1))
+    if not offsets:
+        return []
+    matrix = difficulty_matrix(songs, use_numpy)
+    columns = [offset % chord.ST_IN_OCTAVE for offset in offsets]
+    if numpy is not None and isinstance(matrix, numpy.ndarray):
+        return [offsets[column] for column in matrix[:, columns].argmin(axis=1).tolist()]
+    return [offsets[min(range(len(columns)), key=lambda i: vector[columns[i]])] for vector in matrix]
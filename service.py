@@ -0,0 +1,280 @@
+"""
+Local asyncio HTTP service for transposing songs, using only the standard library.
+Parsed songs are kept in an LRU cache keyed by a hash of their text, so repeat requests
+for the same song skip parsing entirely.
+
+Endpoints (JSON request and response bodies):
+    POST /transpose  {"song": text, "semitones": n}
+    POST /auto       {"song": text, "max_semitones_down": n, "max_semitones_up": n}
+    POST /keys       {"song": text} - the difficulty and text of the song in all 12 keys
+    POST /batch      {"songs": [text, ...], "semitones": n, "auto": bool} - run in an executor
+    GET  /stats      cache size, hits and misses, and line memo hit rate
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from optparse import OptionParser
+
+import chord
+import ctransposer
+import line_memo
+import songtemplate
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_LINE_MEMO_MB = 16
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    """Error returned to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+
+
+def split_song_text(text):
+    """Splits song text into a list of lines the same way as reading a file with readlines()."""
+    return io.StringIO(text, newline='\n').readlines()
+
+
+class SongCache(object):
+    """Bounded LRU cache of SongTemplates keyed by the SHA-256 hash of the song text."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_template(self, text):
+        """Returns the template for the song text, parsing it only if it is not cached."""
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        template = self.templates.get(key)
+        if template is not None:
+            self.hits += 1
+            self.templates.move_to_end(key)
+            return template
+
+        self.misses += 1
+        template = songtemplate.compile_song(split_song_text(text))
+        self.templates[key] = template
+        if len(self.templates) > self.max_entries:
+            self.templates.popitem(last=False)
+        return template
+
+    def get_stats(self):
+        """Returns the cache counters as a dictionary."""
+        return {'entries': len(self.templates), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
+
+
+def transpose_batch(songs, semitones=0, auto=False, line_memo_bytes=None):
+    """
+    Transposes a list of song texts, returning a list of texts. Runs in an executor process, enabling
+    a line memo there with the memory cap line_memo_bytes if given and not already enabled.
+    """
+    if line_memo_bytes and line_memo.get_memo() is None:
+        line_memo.enable(line_memo_bytes)
+    return ["".join(ctransposer.transpose_song(split_song_text(text), semitones, auto)) for text in songs]
+
+
+class TranspositionService(object):
+    """Request handlers and HTTP plumbing for the transposition service."""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, executor=None, line_memo_bytes=None):
+        self.cache = SongCache(cache_size)
+        self.executor = executor
+        self.line_memo_bytes = line_memo_bytes
+        self.routes = {('POST', '/transpose'): self.handle_transpose,
+                       ('POST', '/auto'): self.handle_auto,
+                       ('POST', '/keys'): self.handle_keys,
+                       ('POST', '/batch'): self.handle_batch,
+                       ('GET', '/stats'): self.handle_stats}
+
+    @staticmethod
+    def _get_song(request):
+        """Returns the song text from a request, which must be a string."""
+        song = request.get('song')
+        if not isinstance(song, str):
+            raise HTTPError(400, "'song' must be a string")
+        return song
+
+    @staticmethod
+    def _get_int(request, name, default):
+        """Returns an integer parameter from a request. JSON true and false are not integers."""
+        value = request.get(name, default)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise HTTPError(400, "'{}' must be an integer".format(name))
+        return value
+
+    async def handle_transpose(self, request):
+        """Returns the song transposed by the semitones requested."""
+        template = self.cache.get_template(self._get_song(request))
+        return {'song': template.render(self._get_int(request, 'semitones', 0))}
+
+    async def handle_auto(self, request):
+        """Returns the song in its easiest key within the limits requested, with the semitones and difficulty."""
+        template = self.cache.get_template(self._get_song(request))
+        semitones, difficulty = ctransposer.find_lowest_difficulty(
+            template.get_difficulty_vector(),
+            self._get_int(request, 'max_semitones_down', 0),
+            self._get_int(request, 'max_semitones_up', 5))
+        if semitones is None:
+            raise HTTPError(400, "No semitones within the limits")
+        return {'song': template.render(semitones), 'semitones': semitones, 'difficulty': difficulty}
+
+    async def handle_keys(self, request):
+        """
+        Returns the difficulty and text of the song transposed by 0 to 11 semitones, written with the
+        sharps or flats of each key if 'key_spelling' is set.
+        """
+        template = self.cache.get_template(self._get_song(request))
+        difficulty_vector = template.get_difficulty_vector()
+        songs = template.render_all_keys(bool(request.get('key_spelling')))
+        return {'keys': [{'semitones': semitones, 'difficulty': difficulty_vector[semitones],
+                          'song': songs[semitones]}
+                         for semitones in range(chord.ST_IN_OCTAVE)]}
+
+    async def handle_batch(self, request):
+        """Transposes a list of songs in the executor, as they are not cached."""
+        songs = request.get('songs')
+        if not isinstance(songs, list) or not all(isinstance(song, str) for song in songs):
+            raise HTTPError(400, "'songs' must be a list of strings")
+        loop = asyncio.get_event_loop()
+        results = await loop.run_in_executor(self.executor, transpose_batch, songs,
+                                             self._get_int(request, 'semitones', 0), bool(request.get('auto')),
+                                             self.line_memo_bytes)
+        return {'songs': results}
+
+    async def handle_stats(self, request):
+        """Returns the cache counters, and those of the line memo if enabled in this process."""
+        response = {'cache': self.cache.get_stats()}
+        memo = line_memo.get_memo()
+        if memo is not None:
+            response['line_memo'] = memo.get_stats()
+        return response
+
+    async def dispatch(self, method, path, body):
+        """Returns (status, response dictionary) for a request."""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for route_method, route_path in self.routes):
+                return 405, {'error': 'Method not allowed'}
+            return 404, {'error': 'Not found'}
+        try:
+            request = json.loads(body.decode('utf-8')) if body else {}
+            if not isinstance(request, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+            return 200, await handler(request)
+        except HTTPError as err:
+            return err.status, {'error': str(err)}
+        except ValueError as err:
+            return 400, {'error': "Invalid JSON: {}".format(err)}
+        except Exception:
+            logging.exception("Error handling %s %s", method, path)
+            return 500, {'error': 'Internal server error'}
+
+    async def handle_connection(self, reader, writer):
+        """Reads a single HTTP/1.1 request from the connection and writes the response."""
+        try:
+            status, response = await self._read_and_dispatch(reader)
+        except HTTPError as err:
+            status, response = err.status, {'error': str(err)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        body = json.dumps(response).encode('utf-8')
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n"
+                     "Connection: close\r\n\r\n".format(status, HTTP_REASONS.get(status, ''), len(body))
+                     .encode('latin-1') + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_and_dispatch(self, reader):
+        """Reads the request line, headers and body, returning (status, response dictionary)."""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, path = request_line[0].upper(), request_line[1].split('?', 1)[0]
+        content_length = 0
+        while True:
+            header = (await reader.readline()).decode('latin-1')
+            if header in ('\r\n', '\n', ''):
+                break
+            name, _, value = header.partition(':')
+            if name.strip().lower() == 'content-length':
+                try:
+                    content_length = int(value.strip())
+                except ValueError:
+                    raise HTTPError(400, "Invalid Content-Length")
+        if content_length > MAX_BODY_SIZE:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(content_length) if content_length else b''
+        return await self.dispatch(method, path, body)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Starts listening, returning the asyncio server."""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options. """
+    ops = OptionParser(usage="service.py [options]")
+    ops.add_option("--host", action="store", dest="host", default=DEFAULT_HOST,
+                   help="Address to listen on. Defaults to '%default'.")
+    ops.add_option("--port", "-p", action="store", dest="port", default=DEFAULT_PORT, type="int",
+                   help="Port to listen on. Defaults to '%default'.")
+    ops.add_option("--cache-size", action="store", dest="cache_size", default=DEFAULT_CACHE_SIZE, type="int",
+                   help="Number of parsed songs to cache. Defaults to '%default'.")
+    ops.add_option("--workers", "-w", action="store", dest="workers", default=None, type="int",
+                   help="Worker processes for batch requests. Defaults to one per CPU.")
+    ops.add_option("--line-memo-mb", action="store", dest="line_memo_mb", default=DEFAULT_LINE_MEMO_MB,
+                   type="int", help="Memory cap in MB of each process's memo of parsed lines, shared "
+                                    "across songs. 0 disables it. Defaults to '%default'.")
+
+    options, _ = ops.parse_args()
+    return options
+
+
+def serve(options):
+    """Runs the service until interrupted."""
+    memo_bytes = options.line_memo_mb * 1024 * 1024
+    if memo_bytes:
+        line_memo.enable(memo_bytes)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    with ProcessPoolExecutor(max_workers=options.workers) as executor:
+        service = TranspositionService(options.cache_size, executor, memo_bytes)
+        server = loop.run_until_complete(service.start(options.host, options.port))
+        logging.info("Listening on %s:%d", options.host, options.port)
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+
+def main():
+    """
+    Service entry point.
+    """
+    serve(handle_options())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Setlist-wide capo and key optimizer. Each song's shape difficulty is computed once for the 12
+transpositions (see capo.get_shape_vector), then the capo and sounding key of every song are chosen
+together by dynamic programming over the set order, limiting and penalising capo changes between songs.
+"""
+import json
+import logging
+import sys
+from optparse import OptionParser
+
+import capo
+import chord
+import chordpro
+import ctransposer
+
+DEFAULT_SEMITONES_DOWN = 0
+DEFAULT_SEMITONES_UP = 0
+
+
+def get_song_vector(song, chord_pro=False):
+    """
+    Returns the shape difficulty of a song (list of strings) when its chords are transposed by 0 to 11 semitones.
+    If chord_pro is set, the song is ChordPro text with inline chords.
+    """
+    song_chords = chordpro.get_chords_from_chordpro(song) if chord_pro else ctransposer.get_chords_from_song(song)
+    return capo.get_shape_vector(capo.get_shape_counts(song_chords))
+
+
+def _get_capo_costs(vector, sounding_semitones, capos):
+    """
+    Returns [(difficulty, sounding), ...] by capo position for one song: the easiest sounding key within
+    sounding_semitones with each capo, or None for capos with no allowed key.
+    """
+    costs = []
+    for capo_fret in capos:
+        best = None
+        for sounding in sounding_semitones:
+            difficulty = vector[(sounding - capo_fret) % chord.ST_IN_OCTAVE]
+            if best is None or difficulty < best[0]:
+                best = (difficulty, sounding)
+        costs.append(best)
+    return costs
+
+
+def optimize_setlist(vectors, sounding_ranges=None, capos=range(capo.MAX_CAPO + 1), max_capo_changes=None,
+                     move_penalty=0):
+    """
+    Chooses a capo fret and sounding key for each song of a set, in order, minimising the total shape
+    difficulty plus move_penalty for each change of capo between songs.
+    :param vectors: Each song's difficulty when transposed by 0 to 11 semitones, eg: from get_song_vector().
+    :param sounding_ranges: Allowed sounding keys for each song, as semitones from the original (eg: a
+        singer's range). Default (None) keeps every song in its original key.
+    :param capos: Capo frets to consider.
+    :param max_capo_changes: Maximum number of capo changes between songs. Default (None) is no limit.
+    :param move_penalty: Added to the score for each capo change.
+    :return: dictionary with the score, capo_changes and songs: [{capo, sounding_semitones, shape_semitones,
+        difficulty}, ...] in set order. None if there are no songs or no choice meets the constraints.
+    """
+    capos = list(capos)
+    if not vectors or not capos:
+        return None
+    if sounding_ranges is None:
+        sounding_ranges = [(0,)] * len(vectors)
+    if len(sounding_ranges) != len(vectors):
+        raise ValueError("Expected {} sounding ranges, got {}".format(len(vectors), len(sounding_ranges)))
+    max_changes = len(vectors) - 1 if max_capo_changes is None else min(max_capo_changes, len(vectors) - 1)
+    song_costs = [_get_capo_costs(vector, list(sounding), capos) for vector, sounding in zip(vectors, sounding_ranges)]
+
+    # best[capo_no][changes] is the lowest score of the set so far ending with that capo after that many
+    # changes, or None. back[song_no][capo_no][changes] is the previous song's capo_no on that path.
+    best = [[None] * (max_changes + 1) for capo_fret in capos]
+    for capo_no, cost in enumerate(song_costs[0]):
+        if cost is not None:
+            best[capo_no][0] = cost[0]
+    back = [None]
+    for costs in song_costs[1:]:
+        new_best = [[None] * (max_changes + 1) for capo_fret in capos]
+        song_back = [[None] * (max_changes + 1) for capo_fret in capos]
+        for capo_no, cost in enumerate(costs):
+            if cost is None:
+                continue
+            for changes in range(max_changes + 1):
+                # Keeping the same capo...
+                choice = None
+                if best[capo_no][changes] is not None:
+                    choice = (best[capo_no][changes], capo_no)
+                # ...or moving it from any other.
+                if changes > 0:
+                    for prev_no, prev_scores in enumerate(best):
+                        prev_score = prev_scores[changes - 1]
+                        if prev_no != capo_no and prev_score is not None:
+                            score = prev_score + move_penalty
+                            if choice is None or score < choice[0]:
+                                choice = (score, prev_no)
+                if choice is not None:
+                    new_best[capo_no][changes] = choice[0] + cost[0]
+                    song_back[capo_no][changes] = choice[1]
+        best = new_best
+        back.append(song_back)
+
+    end = None
+    for capo_no, scores in enumerate(best):
+        for changes, score in enumerate(scores):
+            if score is not None and (end is None or score < end[0]):
+                end = (score, capo_no, changes)
+    if end is None:
+        return None
+
+    score, capo_no, changes = end
+    capo_changes = changes
+    songs = []
+    for song_no in range(len(vectors) - 1, -1, -1):
+        difficulty, sounding = song_costs[song_no][capo_no]
+        songs.append({'capo': capos[capo_no],
+                      'sounding_semitones': sounding,
+                      'shape_semitones': sounding - capos[capo_no],
+                      'difficulty': difficulty})
+        if song_no > 0:
+            prev_no = back[song_no][capo_no][changes]
+            if prev_no != capo_no:
+                changes -= 1
+            capo_no = prev_no
+    songs.reverse()
+    return {'score': score, 'capo_changes': capo_changes, 'songs': songs}
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options and song files in set order. """
+    ops = OptionParser(usage="setlist.py [options] FILE ...")
+    ops.add_option("--down", "-d", action="store", dest="semitones_down", default=DEFAULT_SEMITONES_DOWN,
+                   type="int", help="Semitones each song may be moved down. Defaults to '%default'.")
+    ops.add_option("--up", "-u", action="store", dest="semitones_up", default=DEFAULT_SEMITONES_UP,
+                   type="int", help="Semitones each song may be moved up. Defaults to '%default'.")
+    ops.add_option("--max-capo", action="store", dest="max_capo", default=capo.MAX_CAPO, type="int",
+                   help="Highest capo fret to use. Defaults to '%default'.")
+    ops.add_option("--max-changes", "-m", action="store", dest="max_changes", default=None, type="int",
+                   help="Maximum number of capo changes between songs. Defaults to no limit.")
+    ops.add_option("--move-penalty", "-p", action="store", dest="move_penalty", default=0, type="int",
+                   help="Difficulty added for each capo change. Defaults to '%default'.")
+
+    options, filenames = ops.parse_args()
+
+    if not filenames:
+        logging.error("No files specified - nothing to do!")
+        sys.exit(1)
+
+    return options, filenames
+
+
+def main():
+    """
+    Setlist entry point: prints the capo and key chosen for each song as JSON.
+    """
+    options, filenames = handle_options()
+    vectors = []
+    for filename in filenames:
+        with open(filename, mode='r') as song_file:
+            vectors.append(get_song_vector(song_file.readlines(), chordpro.is_chordpro_file(filename)))
+    sounding = range(-options.semitones_down, options.semitones_up + 1)
+    result = optimize_setlist(vectors, [sounding] * len(vectors), range(options.max_capo + 1),
+                              options.max_changes, options.move_penalty)
+    if result is None:
+        logging.error("No capo and key choices meet the constraints.")
+        sys.exit(1)
+    for filename, song in zip(filenames, result['songs']):
+        song['file'] = filename
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Memory-mapped reader for songbook files holding many songs, separated by form feeds or title lines.
+Only an index of song boundaries is built up front; each song is decoded when it is used.
+"""
+import io
+import mmap
+import re
+import sys
+from optparse import OptionParser
+
+import ctransposer
+
+SONG_SEPARATOR = b'\f'
+DEFAULT_ENCODING = 'utf-8'
+
+
+class Songbook(object):
+    """
+    Songs in a memory-mapped songbook file. A song starts at the beginning of the file, at the start of any
+    line containing a form feed and, if title_pattern is given, at any line matching it
+    (eg: r'Title:' or r'\\{title:'). Can be used as a context manager, which closes the file.
+    """
+
+    def __init__(self, path, title_pattern=None, encoding=DEFAULT_ENCODING):
+        self.path = path
+        self.encoding = encoding
+        self.title_pattern = re.compile(title_pattern.encode(encoding), re.MULTILINE) \
+            if isinstance(title_pattern, str) else title_pattern
+        self._file = open(path, mode='rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped.
+            self._map = b''
+        self.song_ranges = self._index_songs()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.song_ranges)
+
+    def __iter__(self):
+        for song_no in range(len(self.song_ranges)):
+            yield self.get_song(song_no)
+
+    def close(self):
+        """Unmaps and closes the file."""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _index_songs(self):
+        """Returns a list of (start, end) byte offsets of each non-empty song."""
+        size = len(self._map)
+        starts = {0}
+        position = self._map.find(SONG_SEPARATOR)
+        while position != -1:
+            starts.add(self._map.rfind(b'\n', 0, position) + 1)
+            position = self._map.find(SONG_SEPARATOR, position + 1)
+        if self.title_pattern is not None:
+            for match in self.title_pattern.finditer(self._map):
+                starts.add(self._map.rfind(b'\n', 0, match.start()) + 1)
+
+        boundaries = sorted(starts) + [size]
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+    def get_song(self, song_no):
+        """Returns the lines of a song as a list of strings, decoding only that song."""
+        start, end = self.song_ranges[song_no]
+        text = self._map[start:end].decode(self.encoding)
+        return io.StringIO(text, newline='\n').readlines()
+
+    def iter_transposed_songs(self, semitones=0, auto=False):
+        """Yields each song transposed independently, as lists of strings (see ctransposer.transpose_song)."""
+        for song in self:
+            yield ctransposer.transpose_song(song, semitones, auto)
+
+    def write_transposed(self, output_file, semitones=0, auto=False):
+        """Writes every song, transposed independently, to a text file object. Returns the number of songs."""
+        song_count = 0
+        for transposed_song in self.iter_transposed_songs(semitones, auto):
+            output_file.writelines(transposed_song)
+            song_count += 1
+        return song_count
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options and the songbook file. """
+    ops = OptionParser(usage="songbook.py [options] SONGBOOK")
+    ops.add_option("--output", "-o", action="store", dest="output", default="",
+                   help="File to write the transposed songbook to. Defaults to stdout.")
+    ops.add_option("--semitones", "-s", action="store",
+                   dest="semitones", default=0, type="int",
+                   help="Positive/negative semitones by which to transpose every song. "
+                        "Defaults to '%default', unless --auto specified.")
+    ops.add_option("--auto", "-a", action="store_true", dest="auto", default=False,
+                   help="Transpose each song to a key which is easy to play using open chords.")
+    ops.add_option("--title-pattern", "-t", action="store", dest="title_pattern", default=None,
+                   help="Regular expression matching the start of lines which begin a new song.")
+    ops.add_option("--encoding", action="store", dest="encoding", default=DEFAULT_ENCODING,
+                   help="Songbook text encoding. Defaults to '%default'.")
+
+    options, args = ops.parse_args()
+    if len(args) != 1:
+        ops.error("A single songbook file must be specified.")
+    return options, args[0]
+
+
+def main():
+    """
+    Transposes every song in a songbook.
+    """
+    options, path = handle_options()
+    title_pattern = '^(?:' + options.title_pattern + ')' if options.title_pattern else None
+    with Songbook(path, title_pattern, options.encoding) as songbook:
+        if options.output:
+            with open(options.output, mode='w', encoding=options.encoding) as output_file:
+                songbook.write_transposed(output_file, options.semitones, options.auto)
+        else:
+            songbook.write_transposed(sys.stdout, options.semitones, options.auto)
+
+
+if __name__ == '__main__':
+    main()
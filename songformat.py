@@ -0,0 +1,240 @@
+"""
+Compact, versioned serialization of parsed songs, so that other processes (indexers, rankers,
+renderers) can load the chords dictionary structure from get_chords_from_song() without re-parsing.
+
+Each chord is a row of (column, index, suffix id, sub-chord index[, sub-chord suffix id]): indexes
+are the chord's semitone index (1-12, see chord.SCALE_MAP) with 0 for no sub-chord, and suffix ids
+index a table of distinct suffix strings. Chords which can't be split this way (eg: invalid chords)
+have index 0 and the id of their whole text, which is parsed again when loaded.
+
+JSON form: {"version": 1, "suffixes": [...], "chord_lines": [[line_no, [row, ...]], ...]}
+Binary form: the header MAGIC, version, suffix count and chord line count, then each suffix as a length
+and UTF-8 bytes, then each chord line as its line number and row count followed by fixed size rows of
+(column, index, sub-chord index, suffix id, sub-chord suffix id).
+"""
+import json
+import logging
+import struct
+import sys
+from optparse import OptionParser
+
+import chord
+import chordpro
+import ctransposer
+
+FORMAT_VERSION = 1
+MAGIC = b'CTPS'
+
+HEADER = struct.Struct('<4sBHI')
+SUFFIX_LENGTH = struct.Struct('<H')
+LINE_HEADER = struct.Struct('<IH')
+ROW = struct.Struct('<HBBHH')
+# Largest values of the binary form's unsigned 16 and 32 bit fields.
+MAX_SHORT = 0xFFFF
+MAX_INT = 0xFFFFFFFF
+
+
+def _get_rows(chords_dict):
+    """
+    Returns (suffixes, [(line_no, col, index, suffix_id, sub_index, sub_suffix_id), ...]) for a chords
+    dictionary structure, in line and column order.
+    """
+    suffixes = ['']
+    suffix_ids = {'': 0}
+
+    def get_suffix_id(text):
+        """Returns the id of a suffix string, adding it to the table the first time it is seen."""
+        if text not in suffix_ids:
+            suffix_ids[text] = len(suffixes)
+            suffixes.append(text)
+        return suffix_ids[text]
+
+    rows = []
+    for line_no in sorted(chords_dict):
+        for chord_obj, col in chords_dict[line_no]:
+            if type(chord_obj) is not chord.FrozenChord:
+                chord_obj = chord.intern_chord(chord_obj.get_chord_text())
+            sub_chord = chord_obj.get_sub_chord()
+            if not chord_obj.is_valid() or (sub_chord is not None and (not sub_chord.is_valid() or
+                                                                       sub_chord.get_sub_chord() is not None)):
+                rows.append((line_no, col, 0, get_suffix_id(chord_obj.get_chord_text()), 0, 0))
+                continue
+            suffix_id = get_suffix_id(chord_obj.get_suffixes().split(chord.DEFAULT_SUB_SEP)[0])
+            if sub_chord is None:
+                rows.append((line_no, col, chord_obj.get_index(), suffix_id, 0, 0))
+            else:
+                rows.append((line_no, col, chord_obj.get_index(), suffix_id,
+                             sub_chord.get_index(), get_suffix_id(sub_chord.get_suffixes())))
+    return suffixes, rows
+
+
+def _load_rows(suffixes, rows):
+    """
+    Returns the chords dictionary structure for (line_no, col, index, suffix_id, sub_index, sub_suffix_id)
+    rows, with interned chords, each distinct chord being built once.
+    """
+    chords_dict = {}
+    chords = {}
+    for line_no, col, index, suffix_id, sub_index, sub_suffix_id in rows:
+        chord_key = (index, suffix_id, sub_index, sub_suffix_id)
+        chord_obj = chords.get(chord_key)
+        if chord_obj is None:
+            if index == 0:
+                chord_obj = chord.intern_chord(suffixes[suffix_id])
+            else:
+                sub_chord = chord.intern_chord_parts(sub_index, suffixes[sub_suffix_id]) if sub_index else None
+                chord_obj = chord.intern_chord_parts(index, suffixes[suffix_id], sub_chord)
+            chords[chord_key] = chord_obj
+        chord_list = chords_dict.get(line_no)
+        if chord_list is None:
+            chord_list = chords_dict[line_no] = []
+        chord_list.append([chord_obj, col])
+    return chords_dict
+
+
+def _check_version(version):
+    """Raises ValueError for versions other than FORMAT_VERSION."""
+    if version != FORMAT_VERSION:
+        raise ValueError("Unsupported parsed song version: {}".format(version))
+
+
+def _group_rows(rows):
+    """Returns [[line_no, [(col, index, suffix_id, sub_index, sub_suffix_id), ...]], ...] from _get_rows()."""
+    chord_lines = []
+    for line_no, col, index, suffix_id, sub_index, sub_suffix_id in rows:
+        if not chord_lines or chord_lines[-1][0] != line_no:
+            chord_lines.append([line_no, []])
+        chord_lines[-1][1].append((col, index, suffix_id, sub_index, sub_suffix_id))
+    return chord_lines
+
+
+def to_dict(chords_dict):
+    """Returns the JSON-serializable form of a chords dictionary structure."""
+    suffixes, rows = _get_rows(chords_dict)
+    chord_lines = [[line_no, [list(row) if row[4] else list(row[:4]) for row in line_rows]]
+                   for line_no, line_rows in _group_rows(rows)]
+    return {'version': FORMAT_VERSION, 'suffixes': suffixes, 'chord_lines': chord_lines}
+
+
+def from_dict(data):
+    """Returns the chords dictionary structure from the form returned by to_dict()."""
+    _check_version(data.get('version'))
+    suffixes = data['suffixes']
+    rows = []
+    for line_no, chord_rows in data['chord_lines']:
+        for row in chord_rows:
+            rows.append((line_no, row[0], row[1], row[2], row[3], row[4] if len(row) > 4 else 0))
+    return _load_rows(suffixes, rows)
+
+
+def to_json(chords_dict):
+    """Returns a chords dictionary structure serialized as a JSON string."""
+    return json.dumps(to_dict(chords_dict), separators=(',', ':'))
+
+
+def from_json(text):
+    """Returns the chords dictionary structure from a JSON string produced by to_json()."""
+    return from_dict(json.loads(text))
+
+
+def _check_limit(name, value, limit):
+    """Raises ValueError if value is too large for a field of the binary form."""
+    if value > limit:
+        raise ValueError("Song too large for the binary form: {} {} is over {}".format(name, value, limit))
+
+
+def to_bytes(chords_dict):
+    """
+    Returns a chords dictionary structure serialized in the binary form.
+    Raises ValueError for songs with values too large for its fields, eg: a chord past column 65535.
+    """
+    suffixes, rows = _get_rows(chords_dict)
+    chord_lines = _group_rows(rows)
+    _check_limit('suffix count', len(suffixes), MAX_SHORT)
+    _check_limit('chord line count', len(chord_lines), MAX_INT)
+    _check_limit('column', max((row[1] for row in rows), default=0), MAX_SHORT)
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(suffixes), len(chord_lines))]
+    for suffix in suffixes:
+        encoded = suffix.encode('utf-8')
+        _check_limit('suffix length', len(encoded), MAX_SHORT)
+        parts.append(SUFFIX_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    for line_no, line_rows in chord_lines:
+        _check_limit('line number', line_no, MAX_INT)
+        _check_limit('chords on line', len(line_rows), MAX_SHORT)
+        parts.append(LINE_HEADER.pack(line_no, len(line_rows)))
+        for col, index, suffix_id, sub_index, sub_suffix_id in line_rows:
+            parts.append(ROW.pack(col, index, sub_index, suffix_id, sub_suffix_id))
+    return b''.join(parts)
+
+
+def from_bytes(data):
+    """Returns the chords dictionary structure from bytes produced by to_bytes()."""
+    try:
+        magic, version, suffix_count, line_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a parsed song")
+        _check_version(version)
+        view = memoryview(data)
+        offset = HEADER.size
+        suffixes = []
+        for suffix_no in range(suffix_count):
+            length = SUFFIX_LENGTH.unpack_from(view, offset)[0]
+            offset += SUFFIX_LENGTH.size
+            suffixes.append(bytes(view[offset:offset + length]).decode('utf-8'))
+            offset += length
+        rows = []
+        for chord_line_no in range(line_count):
+            line_no, row_count = LINE_HEADER.unpack_from(view, offset)
+            offset += LINE_HEADER.size
+            rows_end = offset + ROW.size * row_count
+            if len(view) < rows_end:
+                raise ValueError("Parsed song is truncated")
+            rows.extend((line_no, col, index, suffix_id, sub_index, sub_suffix_id)
+                        for col, index, sub_index, suffix_id, sub_suffix_id in ROW.iter_unpack(view[offset:rows_end]))
+            offset = rows_end
+    except struct.error as err:
+        raise ValueError("Parsed song is truncated: {}".format(err))
+    return _load_rows(suffixes, rows)
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options. """
+    ops = OptionParser(usage="songformat.py [options]")
+    ops.add_option("--file", "-f", action="store", dest="filename", default="",
+                   help="Text file containing *single* song.")
+    ops.add_option("--output", "-o", action="store", dest="output", default="",
+                   help="File to write the parsed song to.")
+    ops.add_option("--json", "-j", action="store_true", dest="json", default=False,
+                   help="Write the JSON form rather than the binary form.")
+
+    options, _ = ops.parse_args()
+
+    if options.filename == '' or options.output == '':
+        logging.error("--file and --output must be specified - nothing to do!")
+        sys.exit(1)
+
+    return options
+
+
+def main():
+    """
+    Parses a song file and writes it in the compact parsed form.
+    """
+    options = handle_options()
+    with open(options.filename, mode='r') as song_file:
+        song = song_file.readlines()
+    if chordpro.is_chordpro_file(options.filename):
+        chords_dict = chordpro.get_chords_from_chordpro(song)
+    else:
+        chords_dict = ctransposer.get_chords_from_song(song)
+    if options.json:
+        with open(options.output, mode='w') as output_file:
+            output_file.write(to_json(chords_dict))
+    else:
+        with open(options.output, mode='wb') as output_file:
+            output_file.write(to_bytes(chords_dict))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Seeded generator of synthetic chord sheets, used for benchmarking.
+The same seed and parameters always produce the same song.
+"""
+import random
+
+import chord
+
+CHORD_SUFFIXES = ['', '', '', 'm', 'm', '7', 'm7', 'maj7', 'sus2', 'sus4', 'add9']
+LYRIC_WORDS = ['love', 'the', 'night', 'is', 'over', 'and', 'I', 'will', 'walk', 'home', 'through', 'rain',
+               'you', 'know', 'my', 'heart', 'river', 'light', 'gone', 'again']
+# Lyrics made of words starting with chord letters, which is_chord_line() may mistake for chords.
+CHORD_LIKE_WORDS = ['A', 'a', 'bad', 'egg', 'Be', 'Cafe', 'dead', 'face', 'Good', 'Bag', 'Ed', 'fed']
+MARKERS = ['Chorus:', 'Bridge', 'Capo 2', 'Capo 4', '(Chorus)']
+
+
+def generate_chord(rand, sub_chord_rate=0.1):
+    """Returns random chord text, sometimes with a sub-chord (eg: C/B)."""
+    text = rand.choice(chord.DEFAULT_CHORD_ROOTS) + rand.choice(CHORD_SUFFIXES)
+    if rand.random() < sub_chord_rate:
+        text += chord.DEFAULT_SUB_SEP + rand.choice(chord.DEFAULT_CHORD_ROOTS)
+    return text
+
+
+def generate_chord_line(rand, width=60, chord_density=0.5, sub_chord_rate=0.1, trailing_space_rate=0.5):
+    """
+    Returns a line of chords spread across the width, more densely as chord_density approaches 1.
+    Like many hand-edited chord sheets, some lines (trailing_space_rate of them) keep the spaces after
+    their last chord; the rest end with a chord.
+    """
+    line = ''
+    while True:
+        chord_text = generate_chord(rand, sub_chord_rate)
+        if len(line) + len(chord_text) > width:
+            break
+        line += chord_text
+        gap = max(1, int(rand.expovariate(chord_density) * 4))
+        line += ' ' * gap
+    if rand.random() >= trailing_space_rate:
+        line = line.rstrip(' ')
+    return line + '\n'
+
+
+def generate_lyric_line(rand, width=60, chord_like_rate=0.05):
+    """Returns a line of lyrics, occasionally made of words which look like chords."""
+    words = CHORD_LIKE_WORDS if rand.random() < chord_like_rate else LYRIC_WORDS
+    line = rand.choice(words)
+    while len(line) < width - 10:
+        line += ' ' + rand.choice(words)
+    return line + '\n'
+
+
+def generate_song(seed, lines=40, chord_density=0.5, sub_chord_rate=0.1, chord_like_rate=0.05, marker_rate=0.05,
+                  trailing_space_rate=0.5):
+    """
+    Returns a synthetic song as a list of strings: alternating chord and lyric lines with
+    occasional blank lines and Chorus/Capo style markers.
+    :param seed: Random seed, so that songs can be regenerated exactly.
+    :param lines: Number of lines in the song.
+    :param chord_density: 0-1, roughly how closely chords are packed on chord lines.
+    :param sub_chord_rate: Proportion of chords with a sub-chord, eg: C/B.
+    :param chord_like_rate: Proportion of lyric lines which look like chords.
+    :param marker_rate: Proportion of lines which are markers such as 'Chorus:' or 'Capo 2'.
+    :param trailing_space_rate: Proportion of chord lines with spaces after their last chord.
+    """
+    rand = random.Random(seed)
+    song = []
+    while len(song) < lines:
+        roll = rand.random()
+        if roll < marker_rate:
+            song.append(rand.choice(MARKERS) + '\n')
+        elif roll < marker_rate + 0.05:
+            song.append('\n')
+        else:
+            song.append(generate_chord_line(rand, chord_density=chord_density, sub_chord_rate=sub_chord_rate,
+                                            trailing_space_rate=trailing_space_rate))
+            song.append(generate_lyric_line(rand, chord_like_rate=chord_like_rate))
+    return song[:lines]
+
+
+def generate_songbook(seed, songs=10, lines=40, **kwargs):
+    """Returns several synthetic songs as one list of strings, each song after the first starting with a form feed."""
+    songbook = []
+    for song_no in range(songs):
+        song = generate_song(seed + song_no, lines, **kwargs)
+        if song_no > 0:
+            song[0] = '\f' + song[0]
+        songbook.extend(song)
+    return songbook
@@ -0,0 +1,202 @@
+"""
+Compiled song templates: a song is parsed once into literal text spans and chord slots,
+after which any transposition is rendered by joining the spans with chord text from a table
+(see ctransposer.join_chord_spans). ChordPro songs keep their inline chords in brackets.
+"""
+import json
+
+import chord
+import chordpro
+import ctransposer
+import keys
+
+TEMPLATE_VERSION = 1
+
+
+class SongTemplate(object):
+    """
+    A parsed song. Each line is a list of parts: literal text at even positions and, on chord lines,
+    chord slots of [chord_id, width] at odd positions, eg: ['', [0, 2], '    ', [1, 1], '\\n'].
+    Chord ids index the chords list of distinct FrozenChords, from which each slot's pitch class and
+    suffixes are read. The width is the length of the chord text in the original line, so the column of
+    each slot is the total width of the parts before it.
+    If chord_pro is set, the song is ChordPro text: slots are inline chords, whose width includes their
+    brackets, and key directives are transposed with the song.
+    """
+
+    def __init__(self, lines, chords, chord_pro=False):
+        self.lines = lines
+        self.chords = chords
+        self.chord_pro = chord_pro
+        # For rendering, each line as its literal text, as (directive line,) or as (spans, chord ids, widths).
+        self._render_lines = []
+        for parts in lines:
+            if len(parts) == 1:
+                directive = chordpro.parse_directive(parts[0]) if chord_pro else None
+                if directive and directive[0] in chordpro.CHORD_DIRECTIVES:
+                    self._render_lines.append((parts[0],))
+                else:
+                    self._render_lines.append(parts[0])
+            else:
+                slots = parts[1::2]
+                self._render_lines.append((parts[0::2], [slot[0] for slot in slots], [slot[1] for slot in slots]))
+
+    @classmethod
+    def compile(cls, song):
+        """Returns the template for a song (list of strings)."""
+        chords = []
+        chord_ids = {}
+        lines = []
+        for line in song:
+            chord_tokens = ctransposer.parse_chord_line(line)
+            if chord_tokens is None:
+                lines.append([line])
+                continue
+            parts = []
+            end = 0
+            # Any trailing newline stays in the literal text, as widths exclude it.
+            for chord_obj, col, width in chord_tokens:
+                if chord_obj not in chord_ids:
+                    chord_ids[chord_obj] = len(chords)
+                    chords.append(chord_obj)
+                parts.append(line[end:col])
+                parts.append([chord_ids[chord_obj], width])
+                end = col + width
+            parts.append(line[end:])
+            lines.append(parts)
+        return cls(lines, chords)
+
+    @classmethod
+    def from_chords(cls, song, song_chords, chord_pro=False):
+        """
+        Returns the template for a song (list of strings) already parsed into song_chords by
+        ctransposer.get_chords_from_song(), or by chordpro.get_chords_from_chordpro() if chord_pro is set.
+        """
+        split_spans = chordpro.split_chordpro_spans if chord_pro else ctransposer.split_chord_line_spans
+        chords = []
+        chord_ids = {}
+        lines = []
+        for line_no, line in enumerate(song):
+            chord_list = song_chords.get(line_no)
+            if not chord_list:
+                lines.append([line])
+                continue
+            spans, widths = split_spans(line, chord_list)
+            parts = [spans[0]]
+            for (chord_obj, col), width, span in zip(chord_list, widths, spans[1:]):
+                if chord_obj not in chord_ids:
+                    chord_ids[chord_obj] = len(chords)
+                    chords.append(chord_obj)
+                parts.append([chord_ids[chord_obj], width])
+                parts.append(span)
+            lines.append(parts)
+        return cls(lines, chords, chord_pro)
+
+    def get_slots(self):
+        """
+        Returns a dictionary indexed by line number with values in the form:
+        [[chord_obj, column_chord_starts], [..], ...], as returned by ctransposer.get_chords_from_song().
+        """
+        slots = {}
+        for line_no, parts in enumerate(self.lines):
+            if len(parts) > 1:
+                chord_list = []
+                col = 0
+                for position, part in enumerate(parts):
+                    if position % 2:
+                        chord_list.append([self.chords[part[0]], col])
+                        col += part[1]
+                    else:
+                        col += len(part)
+                slots[line_no] = chord_list
+        return slots
+
+    def get_chord_texts(self, semitones=0, spelling=None):
+        """
+        Returns the chord text table for the transposition: the text of each chord by chord id, with sharp
+        names or as chosen by the spelling table if given (see keys.py).
+        """
+        chords = self.chords if semitones == 0 else [chord_obj.transpose(semitones) for chord_obj in self.chords]
+        if spelling is None:
+            return [chord_obj.get_chord_text() for chord_obj in chords]
+        return [chord_obj.get_spelled_text(spelling) for chord_obj in chords]
+
+    def get_key_index(self):
+        """Returns the key number estimated from the song's chords (see keys.estimate_key), or None."""
+        return keys.estimate_key(self.get_slots())[1]
+
+    def render_lines(self, semitones=0, spelling=None):
+        """
+        Returns the song transposed by the number of semitones specified as a list of strings, spelled
+        as get_chord_texts() does.
+        """
+        chord_texts = self.get_chord_texts(semitones, spelling)
+        if self.chord_pro:
+            chord_texts = ['[' + chord_text + ']' for chord_text in chord_texts]
+        song = []
+        for line in self._render_lines:
+            if type(line) is str:
+                song.append(line)
+            elif len(line) == 1:
+                song.append(chordpro.transpose_chordpro_line(line[0], semitones, spelling))
+            elif self.chord_pro:
+                spans, chord_ids, widths = line
+                parts = [spans[0]]
+                for chord_id, span in zip(chord_ids, spans[1:]):
+                    parts.append(chord_texts[chord_id])
+                    parts.append(span)
+                song.append("".join(parts))
+            else:
+                spans, chord_ids, widths = line
+                song.append(ctransposer.join_chord_spans(spans, [chord_texts[chord_id] for chord_id in chord_ids],
+                                                         widths))
+        return song
+
+    def render(self, semitones=0, spelling=None):
+        """Returns the song transposed by the number of semitones specified as a single string."""
+        return "".join(self.render_lines(semitones, spelling))
+
+    def render_all_keys(self, key_spelling=False, key_index=None):
+        """
+        Returns a list of the song rendered in all 12 keys, indexed by semitones up from the original.
+        If key_spelling is set, each is written with the sharps or flats of its key, from the original
+        key number if given, otherwise estimating it only once.
+        """
+        if not key_spelling:
+            return [self.render(semitones) for semitones in range(chord.ST_IN_OCTAVE)]
+        spellings = keys.get_all_key_spellings(self.get_key_index() if key_index is None else key_index)
+        return [self.render(semitones, spellings[semitones]) for semitones in range(chord.ST_IN_OCTAVE)]
+
+    def get_difficulty_vector(self):
+        """Returns the song's difficulty at 0 to 11 semitones, as ctransposer.get_difficulty_vector()."""
+        return ctransposer.get_difficulty_vector(self.get_slots())
+
+    def to_dict(self):
+        """Returns a JSON-serializable dictionary representing the template."""
+        return {'version': TEMPLATE_VERSION,
+                'chords': [chord_obj.get_chord_text() for chord_obj in self.chords],
+                'lines': self.lines,
+                'chord_pro': self.chord_pro}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns the template represented by a dictionary from to_dict()."""
+        if data.get('version') != TEMPLATE_VERSION:
+            raise ValueError("Unsupported template version: {}".format(data.get('version')))
+        return cls([list(parts) for parts in data['lines']],
+                   [chord.intern_chord(chord_text) for chord_text in data['chords']],
+                   data.get('chord_pro', False))
+
+    def to_json(self):
+        """Returns the template serialized as a JSON string."""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        """Returns the template from a JSON string produced by to_json()."""
+        return cls.from_dict(json.loads(text))
+
+
+def compile_song(song):
+    """Returns the SongTemplate for a song (list of strings)."""
+    return SongTemplate.compile(song)
@@ -0,0 +1,100 @@
+"""
+Opt-in instrumentation: per-stage timers and counters for parsing and transposition.
+Disabled by default, when recording costs one check per song rather than per line.
+"""
+import time
+
+# Counters recorded by ctransposer and chordpro.
+COUNTERS = ('lines_scanned', 'chord_lines', 'tokens_parsed', 'invalid_chords', 'sub_chords', 'offsets_tried')
+
+
+class Stats(object):
+    """Accumulated counters and stage timings (in seconds)."""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timers = {}
+
+    def count(self, name, amount=1):
+        """Adds amount to the named counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name, seconds):
+        """Adds seconds to the named stage timer."""
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def count_song(self, song, chords_dict):
+        """
+        Adds the line and chord counters for a song (list of strings) parsed into a chords dictionary
+        structure, eg: by ctransposer.get_chords_from_song() or chordpro.get_chords_from_chordpro().
+        """
+        self.count('lines_scanned', len(song))
+        self.count('chord_lines', len(chords_dict))
+        for chord_list in chords_dict.values():
+            self.count('tokens_parsed', len(chord_list))
+            for chord_obj, col in chord_list:
+                if not chord_obj.is_valid():
+                    self.count('invalid_chords')
+                elif chord_obj.get_sub_chord():
+                    self.count('sub_chords')
+
+    def to_dict(self):
+        """Returns the counters and timers as a JSON-serializable dictionary."""
+        return {'counters': dict(self.counters), 'timers': dict(self.timers)}
+
+
+class _Stage(object):
+    """Context manager adding the time spent inside it to a stage timer."""
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage(object):
+    """Context manager which does nothing, used while instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+_active_stats = None
+
+
+def enable():
+    """Starts recording into a new Stats object, which is returned."""
+    global _active_stats
+    _active_stats = Stats()
+    return _active_stats
+
+
+def disable():
+    """Stops recording, returning the Stats recorded so far (or None)."""
+    global _active_stats
+    recorded, _active_stats = _active_stats, None
+    return recorded
+
+
+def get_stats():
+    """Returns the Stats being recorded, or None if instrumentation is disabled."""
+    return _active_stats
+
+
+def stage(name):
+    """Returns a context manager timing the named stage, which does nothing while disabled."""
+    if _active_stats is None:
+        return _NULL_STAGE
+    return _Stage(_active_stats, name)
@@ -0,0 +1,131 @@
+"""
+Transposes chord text line by line, so that arbitrarily large inputs (eg: concatenated songbooks)
+can be filtered from stdin to stdout with flat memory use.
+"""
+import sys
+import tempfile
+from optparse import OptionParser
+
+import chord
+import ctransposer
+
+# A line containing a form feed starts a new song in a concatenated songbook.
+SONG_SEPARATOR = '\f'
+
+
+def is_song_start(line):
+    """Returns True if the line starts a new song."""
+    return SONG_SEPARATOR in line
+
+
+def transpose_line(line, semitones):
+    """Returns the line with its chords transposed, or unchanged if it is not a chord line."""
+    chord_line, tokens = ctransposer.tokenize_chord_line(line)
+    if not chord_line:
+        return line
+    chord_list = []
+    for chord_text, col in tokens:
+        chord_obj = chord.intern_chord(chord_text)
+        if semitones != 0:
+            chord_obj = chord_obj.transpose(semitones)
+        chord_list.append([chord_obj, col])
+    return ctransposer.render_chord_line(line, chord_list)
+
+
+def iter_transposed_lines(lines, semitones):
+    """
+    Lazily transposes lines from any iterable of strings (eg: a file object) by the number of semitones
+    specified, yielding each output line as soon as it has been read.
+    """
+    for line in lines:
+        yield transpose_line(line, semitones)
+
+
+def iter_song_offsets(lines, max_semitones_down=0, max_semitones_up=5):
+    """
+    Yields the easiest semitone offset for each song in lines, within the limits set (see get_lowest_difficulty).
+    Only the current song's chords are kept in memory.
+    """
+    song_chords = {}
+    for line_no, line in enumerate(lines):
+        if is_song_start(line) and line_no > 0:
+            yield _get_song_offset(song_chords, max_semitones_down, max_semitones_up)
+            song_chords = {}
+        chord_line, tokens = ctransposer.tokenize_chord_line(line)
+        if chord_line:
+            song_chords[line_no] = [[chord.intern_chord(chord_text), col] for chord_text, col in tokens]
+    yield _get_song_offset(song_chords, max_semitones_down, max_semitones_up)
+
+
+def _get_song_offset(song_chords, max_semitones_down, max_semitones_up):
+    """Returns the easiest offset for the song, or 0 if the limits are empty."""
+    best_semitones, best_difficulty = ctransposer.find_lowest_difficulty(
+        ctransposer.get_difficulty_vector(song_chords), max_semitones_down, max_semitones_up)
+    return best_semitones or 0
+
+
+def iter_auto_transposed_lines(song_file, max_semitones_down=0, max_semitones_up=5):
+    """
+    Transposes each song in song_file to its easiest key, yielding output lines lazily.
+    This takes two passes: the first finds each song's offset and the second transposes. Inputs which
+    can't be re-read (eg: stdin) are spooled to a temporary file, so the text is never held in memory.
+    """
+    seekable = getattr(song_file, 'seekable', None)
+    if seekable and seekable():
+        start = song_file.tell()
+        offsets = list(iter_song_offsets(song_file, max_semitones_down, max_semitones_up))
+        song_file.seek(start)
+        yield from _iter_lines_with_offsets(song_file, offsets)
+    else:
+        with tempfile.TemporaryFile(mode='w+') as spool_file:
+            offsets = list(iter_song_offsets(_iter_copied_lines(song_file, spool_file),
+                                             max_semitones_down, max_semitones_up))
+            spool_file.seek(0)
+            yield from _iter_lines_with_offsets(spool_file, offsets)
+
+
+def _iter_copied_lines(lines, copy_file):
+    """Yields lines, writing each one to copy_file as it goes."""
+    for line in lines:
+        copy_file.write(line)
+        yield line
+
+
+def _iter_lines_with_offsets(lines, offsets):
+    """Transposes each song in lines by its offset from the offsets list."""
+    song_no = 0
+    for line_no, line in enumerate(lines):
+        if is_song_start(line) and line_no > 0:
+            song_no += 1
+        yield transpose_line(line, offsets[song_no])
+
+
+def handle_options():
+    """ Processes the command-line parameters returning resulting options. """
+    ops = OptionParser(usage="streaming.py [options] < songs.txt > transposed.txt")
+    ops.add_option("--semitones", "-s", action="store",
+                   dest="semitones", default=0, type="int",
+                   help="Positive/negative semitones by which to transpose the songs. "
+                        "Defaults to '%default', unless --auto specified.")
+    ops.add_option("--auto", "-a", action="store_true", dest="auto", default=False,
+                   help="Transpose each song (separated by form feeds) to a key which is easy to play "
+                        "using open chords.")
+
+    options, _ = ops.parse_args()
+    return options
+
+
+def main():
+    """
+    Filters stdin to stdout.
+    """
+    options = handle_options()
+    if options.auto:
+        output_lines = iter_auto_transposed_lines(sys.stdin)
+    else:
+        output_lines = iter_transposed_lines(sys.stdin, options.semitones)
+    sys.stdout.writelines(output_lines)
+
+
+if __name__ == '__main__':
+    main()
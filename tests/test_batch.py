@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import batch
+import ctransposer
+
+SONG = ['G         C       D\n',
+        'Some lyrics for the verse\n',
+        'Em        C       G/B\n',
+        'And some more lyrics\n']
+CHORDPRO_SONG = ['[G]Some lyrics [C]for the [D]verse\n']
+
+
+class TestTransposeFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.tmp_dir, 'src')
+        self.out_dir = os.path.join(self.tmp_dir, 'out')
+        os.makedirs(os.path.join(self.src_dir, 'sub'))
+        for name in ['one.txt', os.path.join('sub', 'two.txt')]:
+            with open(os.path.join(self.src_dir, name), mode='w') as song_file:
+                song_file.writelines(SONG)
+        with open(os.path.join(self.src_dir, 'three.cho'), mode='w') as song_file:
+            song_file.writelines(CHORDPRO_SONG)
+        os.symlink(os.path.join(self.src_dir, 'missing'), os.path.join(self.src_dir, 'broken.txt'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_results(self, results, expected_song, chordpro_song=None):
+        statuses = {os.path.relpath(path, self.src_dir): status for path, status, message in results}
+        expected_statuses = {'broken.txt': batch.STATUS_ERROR,
+                             'one.txt': batch.STATUS_OK,
+                             os.path.join('sub', 'two.txt'): batch.STATUS_OK}
+        if chordpro_song is not None:
+            expected_statuses['three.cho'] = batch.STATUS_OK
+            with open(os.path.join(self.out_dir, 'three.cho')) as tran_file:
+                self.assertEqual(tran_file.read(), "".join(chordpro_song))
+        self.assertEqual(statuses, expected_statuses)
+        for name in ['one.txt', os.path.join('sub', 'two.txt')]:
+            with open(os.path.join(self.out_dir, name)) as tran_file:
+                self.assertEqual(tran_file.read(), "".join(expected_song))
+
+    def test_directory_in_process(self):
+        results = batch.transpose_files([self.src_dir], self.out_dir, semitones=2, workers=1)
+        self.check_results(results, ctransposer.transpose_song_lines(SONG, 2),
+                           ctransposer.transpose_song(CHORDPRO_SONG, 2, chord_pro=True))
+
+    def test_directory_pattern(self):
+        results = batch.transpose_files([self.src_dir], self.out_dir, semitones=2, workers=1, pattern='*.txt')
+        self.check_results(results, ctransposer.transpose_song_lines(SONG, 2))
+
+    def test_glob_with_pool_and_auto(self):
+        results = batch.transpose_files([os.path.join(self.src_dir, '**', '*.txt')], self.out_dir, auto=True,
+                                        workers=2, chunk_size=1)
+        self.check_results(results, ctransposer.get_lowest_difficulty(SONG))
+
+    def test_one_warning_per_batch(self):
+        for name in ['bad1.txt', 'bad2.txt']:
+            with open(os.path.join(self.src_dir, name), mode='w') as song_file:
+                song_file.writelines(['G    Am#\n', 'Lyrics\n'])
+        with self.assertLogs(level='WARNING') as logs:
+            batch.transpose_files([self.src_dir], self.out_dir, workers=2, chunk_size=1, pattern='bad*.txt')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("2 invalid chord tokens in batch: 'Am#' x2 (first at {} line 0, col 5)".format(
+            os.path.join(self.src_dir, 'bad1.txt')), logs.output[0])
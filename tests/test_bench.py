@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import bench
+
+
+class TestBench(unittest.TestCase):
+
+    def test_run_benchmarks(self):
+        results = bench.run_benchmarks(sizes=[5], repeat=1, min_time=0)
+        self.assertIn('get_lowest_difficulty@5', results)
+        self.assertEqual(len(results), 8 if bench.ranking.numpy is None else 9)
+
+    def test_compare_with_baseline(self):
+        baseline = {'a@1': 1.0, 'b@1': 1.0}
+        results = {'a@1': 1.2, 'b@1': 2.0, 'c@1': 5.0}
+        self.assertEqual(bench.compare_with_baseline(results, baseline, tolerance=1.5), [('b@1', 1.0, 2.0)])
+        self.assertEqual(bench.get_missing_baselines(results, baseline), ['c@1'])
+
+    def test_baseline_covers_every_benchmark(self):
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               bench.DEFAULT_BASELINE)) as baseline_file:
+            baseline = json.load(baseline_file)
+        results = bench.run_benchmarks(sizes=bench.DEFAULT_SIZES[:1], repeat=1, min_time=0)
+        self.assertEqual(bench.get_missing_baselines(results, baseline), [])
+
+    def test_missing_baseline_fails(self):
+        # main() disables warnings for the synthetic songs.
+        self.addCleanup(logging.disable, logging.NOTSET)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            baseline = os.path.join(temp_dir, 'baseline.json')
+            argv = ['bench.py', '--output', os.path.join(temp_dir, 'out.json'), '--baseline', baseline]
+            with mock.patch.object(sys, 'argv', argv), mock.patch.object(sys, 'stderr'), \
+                    mock.patch.object(bench, 'run_benchmarks', return_value={'a@1': 1.0}):
+                with self.assertRaises(SystemExit) as context:
+                    bench.main()
+                self.assertEqual(context.exception.code, 1)
+                with mock.patch.object(sys, 'argv', argv + ['--save-baseline']):
+                    bench.main()
+                self.assertTrue(os.path.exists(baseline))
+                # A benchmark with no baseline time fails too.
+                with mock.patch.object(bench, 'run_benchmarks', return_value={'a@1': 1.0, 'b@1': 1.0}):
+                    with self.assertRaises(SystemExit) as context:
+                        bench.main()
+                    self.assertEqual(context.exception.code, 1)
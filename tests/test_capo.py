@@ -0,0 +1,59 @@
+import unittest
+
+import capo
+import chord
+import chordpro
+import ctransposer
+
+
+class TestShapeDifficulty(unittest.TestCase):
+
+    def test_shapes(self):
+        self.assertEqual(capo.get_shape_difficulty(11, ''), 0)          # G
+        self.assertEqual(capo.get_shape_difficulty(3, '7'), 1)          # B7
+        self.assertEqual(capo.get_shape_difficulty(2, 'sus4'), 4)       # A#sus4
+        self.assertEqual(capo.get_shape_difficulty(11, '', 3), 0)       # G/B
+        self.assertEqual(capo.get_shape_difficulty(6, '', 10), 1)       # D/F#
+        self.assertEqual(capo.get_shape_difficulty(1, 'm9'), 3)         # Am9 falls back to Am
+        self.assertEqual(capo.get_shape_difficulty(9, '13'), 3)         # F13 falls back to F
+
+    def test_shape_vector(self):
+        chords_dict = ctransposer.get_chords_from_song(['C    G/B   Am7   Fmaj7\n'])
+        self.assertEqual(capo.get_shape_vector(capo.get_shape_counts(chords_dict))[0], 1)
+
+
+class TestFindCapoAndKey(unittest.TestCase):
+
+    def test_capo_for_flat_key(self):
+        chords_dict = ctransposer.get_chords_from_song(['Bb   Eb   F    Gm\n', 'la la la la\n'])
+        result = capo.find_capo_and_key(chords_dict)
+        self.assertEqual(result['capo'], 3)
+        self.assertEqual(result['shape_semitones'], -3)
+        self.assertEqual(result['score'], 0)
+        self.assertEqual(result['shapes'], [['G', 1, 0], ['C', 1, 0], ['D', 1, 0], ['Em', 1, 0]])
+
+    def test_joint_search_with_penalty(self):
+        chords_dict = ctransposer.get_chords_from_song(['Bb   Eb   F    Gm\n'])
+        result = capo.find_capo_and_key(chords_dict, sounding_semitones=range(-2, 3), capo_penalty=1)
+        self.assertEqual((result['capo'], result['sounding_semitones']), (1, -2))
+        self.assertEqual(result['breakdown'], {'shapes': 0, 'capo': 1})
+
+    def test_default_keeps_sounding_key(self):
+        chords_dict = ctransposer.get_chords_from_song(['Bb   Eb   F    Gm\n'])
+        result = capo.find_capo_and_key(chords_dict)
+        self.assertEqual((result['capo'], result['sounding_semitones'], result['score']), (3, 0, 0))
+
+    def test_major_and_minor_shapes_match_chord_difficulty(self):
+        for text in ('C', 'Cm', 'F', 'Fm', 'F#m', 'Bm', 'G#'):
+            chord_obj = chord.intern_chord(text)
+            self.assertEqual(capo.get_shape_difficulty(chord_obj.get_index(), chord_obj.get_suffixes()),
+                             chord_obj.get_difficulty(), text)
+
+    def test_written_capo(self):
+        directives = chordpro.read_directives(['{capo: 2}\n', '[G]Some lyrics\n'])
+        self.assertEqual(capo.get_written_capo(directives), 2)
+        self.assertEqual(capo.get_written_capo({'capo': 'high'}), 0)
+        self.assertEqual(capo.get_written_capo({}), 0)
+
+    def test_nothing_to_search(self):
+        self.assertIsNone(capo.find_capo_and_key({}, capos=[]))
@@ -117,3 +117,79 @@ class TestGetDifficulty(unittest.TestCase):
             c = chord.Chord(chord_text)
             result = c.get_difficulty()
             self.assertEqual(result, expected_difficulty)
+
+
+class TestFrozenChord(unittest.TestCase):
+    def setUp(self):
+        self.chord_texts = ['A', 'Bm', 'A#m', 'Am#', 'H', 'J', 'Em7', 'Bbm', 'G/C', 'Am(*)', 'Dsus4', 'C#m7',
+                            'Gb', 'Cadd9']
+
+    def test_matches_chord(self):
+        for chord_text in self.chord_texts:
+            c = chord.Chord(chord_text)
+            frozen = chord.intern_chord(chord_text)
+            self.assertEqual(frozen.is_valid(), c.is_valid())
+            if c.is_valid():
+                self.assertEqual(frozen.get_chord_text(), c.get_chord_text())
+                self.assertEqual(frozen.get_flat_name(), c.get_flat_name())
+                self.assertEqual(frozen.get_suffixes(), c.get_suffixes())
+                self.assertEqual(frozen.get_index(), c.get_index())
+                self.assertEqual(frozen.get_difficulty(), c.get_difficulty())
+
+    def test_transpose_matches_chord(self):
+        for chord_text in self.chord_texts:
+            for semitones in range(-13, 13):
+                c = chord.Chord(chord_text)
+                if c.is_valid():
+                    c.transpose(semitones)
+                    frozen = chord.intern_chord(chord_text).transpose(semitones)
+                    self.assertEqual(frozen.get_chord_text(), c.get_chord_text())
+
+    def test_interned(self):
+        self.assertIs(chord.intern_chord('Am7'), chord.intern_chord('Am7'))
+        self.assertIs(chord.intern_chord('Bb'), chord.intern_chord('A#'))
+        self.assertIs(chord.intern_chord('G').transpose(2), chord.intern_chord('A'))
+
+    def test_sub_chord_accidentals(self):
+        frozen = chord.intern_chord('D/F#')
+        self.assertEqual(frozen.transpose(-2).get_chord_text(), 'C/E')
+        self.assertEqual(frozen.get_sub_chord().get_chord_text(), 'F#')
+
+    def test_spelled_text(self):
+        frozen = chord.intern_chord('D#m7/A#')
+        self.assertEqual(frozen.get_spelled_text(chord.FLAT_SPELLING), 'Ebm7/Bb')
+        self.assertEqual(frozen.get_spelled_text(chord.SHARP_SPELLING), 'D#m7/A#')
+        self.assertEqual(chord.intern_chord('C/F#').get_spelled_text(chord.FLAT_SPELLING), 'C/Gb')
+        self.assertEqual(chord.intern_chord('Am#').get_spelled_text(chord.FLAT_SPELLING), 'Am#')
+        c = chord.Chord('D#m7')
+        self.assertEqual(c.get_spelled_text(chord.FLAT_SPELLING), 'Ebm7')
+        self.assertEqual(c.get_spelled_text(chord.SHARP_SPELLING), 'D#m7')
+
+    def test_transpose_chord_texts(self):
+        texts, difficulties = chord.transpose_chord_texts(['G', 'Am', 'G', 'Bb/D', 'Am#', 'Cmaj7'], 2)
+        self.assertEqual(texts, ['A', 'Bm', 'A', 'C/E', 'Am#', 'Dmaj7'])
+        self.assertEqual(difficulties, [1, 2, 1, 0, 3, 0])
+        texts, difficulties = chord.transpose_chord_texts(['D/F#', 'Em'], -2, chord.FLAT_SPELLING)
+        self.assertEqual(texts, ['C/E', 'Dm'])
+        self.assertEqual(chord.transpose_chord_texts(['D/F#'], 13, chord.FLAT_SPELLING)[0], ['Eb/G'])
+
+    def test_transpose_chord_texts_matches_chords(self):
+        chord_texts = ['A', 'Bbm', 'C#7', 'G/B', 'Em7/D', 'D/F#', 'Hm', 'Am(*)', 'C/G/B', 'x', 'C/x']
+        for semitones in range(-13, 14):
+            for spelling in (chord.SHARP_SPELLING, chord.FLAT_SPELLING):
+                expected = [chord.intern_chord(chord_text).transpose(semitones) for chord_text in chord_texts]
+                texts, difficulties = chord.transpose_chord_texts(chord_texts, semitones, spelling)
+                self.assertEqual(texts, [chord_obj.get_spelled_text(spelling) for chord_obj in expected])
+                self.assertEqual(difficulties, [chord_obj.get_difficulty() for chord_obj in expected])
+
+    def test_invalid_chord_unchanged(self):
+        frozen = chord.intern_chord('Am#')
+        self.assertIs(frozen.transpose(3), frozen)
+        self.assertEqual(frozen.get_chord_text(), 'Am#')
+
+    def test_immutable(self):
+        frozen = chord.intern_chord('E')
+        with self.assertRaises(AttributeError):
+            frozen._index = 3
+        with self.assertRaises(AttributeError):
+            frozen.extra = 1
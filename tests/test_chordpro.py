@@ -0,0 +1,50 @@
+import unittest
+
+import chordpro
+import ctransposer
+
+SONG = ['{title: Somewhere}\n',
+        '{key: C}\n',
+        '{capo: 2}\n',
+        '[C]Somewhere [Em]over the [Am]rainbow [N.C.]\n',
+        '[F]way up [C/B]high\n',
+        'No chords here\n']
+
+
+class TestChordPro(unittest.TestCase):
+
+    def test_transpose_lines(self):
+        result = list(chordpro.iter_transposed_chordpro(SONG, 2))
+        self.assertEqual(result, ['{title: Somewhere}\n',
+                                  '{key: D}\n',
+                                  '{capo: 2}\n',
+                                  '[D]Somewhere [F#m]over the [Bm]rainbow [N.C.]\n',
+                                  '[G]way up [D/C#]high\n',
+                                  'No chords here\n'])
+
+    def test_read_directives(self):
+        directives = chordpro.read_directives(SONG)
+        self.assertEqual(directives['title'], 'Somewhere')
+        self.assertEqual(directives['key'].get_chord_text(), 'C')
+        self.assertEqual(directives['capo'], 2)
+
+    def test_chords_dict(self):
+        chords_dict = chordpro.get_chords_from_chordpro(SONG)
+        self.assertEqual(sorted(chords_dict), [3, 4])
+        self.assertEqual([[chord_obj.get_chord_text(), col] for chord_obj, col in chords_dict[4]],
+                         [['F', 0], ['C/B', 10]])
+
+    def test_auto(self):
+        vector = ctransposer.get_difficulty_vector(chordpro.get_chords_from_chordpro(SONG))
+        semitones = ctransposer.find_lowest_difficulty(vector)[0]
+        self.assertEqual(ctransposer.transpose_song(SONG, auto=True, chord_pro=True),
+                         list(chordpro.iter_transposed_chordpro(SONG, semitones)))
+
+    def test_key_spelling(self):
+        result = ctransposer.transpose_song(SONG, 5, chord_pro=True, key_spelling=True)
+        self.assertEqual(result[1], '{key: F}\n')
+        self.assertEqual(result[4], '[Bb]way up [F/E]high\n')
+
+    def test_is_chordpro_file(self):
+        self.assertTrue(chordpro.is_chordpro_file('songs/song.cho'))
+        self.assertFalse(chordpro.is_chordpro_file('songs/song.txt'))
@@ -1,7 +1,14 @@
+import json
+import os
+import random
+import tempfile
 import unittest
 
 import chord
+import chordpro
 import ctransposer
+import keys
+import songtemplate
 
 TEST_DATA = {6: [['Am', 11], ['C', 25], ['G', 35], ['Am(*)', 44]],
              15: [['F', 8], ['C', 18],  ['F', 29], ['C', 50], ['C/B', 55], ['F', 63]],
@@ -36,3 +43,136 @@ class TestGetTotalDifficulty(unittest.TestCase):
         ctransposer.transpose_song_dict(self.test_data, 3)
         result = ctransposer.get_total_difficulty(chords_dict=self.test_data)
         self.assertEqual(result, 170)
+
+
+TEST_SONG = ['Capo 2\n',
+             '\n',
+             'Am        C       G    Am\n',
+             'Somewhere over the rainbow, way up high\n',
+             '\n',
+             'F         C/B     Em7  Bb\n',
+             'There is a land that I heard of once\n',
+             'C         G\n',
+             'Once in a lullaby\n']
+
+
+class TestGetDifficultyVector(unittest.TestCase):
+
+    def test_vector_matches_transposed_totals(self):
+        vector = ctransposer.get_difficulty_vector(ctransposer.get_chords_from_song(TEST_SONG))
+        for semitones in range(-12, 12):
+            song_chords = ctransposer.get_chords_from_song(TEST_SONG)
+            ctransposer.transpose_song_dict(song_chords, semitones)
+            self.assertEqual(vector[semitones % 12], ctransposer.get_total_difficulty(song_chords))
+
+    def test_lowest_difficulty_renders_best_offset(self):
+        vector = ctransposer.get_difficulty_vector(ctransposer.get_chords_from_song(TEST_SONG))
+        best_semitones, best_difficulty = ctransposer.find_lowest_difficulty(vector, -2, 5)
+        self.assertEqual(best_difficulty, min(vector[s % 12] for s in range(-2, 6)))
+        self.assertEqual(ctransposer.get_lowest_difficulty(TEST_SONG, -2, 5),
+                         ctransposer.transpose_song_lines(TEST_SONG, best_semitones))
+
+    def test_empty_limits(self):
+        self.assertEqual(ctransposer.get_lowest_difficulty(TEST_SONG, 3, 2), [])
+
+
+class TestTokenizeChordLine(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = TEST_SONG + ['', ' ', '\n', 'C \n', 'C D E\n', 'C is for cat\n', 'Am  (x2)\n', '\tG  D\n',
+                                  'Chorus: G D\n', 'A Bridge too far', '  E7  F#m/E  xA  Bb7\n', 'a b c d e\n']
+        rand = random.Random(1234)
+        alphabet = 'ABCDEFGHabcdefgm#/7( )x2\t\nChorusCapo'
+        for _ in range(2000):
+            self.lines.append(''.join(rand.choice(alphabet) for _ in range(rand.randint(0, 30))))
+
+    def test_matches_old_functions(self):
+        for line in self.lines:
+            chord_line, tokens = ctransposer.tokenize_chord_line(line)
+            self.assertEqual(chord_line, ctransposer.is_chord_line(line), repr(line))
+            if chord_line:
+                self.assertEqual(tokens, ctransposer.split_chord_line_text(line), repr(line))
+            else:
+                self.assertEqual(tokens, [])
+
+
+class TestRenderChordLine(unittest.TestCase):
+
+    def render(self, line, semitones):
+        return ctransposer.transpose_song_lines([line], semitones)[0]
+
+    def test_same_length(self):
+        self.assertEqual(self.render('G    C    D\n', 2), 'A    D    E\n')
+
+    def test_longer_chords_use_following_spaces(self):
+        self.assertEqual(self.render('E    A    E\n', 2), 'F#   B    F#\n')
+        self.assertEqual(self.render('E A E', 2), 'F# B F#')
+        self.assertEqual(self.render('F/F  C  \n', 1), 'F#/F# C#\n')
+
+    def test_shorter_chords_are_padded(self):
+        self.assertEqual(self.render('F#m  C#   D\n', 1), 'Gm   D    D#\n')
+        self.assertEqual(self.render('F#\n', 1), 'G\n')
+
+    def test_shift_recovered_by_shorter_chord(self):
+        self.assertEqual(self.render('E F# G\n', 1), 'F G  G#\n')
+        self.assertEqual(self.render('E A#m A\n', 1), 'F Bm  A#\n')
+
+    def test_text_between_chords(self):
+        self.assertEqual(self.render('E A (x2) E\n', 2), 'F# B (x2) F#\n')
+
+
+class TestAllKeys(unittest.TestCase):
+
+    song = ['Capo 2\n',
+            'G         C/B     D   Bb\n',
+            'Some lyrics for the verse\n',
+            'Em        C       G\n']
+
+    def test_render_all_keys_matches_transpose(self):
+        song_chords = ctransposer.get_chords_from_song(self.song)
+        template = songtemplate.SongTemplate.from_chords(self.song, song_chords)
+        self.assertEqual(template.render_all_keys(),
+                         ["".join(ctransposer.transpose_song_lines(self.song, semitones)) for semitones in range(12)])
+        self.assertEqual(song_chords[1][0][0].get_chord_text(), 'G')
+
+    def test_write_all_keys_chordpro(self):
+        song = ['{title: Song}\n', '{key: G}\n', '[G]Some [C/B]lyrics [N.C.]for the [Bb]verse\n', '[Em]More\n']
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, 'song.cho')
+            ctransposer.write_all_keys(filename, song, chord_pro=True, key_spelling=True)
+            for semitones in range(12):
+                spelling = keys.get_transposed_spelling(chordpro.get_chords_from_chordpro(song), semitones)
+                with open(ctransposer.get_transposed_filename(filename, semitones)) as song_file:
+                    self.assertEqual(song_file.readlines(),
+                                     list(chordpro.iter_transposed_chordpro(song, semitones, spelling)))
+
+    def test_transposed_filename(self):
+        self.assertEqual(ctransposer.get_transposed_filename('songs/song.txt', 2), 'songs/song[+2].txt')
+        self.assertEqual(ctransposer.get_transposed_filename('song.txt', -3), 'song[-3].txt')
+        self.assertEqual(ctransposer.get_summary_filename('songs/song.txt'), 'songs/song[keys].json')
+
+    def test_write_transposed_file_auto_offset(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, 'song.txt')
+            song = ['F         Bb      C\n', 'Some lyrics\n']
+            self.assertEqual(ctransposer.transpose_song_with_offset(song, auto=True),
+                             (2, ['G         C       D\n', 'Some lyrics\n']))
+            written = ctransposer.write_transposed_file(filename, song, auto=True)
+            self.assertEqual(written, [os.path.join(temp_dir, 'song[+2].txt')])
+            with open(written[0]) as song_file:
+                self.assertEqual(song_file.readline(), 'G         C       D\n')
+
+    def test_write_all_keys(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, 'song.txt')
+            summary = ctransposer.write_all_keys(filename, self.song, key_spelling=True)
+            with open(os.path.join(temp_dir, 'song[+3].txt')) as song_file:
+                self.assertEqual(song_file.readlines()[1], 'Bb        Eb/D    F   Db\n')
+            with open(ctransposer.get_summary_filename(filename)) as summary_file:
+                self.assertEqual(json.load(summary_file), summary)
+            self.assertEqual(len(os.listdir(temp_dir)), 13)
+        self.assertEqual(summary['key'], 'G')
+        self.assertEqual(summary['keys'][10]['key'], 'F')
+        self.assertEqual(summary['keys'][10]['file'], 'song[+10].txt')
+        self.assertEqual([entry['difficulty'] for entry in summary['keys']],
+                         ctransposer.get_difficulty_vector(ctransposer.get_chords_from_song(self.song)))
@@ -0,0 +1,77 @@
+import logging
+import unittest
+
+import chord
+import ctransposer
+import diagnostics
+
+SONG = ['G    Am#  D\n',
+        'Some lyrics for the verse\n',
+        'Am#  G    Bm#\n',
+        'More lyrics\n',
+        'Am#  C\n']
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_records_first_location_and_counts(self):
+        song_diagnostics = diagnostics.Diagnostics()
+        ctransposer.get_chords_from_song(SONG, song_diagnostics)
+        self.assertEqual(song_diagnostics.tokens, {'Am#': [3, '', 0, 5], 'Bm#': [1, '', 2, 10]})
+        self.assertEqual(song_diagnostics.get_total(), 4)
+        self.assertEqual(song_diagnostics.summary(1), [('Am#', 3, '', 0, 5)])
+
+    def test_records_source(self):
+        song_diagnostics = diagnostics.Diagnostics()
+        ctransposer.get_chords_from_song(SONG, song_diagnostics, 'song.txt')
+        self.assertEqual(song_diagnostics.tokens['Bm#'], [1, 'song.txt', 2, 10])
+
+    def test_merge_keeps_earliest_location(self):
+        first = diagnostics.Diagnostics()
+        first.record('Hm', 4, 0)
+        first.record('Qq', 0, 3, 'b.txt')
+        second = diagnostics.Diagnostics()
+        second.record('Hm', 1, 2)
+        second.record('Qq', 9, 9, 'a.txt')
+        second.record('Xz', 0, 0)
+        first.merge(second)
+        self.assertEqual(first.tokens, {'Hm': [2, '', 1, 2], 'Qq': [2, 'a.txt', 9, 9], 'Xz': [1, '', 0, 0]})
+
+    def test_single_warning_per_song(self):
+        with self.assertLogs(level='WARNING') as logs:
+            ctransposer.get_chords_from_song(SONG)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("4 invalid chord tokens in song", logs.output[0])
+        self.assertIn("'Am#' x3 (first at line 0, col 5)", logs.output[0])
+
+    def test_song_source_named_once(self):
+        with self.assertLogs(level='WARNING') as logs:
+            ctransposer.get_chords_from_song(SONG, source='song.txt')
+        self.assertIn("4 invalid chord tokens in song.txt: 'Am#' x3 (first at line 0, col 5)", logs.output[0])
+
+    def test_single_warning_per_batch(self):
+        batch_diagnostics = diagnostics.Diagnostics()
+        with self.assertLogs(level='WARNING') as logs:
+            for source in ('b.txt', 'a.txt'):
+                ctransposer.get_chords_from_song(SONG, batch_diagnostics, source)
+            batch_diagnostics.report('batch')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("8 invalid chord tokens in batch", logs.output[0])
+        self.assertIn("'Am#' x6 (first at b.txt line 0, col 5)", logs.output[0])
+
+    def test_report_respects_level_and_limit(self):
+        logger = logging.getLogger('test_diagnostics')
+        song_diagnostics = diagnostics.Diagnostics()
+        for text in ('Hm', 'Xz', 'Qq'):
+            song_diagnostics.record(text, 0, 0)
+        logger.setLevel(logging.ERROR)
+        self.assertFalse(song_diagnostics.report(logger=logger))
+        logger.setLevel(logging.NOTSET)
+        with self.assertLogs(logger, level='WARNING') as logs:
+            self.assertTrue(song_diagnostics.report('batch', logger, limit=2))
+        self.assertIn('and 1 more', logs.output[0])
+
+    def test_empty_sharp_name_difficulty(self):
+        # 'Cb' parses with an empty sharp name.
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(chord.Chord('Cb').get_difficulty(), 3)
@@ -0,0 +1,34 @@
+import unittest
+
+import ctransposer
+import document
+
+SONG = ['G         C       D\n',
+        'Some lyrics for the verse\n',
+        'Em        C       G\n',
+        'And some more lyrics\n']
+
+
+class TestSongDocument(unittest.TestCase):
+
+    def setUp(self):
+        self.document = document.SongDocument(SONG, semitones=2)
+
+    def test_initial_render(self):
+        self.assertEqual(self.document.render(), ctransposer.transpose_song_lines(SONG, 2))
+
+    def test_edit_returns_changed_lines(self):
+        changed = self.document.edit(2, 3, ['Am        F\n', 'Extra lyrics\n'])
+        self.assertEqual(changed, ['Bm        G\n', 'Extra lyrics\n'])
+        new_song = SONG[:2] + ['Am        F\n', 'Extra lyrics\n'] + SONG[3:]
+        self.assertEqual(self.document.render(), ctransposer.transpose_song_lines(new_song, 2))
+        self.assertEqual(sorted(self.document.get_chords()), [0, 2])
+
+    def test_edit_lyric_into_chord_line(self):
+        self.assertEqual(self.document.edit(1, 2, ['C  D\n']), ['D  E\n'])
+        self.assertEqual(sorted(self.document.get_chords()), [0, 1, 2])
+
+    def test_set_semitones(self):
+        changed = self.document.set_semitones(0)
+        self.assertEqual(sorted(changed), [0, 2])
+        self.assertEqual(self.document.render(), ctransposer.transpose_song_lines(SONG, 0))
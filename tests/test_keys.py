@@ -0,0 +1,98 @@
+import unittest
+
+import chord
+import chordpro
+import ctransposer
+import keys
+import stats
+
+SONG_IN_G = ['G         C       D     Em\n',
+             'Some lyrics for the verse\n',
+             'C         D       G\n']
+SONG_IN_AM = ['Am        F       C     G\n',
+              'Some lyrics for the verse\n',
+              'Am        Dm      E7    Am\n']
+
+
+class TestKeys(unittest.TestCase):
+
+    def test_key_profiles(self):
+        self.assertEqual(len(keys.KEY_PROFILES), 24)
+        self.assertEqual(keys.KEY_NAMES[10], 'G')
+        self.assertEqual(keys.KEY_NAMES[12], 'Am')
+        # G major's profile peaks on G (pitch class 10 with A=0).
+        self.assertEqual(max(range(12), key=keys.KEY_PROFILES[10].__getitem__), 10)
+
+    def test_parse_key(self):
+        self.assertEqual(keys.parse_key('G'), 10)
+        self.assertEqual(keys.parse_key('Bb'), 1)
+        self.assertEqual(keys.parse_key('F#m'), 21)
+        self.assertEqual(keys.parse_key('Cmaj'), 3)
+        self.assertRaises(ValueError, keys.parse_key, 'H#x')
+
+    def test_histogram(self):
+        song_chords = ctransposer.get_chords_from_song(['Am  Bm#\n'])
+        histogram = keys.get_pitch_class_histogram(song_chords)
+        # A minor root, third and fifth, counted once plus FINAL_CHORD_WEIGHT more as the final chord.
+        self.assertEqual(histogram, [6, 0, 0, 3, 0, 0, 0, 3, 0, 0, 0, 0])
+        self.assertEqual(keys.estimate_key({}), (None, None))
+
+    def test_estimate_key(self):
+        self.assertEqual(keys.estimate_key(ctransposer.get_chords_from_song(SONG_IN_G)), ('G', 10))
+        self.assertEqual(keys.estimate_key(ctransposer.get_chords_from_song(SONG_IN_AM)), ('Am', 12))
+
+    def test_semitones_between(self):
+        self.assertEqual(keys.get_semitones_between(keys.parse_key('C'), keys.parse_key('G')), -5)
+        self.assertEqual(keys.get_semitones_between(keys.parse_key('E'), keys.parse_key('G')), 3)
+        self.assertEqual(keys.get_semitones_between(keys.parse_key('C'), keys.parse_key('F#')), 6)
+
+    def test_semitones_between_modes(self):
+        # Relative keys share a signature, so the song moves to the target's relative key in its own mode.
+        self.assertEqual(keys.get_relative_key(keys.parse_key('G')), keys.parse_key('Em'))
+        self.assertEqual(keys.get_relative_key(keys.parse_key('Am')), keys.parse_key('C'))
+        self.assertEqual(keys.get_semitones_between(keys.parse_key('G'), keys.parse_key('Em')), 0)
+        self.assertEqual(keys.get_semitones_between(keys.parse_key('Em'), keys.parse_key('G')), 0)
+        self.assertEqual(keys.get_semitones_between(keys.parse_key('G'), keys.parse_key('Am')), 5)
+
+    def test_transpose_to_key(self):
+        semitones = ctransposer.get_semitones_to_key(SONG_IN_G, 'A')
+        self.assertEqual(semitones, 2)
+        self.assertEqual(ctransposer.transpose_song(SONG_IN_G, semitones)[0], 'A         D       E     F#m\n')
+        self.assertEqual(ctransposer.get_semitones_to_key(['[Am]Some [Dm]lyrics [E]for [Am]you\n'], 'Em', True), -5)
+
+    def test_key_directive(self):
+        # The chords alone suggest G, but the {key:} directive says the song is in Em.
+        song = ['{key: Em}\n', '[G]Some [C]lyrics [D]for [G]you\n']
+        directives = chordpro.read_directives(song)
+        self.assertEqual(keys.get_song_key(chordpro.get_chords_from_chordpro(song), directives), ('Em', 19))
+        self.assertEqual(keys.get_song_key({}, {'key': 'X'}), (None, None))
+        self.assertEqual(ctransposer.get_semitones_to_key(song, 'Am', True), 5)
+        self.assertEqual(ctransposer.transpose_song_with_offset(song, chord_pro=True, key='Am'),
+                         (5, ['{key: Am}\n', '[C]Some [F]lyrics [G]for [C]you\n']))
+
+    def test_transpose_to_key_of_other_mode(self):
+        semitones, song = ctransposer.transpose_song_with_offset(SONG_IN_AM, key='G')
+        self.assertEqual(semitones, -5)
+        self.assertEqual(keys.estimate_key(ctransposer.get_chords_from_song(song)), ('Em', 19))
+
+    def test_transpose_to_key_parses_once(self):
+        song_stats = stats.enable()
+        self.addCleanup(stats.disable)
+        ctransposer.transpose_song_with_offset(SONG_IN_G, key='A')
+        self.assertEqual(song_stats.to_dict()['counters']['lines_scanned'], len(SONG_IN_G))
+
+    def test_key_spellings(self):
+        self.assertIs(keys.KEY_SPELLINGS[keys.parse_key('F')], chord.FLAT_SPELLING)
+        self.assertIs(keys.KEY_SPELLINGS[keys.parse_key('Dm')], chord.FLAT_SPELLING)
+        self.assertIs(keys.KEY_SPELLINGS[keys.parse_key('E')], chord.SHARP_SPELLING)
+        in_c = keys.KEY_SPELLINGS[keys.parse_key('C')]
+        self.assertEqual([chord.intern_chord(text).get_spelled_text(in_c) for text in ('A#', 'F#', 'D#/G#')],
+                         ['Bb', 'F#', 'Eb/Ab'])
+        self.assertIs(keys.get_key_spelling(None), chord.SHARP_SPELLING)
+
+    def test_transposed_spelling(self):
+        song_chords = ctransposer.get_chords_from_song(SONG_IN_G)
+        self.assertIs(keys.get_transposed_spelling(song_chords, 3), chord.FLAT_SPELLING)
+        self.assertEqual(ctransposer.transpose_song(SONG_IN_G, 3, key_spelling=True)[0],
+                         'Bb        Eb      F     Gm\n')
+        self.assertEqual(ctransposer.transpose_song(SONG_IN_G, 3)[0], 'A#        D#      F     Gm\n')
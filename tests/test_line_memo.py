@@ -0,0 +1,54 @@
+import unittest
+
+import ctransposer
+import line_memo
+import songtemplate
+
+SONG = ['G         C       D\n',
+        'Some lyrics for the verse\n',
+        'G         C       D\n',
+        'Some lyrics for the verse\n']
+
+
+class TestLineMemo(unittest.TestCase):
+
+    def tearDown(self):
+        line_memo.disable()
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(line_memo.get_memo())
+
+    def test_hits_and_shared_results(self):
+        memo = line_memo.enable()
+        first = ctransposer.get_chords_from_song(SONG)
+        second = ctransposer.get_chords_from_song(SONG)
+        stats = memo.get_stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (2, 6, 2))
+        self.assertEqual(stats['hit_rate'], 0.75)
+        # Each song gets its own chord lists, so transposing one doesn't change the other.
+        ctransposer.transpose_song_dict(first, 2)
+        self.assertEqual(second[0][0][0].get_chord_text(), 'G')
+        self.assertEqual(ctransposer.render_song_lines(SONG, second), SONG)
+
+    def test_same_results_as_without_memo(self):
+        expected = ctransposer.transpose_song_lines(SONG, 3)
+        expected_template = songtemplate.compile_song(SONG).to_dict()
+        line_memo.enable()
+        self.assertEqual(ctransposer.transpose_song_lines(SONG, 3), expected)
+        self.assertEqual(songtemplate.compile_song(SONG).to_dict(), expected_template)
+
+    def test_memory_cap(self):
+        memo = line_memo.LineMemo(max_bytes=1000)
+        for line_no in range(20):
+            memo.get('line %d\n' % line_no, ctransposer._parse_chord_line)
+        stats = memo.get_stats()
+        self.assertLessEqual(stats['bytes'], 1000)
+        self.assertEqual(stats['evictions'], 20 - stats['entries'])
+        # The most recently used lines are kept.
+        self.assertIn('line 19\n', memo.lines)
+        self.assertNotIn('line 0\n', memo.lines)
+
+    def test_long_lines_not_cached(self):
+        memo = line_memo.LineMemo()
+        memo.get('x' * (line_memo.MAX_LINE_LENGTH + 1), ctransposer.parse_chord_line)
+        self.assertEqual(memo.get_stats()['entries'], 0)
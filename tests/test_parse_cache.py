@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import batch
+import ctransposer
+import parse_cache
+
+SONG = ['G         C/B     D   Am#\n',
+        'Some lyrics for the verse\n',
+        'Em        Bb      G\n']
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = parse_cache.ParseCache(os.path.join(self.tmp_dir, 'cache.db'), max_entries=2)
+        self.song_path = self.write_song('song.txt', SONG)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_song(self, name, song):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, mode='w') as song_file:
+            song_file.writelines(song)
+        return path
+
+    def as_text(self, chords_dict):
+        return {line_no: [[chord_obj.get_chord_text(), col] for chord_obj, col in chord_list]
+                for line_no, chord_list in chords_dict.items()}
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get(self.song_path, SONG))
+        self.cache.get_song_chords(self.song_path, SONG)
+        self.assertEqual(self.as_text(self.cache.get(self.song_path, SONG)),
+                         self.as_text(ctransposer.get_chords_from_song(SONG)))
+        self.assertEqual(self.cache.get_stats(), {'entries': 1, 'max_entries': 2, 'hits': 1, 'misses': 2})
+
+    def test_writes_deferred_to_flush(self):
+        self.cache.get_song_chords(self.song_path, SONG)
+        self.assertIsNotNone(self.cache.get(self.song_path, SONG))
+        with parse_cache.ParseCache(self.cache.db_path) as other_cache:
+            self.assertEqual(other_cache.get_stats()['entries'], 0)
+            self.cache.flush()
+            self.assertEqual(other_cache.get_stats()['entries'], 1)
+            self.assertIsNotNone(other_cache.get(self.song_path, SONG))
+            first_used = self.cache.entries()[0][5]
+            self.cache.add_updates(other_cache.take_updates())
+            self.cache.flush()
+            self.assertGreater(self.cache.entries()[0][5], first_used)
+
+    def test_changed_file_misses(self):
+        self.cache.get_song_chords(self.song_path, SONG)
+        os.utime(self.song_path, ns=(0, 0))
+        self.assertIsNotNone(self.cache.get(self.song_path, SONG))
+        changed_song = SONG[:2] + ['Em        Bb      A\n']
+        self.write_song('song.txt', changed_song)
+        os.utime(self.song_path, ns=(1, 1))
+        self.assertIsNone(self.cache.get(self.song_path, changed_song))
+
+    def test_invalidate_entries_and_limit(self):
+        self.cache.get_song_chords(self.song_path, SONG)
+        for name in ['two.txt', 'three.txt']:
+            self.cache.get_song_chords(self.write_song(name, SONG), SONG)
+        entries = self.cache.entries()
+        self.assertEqual([os.path.basename(entry[0]) for entry in entries], ['three.txt', 'two.txt'])
+        self.assertEqual(entries[0][4], 7)
+        self.assertEqual(self.cache.invalidate(os.path.join(self.tmp_dir, 'two.txt')), 1)
+        self.assertEqual(self.cache.invalidate(), 1)
+
+    def test_batch_with_cache(self):
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        cache_path = os.path.join(self.tmp_dir, 'batch.db')
+        results = batch.transpose_files([self.song_path], out_dir, semitones=2, workers=1, cache_path=cache_path)
+        # The second run is served from the cache without parsing.
+        with mock.patch.object(ctransposer, 'get_chords_from_song', side_effect=AssertionError):
+            results += batch.transpose_files([self.song_path], out_dir, semitones=2, workers=1, cache_path=cache_path)
+        for result in results:
+            self.assertEqual(result[1], batch.STATUS_OK)
+        with open(os.path.join(out_dir, 'song.txt')) as tran_file:
+            self.assertEqual(tran_file.read(), ''.join(ctransposer.transpose_song_lines(SONG, 2)))
+        self.assertNotIn(cache_path, batch._parse_caches)
+        with parse_cache.ParseCache(cache_path) as cache:
+            self.assertEqual(len(cache.entries()), 1)
+
+    def test_batch_with_cache_in_pool(self):
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        cache_path = os.path.join(self.tmp_dir, 'batch.db')
+        paths = [self.write_song(name, SONG) for name in ['one.txt', 'two.txt', 'three.txt']]
+        batch.transpose_files(paths, out_dir, semitones=2, workers=2, chunk_size=1, cache_path=cache_path)
+        with parse_cache.ParseCache(cache_path) as cache:
+            self.assertEqual(len(cache.entries()), 3)
+            self.assertIsNotNone(cache.get(paths[0], SONG))
@@ -0,0 +1,36 @@
+import unittest
+
+import ctransposer
+import ranking
+
+SONGS = [['G         C       D\n', 'Some lyrics for the verse\n'],
+         ['F#m   A     E    B7 \n', 'Lyrics in a harder key\n', 'C#m  D/F#  Bbm\n'],
+         ['No chords in this one\n'],
+         ['Am        C/B     Em7  F\n']]
+
+
+class TestRanking(unittest.TestCase):
+
+    def setUp(self):
+        self.songs = [ctransposer.get_chords_from_song(song) for song in SONGS]
+        self.vectors = [ctransposer.get_difficulty_vector(song_chords) for song_chords in self.songs]
+
+    def expected_offsets(self, max_semitones_down, max_semitones_up):
+        return [ctransposer.find_lowest_difficulty(vector, max_semitones_down, max_semitones_up)[0]
+                for vector in self.vectors]
+
+    def test_pure_python(self):
+        self.assertEqual(ranking.difficulty_matrix(self.songs, use_numpy=False), self.vectors)
+        self.assertEqual(ranking.best_offsets(self.songs, -3, 8, use_numpy=False), self.expected_offsets(-3, 8))
+        self.assertEqual(ranking.best_offsets(self.songs, 2, 1, use_numpy=False), [])
+
+    @unittest.skipIf(ranking.numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        self.assertEqual(ranking.difficulty_matrix(self.songs, use_numpy=True).tolist(), self.vectors)
+        self.assertEqual(ranking.best_offsets(self.songs, -3, 8, use_numpy=True), self.expected_offsets(-3, 8))
+
+    def test_difficulty_table_shares_qualities(self):
+        table = ranking.DifficultyTable()
+        pitch_classes, quality_ids = table.encode_song(ctransposer.get_chords_from_song(['C7  D7  Dm  C/B  D/C#\n']))
+        self.assertEqual(pitch_classes, [3, 5, 5, 3, 5])
+        self.assertEqual(quality_ids, [0, 0, 1, 2, 2])
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import unittest
+
+import ctransposer
+import service
+import songtemplate
+
+SONG = 'G         C       D\nSome lyrics for the verse\nEm        C       G\n'
+
+
+class TestSongCache(unittest.TestCase):
+
+    def test_hits_misses_and_eviction(self):
+        cache = service.SongCache(max_entries=2)
+        first = cache.get_template(SONG)
+        self.assertIs(cache.get_template(SONG), first)
+        cache.get_template('A\n')
+        cache.get_template('B\n')
+        self.assertIsNot(cache.get_template(SONG), first)
+        self.assertEqual(cache.get_stats(), {'entries': 2, 'max_entries': 2, 'hits': 1, 'misses': 4})
+
+
+class TestTranspositionService(unittest.TestCase):
+
+    def request(self, method, path, data=None):
+        async def send():
+            server = await self.service.start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                body = json.dumps(data).encode('utf-8') if data is not None else b''
+                writer.write("{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n\r\n"
+                             .format(method, path, len(body)).encode('latin-1') + body)
+                response = await reader.read()
+                writer.close()
+            finally:
+                server.close()
+                await server.wait_closed()
+            return response
+        loop = asyncio.new_event_loop()
+        try:
+            response = loop.run_until_complete(send())
+        finally:
+            loop.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+    def setUp(self):
+        self.service = service.TranspositionService(cache_size=4)
+        self.lines = service.split_song_text(SONG)
+
+    def test_transpose_and_stats(self):
+        status, response = self.request('POST', '/transpose', {'song': SONG, 'semitones': 2})
+        self.assertEqual(status, 200)
+        self.assertEqual(response['song'], songtemplate.compile_song(self.lines).render(2))
+        self.request('POST', '/transpose', {'song': SONG, 'semitones': 3})
+        status, response = self.request('GET', '/stats')
+        self.assertEqual(response['cache']['hits'], 1)
+        self.assertEqual(response['cache']['misses'], 1)
+
+    def test_auto_and_keys(self):
+        status, response = self.request('POST', '/auto', {'song': SONG})
+        self.assertEqual(response['song'], ''.join(ctransposer.get_lowest_difficulty(self.lines)))
+        status, response = self.request('POST', '/keys', {'song': SONG})
+        self.assertEqual([key['difficulty'] for key in response['keys']],
+                         ctransposer.get_difficulty_vector(ctransposer.get_chords_from_song(self.lines)))
+
+    def test_batch(self):
+        status, response = self.request('POST', '/batch', {'songs': [SONG, SONG], 'semitones': 2})
+        self.assertEqual(response['songs'], [''.join(ctransposer.transpose_song_lines(self.lines, 2))] * 2)
+
+    def test_errors(self):
+        self.assertEqual(self.request('POST', '/transpose', {'semitones': 2})[0], 400)
+        self.assertEqual(self.request('POST', '/transpose', {'song': SONG, 'semitones': True})[0], 400)
+        self.assertEqual(self.request('GET', '/transpose')[0], 405)
+        self.assertEqual(self.request('GET', '/missing')[0], 404)
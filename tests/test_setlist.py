@@ -0,0 +1,63 @@
+import itertools
+import random
+import unittest
+
+import setlist
+
+
+def brute_force(vectors, sounding_ranges, capos, max_capo_changes, move_penalty):
+    """Returns the lowest score over every combination of capos and sounding keys."""
+    best = None
+    for capo_choice in itertools.product(capos, repeat=len(vectors)):
+        changes = sum(1 for first, second in zip(capo_choice, capo_choice[1:]) if first != second)
+        if max_capo_changes is not None and changes > max_capo_changes:
+            continue
+        score = changes * move_penalty
+        for vector, sounding_range, capo_fret in zip(vectors, sounding_ranges, capo_choice):
+            score += min(vector[(sounding - capo_fret) % 12] for sounding in sounding_range)
+        if best is None or score < best:
+            best = score
+    return best
+
+
+class TestSetlist(unittest.TestCase):
+
+    def test_song_vector(self):
+        vector = setlist.get_song_vector(['Bb   Eb   F    Gm\n'])
+        self.assertEqual(len(vector), 12)
+        self.assertEqual(vector[-3 % 12], 0)
+        self.assertEqual(setlist.get_song_vector(['[Bb]la [Eb]la\n'], chord_pro=True)[9], 0)
+
+    def test_capo_changes_limited(self):
+        # Easy with the capo at 0, 3, 0 and 3, or with one fixed capo at a cost.
+        vectors = [[0, 9, 9, 5, 9, 9, 9, 9, 9, 9, 9, 9],
+                   [5, 9, 9, 9, 9, 9, 9, 9, 9, 0, 9, 9]] * 2
+        free = setlist.optimize_setlist(vectors, capos=[0, 3])
+        self.assertEqual([song['capo'] for song in free['songs']], [0, 3, 0, 3])
+        self.assertEqual((free['score'], free['capo_changes']), (0, 3))
+        limited = setlist.optimize_setlist(vectors, capos=[0, 3], max_capo_changes=0)
+        self.assertEqual(limited['capo_changes'], 0)
+        self.assertEqual(limited['score'], 10)
+        self.assertEqual(setlist.optimize_setlist(vectors, capos=[0, 3], move_penalty=2)['score'], 6)
+        penalised = setlist.optimize_setlist(vectors, capos=[0, 3], move_penalty=6)
+        self.assertEqual((penalised['score'], penalised['capo_changes']), (10, 0))
+        self.assertEqual(penalised['songs'][1], {'capo': 0, 'sounding_semitones': 0, 'shape_semitones': 0,
+                                                 'difficulty': 5})
+
+    def test_matches_brute_force(self):
+        randomiser = random.Random(7)
+        for attempt in range(20):
+            vectors = [[randomiser.randint(0, 9) for offset in range(12)] for song in range(4)]
+            ranges = [range(-randomiser.randint(0, 2), randomiser.randint(0, 2) + 1) for song in vectors]
+            capos = range(randomiser.randint(1, 4))
+            max_changes = randomiser.choice([None, 0, 1, 2])
+            penalty = randomiser.randint(0, 3)
+            result = setlist.optimize_setlist(vectors, ranges, capos, max_changes, penalty)
+            self.assertEqual(result['score'], brute_force(vectors, ranges, capos, max_changes, penalty))
+            self.assertEqual(result['score'], sum(song['difficulty'] for song in result['songs']) +
+                             result['capo_changes'] * penalty)
+
+    def test_nothing_to_solve(self):
+        self.assertIsNone(setlist.optimize_setlist([]))
+        self.assertIsNone(setlist.optimize_setlist([[0] * 12], [[]]))
+        self.assertRaises(ValueError, setlist.optimize_setlist, [[0] * 12], [])
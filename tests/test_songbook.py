@@ -0,0 +1,46 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import ctransposer
+import songbook
+
+SONG_ONE = ['Title: One\n', 'G         C       D\n', 'Some lyrics for the verse\n']
+SONG_TWO = ['\fF#m   A     E    B7 \n', 'Lyrics in a harder key\n']
+SONG_THREE = ['Title: Three\n', 'Em    C\n', 'La la\n']
+
+
+class TestSongbook(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'book.txt')
+        with open(self.path, mode='w') as book_file:
+            book_file.writelines(SONG_ONE + SONG_TWO + SONG_THREE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_form_feeds_only(self):
+        with songbook.Songbook(self.path) as book:
+            self.assertEqual(list(book), [SONG_ONE, SONG_TWO + SONG_THREE])
+
+    def test_title_lines(self):
+        with songbook.Songbook(self.path, title_pattern=r'^Title:') as book:
+            self.assertEqual(len(book), 3)
+            self.assertEqual(book.get_song(2), SONG_THREE)
+
+    def test_auto_transposes_each_song(self):
+        output = io.StringIO()
+        with songbook.Songbook(self.path, title_pattern=r'^Title:') as book:
+            self.assertEqual(book.write_transposed(output, auto=True), 3)
+        expected = [ctransposer.get_lowest_difficulty(song) for song in [SONG_ONE, SONG_TWO, SONG_THREE]]
+        self.assertEqual(output.getvalue(), ''.join(''.join(song) for song in expected))
+
+    def test_empty_file(self):
+        empty_path = os.path.join(self.tmp_dir, 'empty.txt')
+        open(empty_path, mode='w').close()
+        with songbook.Songbook(empty_path) as book:
+            self.assertEqual(list(book), [])
@@ -0,0 +1,66 @@
+import unittest
+
+import chord
+import ctransposer
+import songformat
+import songgen
+
+SONG = ['Capo 2\n',
+        'G         C/B     D   Am#\n',
+        'Some lyrics for the verse\n',
+        'Em7       D/F#    Cmaj7/Gm\n']
+
+
+def as_text(chords_dict):
+    """Returns a chords dictionary structure with chord text in place of the chord objects."""
+    return {line_no: [[chord_obj.get_chord_text(), col] for chord_obj, col in chord_list]
+            for line_no, chord_list in chords_dict.items()}
+
+
+class TestSongFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.chords_dict = ctransposer.get_chords_from_song(SONG)
+
+    def test_json_form(self):
+        data = songformat.to_dict(self.chords_dict)
+        self.assertEqual(data['version'], songformat.FORMAT_VERSION)
+        self.assertEqual(data['suffixes'], ['', 'Am#', 'm7', 'maj7', 'm'])
+        self.assertEqual(data['chord_lines'][0], [1, [[0, 11, 0, 0], [10, 4, 0, 3], [18, 6, 0, 0], [22, 0, 1, 0]]])
+        self.assertEqual(data['chord_lines'][1][1][2], [18, 4, 3, 11, 4])
+        loaded = songformat.from_json(songformat.to_json(self.chords_dict))
+        self.assertEqual(as_text(loaded), as_text(self.chords_dict))
+        self.assertIs(loaded[3][2][0], chord.intern_chord('Cmaj7/Gm'))
+
+    def test_binary_form(self):
+        data = songformat.to_bytes(self.chords_dict)
+        self.assertTrue(data.startswith(songformat.MAGIC))
+        self.assertEqual(as_text(songformat.from_bytes(data)), as_text(self.chords_dict))
+        self.assertRaises(ValueError, songformat.from_bytes, b'XXXX' + data[4:])
+        self.assertRaises(ValueError, songformat.from_bytes, data[:-1])
+
+    def test_binary_form_limits(self):
+        wide_line = {0: [[chord.intern_chord('G'), songformat.MAX_SHORT + 1]]}
+        self.assertRaisesRegex(ValueError, 'column', songformat.to_bytes, wide_line)
+        self.assertEqual(songformat.from_json(songformat.to_json(wide_line))[0][0][1], songformat.MAX_SHORT + 1)
+        crowded_line = {0: [[chord.intern_chord('G'), col] for col in range(songformat.MAX_SHORT + 1)]}
+        self.assertRaisesRegex(ValueError, 'chords on line', songformat.to_bytes, crowded_line)
+
+    def test_loaded_chords_transpose(self):
+        loaded = songformat.from_bytes(songformat.to_bytes(self.chords_dict))
+        self.assertEqual(ctransposer.get_total_difficulty(loaded), ctransposer.get_total_difficulty(self.chords_dict))
+        ctransposer.transpose_song_dict(loaded, 2)
+        self.assertEqual(ctransposer.render_song_lines(SONG, loaded), ctransposer.transpose_song_lines(SONG, 2))
+
+    def test_generated_songs_round_trip(self):
+        for seed in range(10):
+            chords_dict = ctransposer.get_chords_from_song(songgen.generate_song(seed, sub_chord_rate=0.3))
+            self.assertEqual(as_text(songformat.from_bytes(songformat.to_bytes(chords_dict))), as_text(chords_dict))
+            self.assertEqual(as_text(songformat.from_json(songformat.to_json(chords_dict))), as_text(chords_dict))
+
+    def test_old_chord_objects(self):
+        chords_dict = {0: [[chord.Chord('Bb'), 0], [chord.Chord('Am'), 4]]}
+        self.assertEqual(as_text(songformat.from_json(songformat.to_json(chords_dict))), {0: [['A#', 0], ['Am', 4]]})
+
+    def test_unsupported_version(self):
+        self.assertRaises(ValueError, songformat.from_dict, {'version': 99, 'suffixes': [], 'chord_lines': []})
@@ -0,0 +1,35 @@
+import unittest
+
+import ctransposer
+import songgen
+
+
+class TestSongGen(unittest.TestCase):
+
+    def test_seeded(self):
+        self.assertEqual(songgen.generate_song(7, lines=50), songgen.generate_song(7, lines=50))
+        self.assertNotEqual(songgen.generate_song(7, lines=50), songgen.generate_song(8, lines=50))
+
+    def test_song_shape(self):
+        song = songgen.generate_song(3, lines=300, sub_chord_rate=0.5, marker_rate=0.1)
+        self.assertEqual(len(song), 300)
+        self.assertTrue(all(line.endswith('\n') for line in song))
+        self.assertTrue(any('/' in line for line in song))
+        self.assertTrue(any(line.startswith(('Chorus', 'Capo')) for line in song))
+        self.assertTrue(ctransposer.get_chords_from_song(song))
+
+    def test_chord_at_end_of_line(self):
+        song = songgen.generate_song(5, lines=200, chord_like_rate=0)
+        end_lines = [line_no for line_no, line in enumerate(song)
+                     if ctransposer.is_chord_line(line) and line[-2:-1] not in ('', ' ')]
+        self.assertTrue(end_lines)
+        self.assertTrue(any(line.endswith(' \n') and ctransposer.is_chord_line(line) for line in song))
+        transposed = ctransposer.transpose_song_lines(song, 3)
+        for line_no in end_lines:
+            last_chord = ctransposer.split_chord_line(song[line_no])[-1][0]
+            self.assertEqual(transposed[line_no].split()[-1], last_chord.transpose(3).get_chord_text())
+
+    def test_songbook(self):
+        songbook = songgen.generate_songbook(1, songs=3, lines=10)
+        self.assertEqual(len(songbook), 30)
+        self.assertEqual([line_no for line_no, line in enumerate(songbook) if '\f' in line], [10, 20])
@@ -0,0 +1,57 @@
+import unittest
+
+import chordpro
+import ctransposer
+import songtemplate
+
+SONG = ['Capo 2\n',
+        'G         C       D\n',
+        'Some lyrics for the verse\n',
+        'Em        Bb      G/B  Am7#\n',
+        'And some more lyrics']
+
+
+class TestSongTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.template = songtemplate.compile_song(SONG)
+
+    def test_slots_match_parsed_song(self):
+        def as_text(chords_dict):
+            return {line_no: [[chord_obj.get_chord_text(), col] for chord_obj, col in chord_list]
+                    for line_no, chord_list in chords_dict.items()}
+        self.assertEqual(as_text(self.template.get_slots()), as_text(ctransposer.get_chords_from_song(SONG)))
+
+    def test_render(self):
+        self.assertEqual(self.template.render_lines(0), ctransposer.transpose_song_lines(SONG, 0))
+        self.assertEqual(self.template.render_lines(2)[1], 'A         D       E\n')
+        self.assertEqual(self.template.render_lines(-2)[3], 'Dm        G#      F/A  Am7#\n')
+        self.assertEqual(self.template.render(1), ''.join(self.template.render_lines(1)))
+        self.assertEqual(len(self.template.render_all_keys()), 12)
+
+    def test_render_all_keys_spelling(self):
+        all_keys = self.template.render_all_keys(key_spelling=True)
+        # The song is in G, so -2 semitones puts it in F, written with flats.
+        self.assertEqual(all_keys[10].splitlines()[3], 'Dm        Ab      F/A  Am7#')
+        self.assertEqual(all_keys[2], self.template.render(2))
+
+    def test_difficulty_vector(self):
+        self.assertEqual(self.template.get_difficulty_vector(),
+                         ctransposer.get_difficulty_vector(ctransposer.get_chords_from_song(SONG)))
+
+    def test_json_round_trip(self):
+        loaded = songtemplate.SongTemplate.from_json(self.template.to_json())
+        for semitones in range(12):
+            self.assertEqual(loaded.render(semitones), self.template.render(semitones))
+
+    def test_chordpro_from_chords(self):
+        song = ['{key: G}\n', '[G]Some [C/B]lyrics for [Bb]you\n']
+        template = songtemplate.SongTemplate.from_chords(song, chordpro.get_chords_from_chordpro(song), True)
+        self.assertEqual(template.render_lines(2), ['{key: A}\n', '[A]Some [D/C#]lyrics for [C]you\n'])
+        self.assertEqual(songtemplate.SongTemplate.from_json(template.to_json()).render(2), template.render(2))
+
+    def test_unsupported_version(self):
+        data = self.template.to_dict()
+        data['version'] = 0
+        with self.assertRaises(ValueError):
+            songtemplate.SongTemplate.from_dict(data)
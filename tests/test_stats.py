@@ -0,0 +1,37 @@
+import unittest
+
+import ctransposer
+import stats
+
+SONG = ['Capo 2\n',
+        'G         C/B     D   Am#\n',
+        'Some lyrics for the verse\n',
+        'Em        C       G\n']
+
+
+class TestStats(unittest.TestCase):
+
+    def tearDown(self):
+        stats.disable()
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(stats.get_stats())
+        with stats.stage('parse'):
+            ctransposer.get_chords_from_song(SONG)
+        self.assertIsNone(stats.get_stats())
+
+    def test_counters_and_timers(self):
+        recorded = stats.enable()
+        ctransposer.get_lowest_difficulty(SONG, -2, 3)
+        self.assertIs(stats.disable(), recorded)
+        result = recorded.to_dict()
+        self.assertEqual(result['counters'], {'lines_scanned': 4, 'chord_lines': 2, 'tokens_parsed': 7,
+                                              'invalid_chords': 1, 'sub_chords': 1, 'offsets_tried': 6})
+        self.assertEqual(sorted(result['timers']), ['difficulty_search', 'parse', 'render', 'transpose'])
+
+    def test_chordpro_counters(self):
+        recorded = stats.enable()
+        ctransposer.transpose_song(['{key: G}\n', '[G]Some [C/B]lyrics [Am#]for\n', 'the verse\n'], 2,
+                                   chord_pro=True)
+        self.assertEqual(recorded.to_dict()['counters'], {'lines_scanned': 3, 'chord_lines': 1, 'tokens_parsed': 3,
+                                                          'invalid_chords': 1, 'sub_chords': 1, 'offsets_tried': 0})
@@ -0,0 +1,36 @@
+import io
+import unittest
+
+import ctransposer
+import streaming
+
+SONG_ONE = ['Capo 2\n',
+            'G         C       D\n',
+            'Some lyrics for the verse\n',
+            'Em        C       G/B  \n',
+            'And some more lyrics\n']
+SONG_TWO = ['\fAnother song\n',
+            'F#m   A     E    B7 \n',
+            'Lyrics in a harder key\n']
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_matches_transpose_song_lines(self):
+        for semitones in [-3, 0, 2, 7]:
+            result = list(streaming.iter_transposed_lines(io.StringIO(''.join(SONG_ONE)), semitones))
+            self.assertEqual(result, ctransposer.transpose_song_lines(SONG_ONE, semitones))
+
+    def test_auto_transposes_each_song(self):
+        expected = ctransposer.get_lowest_difficulty(SONG_ONE) + ctransposer.get_lowest_difficulty(SONG_TWO)
+        seekable = io.StringIO(''.join(SONG_ONE + SONG_TWO))
+        self.assertEqual(list(streaming.iter_auto_transposed_lines(seekable)), expected)
+        not_seekable = iter(SONG_ONE + SONG_TWO)
+        self.assertEqual(list(streaming.iter_auto_transposed_lines(not_seekable)), expected)
+
+    def test_song_offsets(self):
+        expected = []
+        for song in [SONG_ONE, SONG_TWO]:
+            vector = ctransposer.get_difficulty_vector(ctransposer.get_chords_from_song(song))
+            expected.append(ctransposer.find_lowest_difficulty(vector, -5, 6)[0])
+        self.assertEqual(list(streaming.iter_song_offsets(SONG_ONE + SONG_TWO, -5, 6)), expected)
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import ctransposer
+import watch
+
+SONG = 'G         C       D\nSome lyrics for the verse\n'
+
+
+class TestSongWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.song_dir = tempfile.mkdtemp()
+        self.song_path = os.path.join(self.song_dir, 'song.txt')
+        self.write(SONG)
+        self.processed = []
+        self.watcher = watch.SongWatcher(self.song_dir, self.process, debounce=0.5)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.song_dir)
+
+    def write(self, text, mtime_ns=None):
+        with open(self.song_path, mode='w') as song_file:
+            song_file.write(text)
+        if mtime_ns is not None:
+            os.utime(self.song_path, ns=(mtime_ns, mtime_ns))
+
+    def process(self, path, song_lines):
+        self.processed.append(path)
+        ctransposer.write_transposed_file(path, song_lines, semitones=2)
+
+    def run_ready(self, now):
+        return [future.result() for future in self.watcher.submit_ready(now)]
+
+    def test_is_song_file(self):
+        self.assertTrue(watch.is_song_file('song.txt'))
+        self.assertTrue(watch.is_song_file('song.cho'))
+        self.assertFalse(watch.is_song_file('song[+2].txt'))
+        self.assertFalse(watch.is_song_file('song[keys].json'))
+        self.assertFalse(watch.is_song_file('notes.md'))
+
+    def test_debounce_and_outputs(self):
+        self.watcher.scan(10.0)
+        self.assertEqual(self.run_ready(10.2), [])
+        self.assertEqual(self.run_ready(10.6), [True])
+        with open(os.path.join(self.song_dir, 'song[+2].txt')) as output_file:
+            self.assertEqual(output_file.readline(), 'A         D       E\n')
+        # The output isn't picked up as a song by the next scan.
+        self.watcher.scan(11.0)
+        self.assertEqual(self.run_ready(12.0), [])
+
+    def test_unchanged_content_skipped(self):
+        self.watcher.scan(0.0)
+        self.run_ready(1.0)
+        # Touched without changing the content.
+        self.write(SONG, mtime_ns=10 ** 18)
+        self.watcher.scan(2.0)
+        self.assertEqual(self.run_ready(3.0), [False])
+        self.write(SONG.replace('G ', 'E '), mtime_ns=2 * 10 ** 18)
+        self.watcher.scan(4.0)
+        self.assertEqual(self.run_ready(5.0), [True])
+        self.assertEqual((self.watcher.processed, self.watcher.skipped), (2, 1))
+        self.assertEqual(self.processed, [self.song_path, self.song_path])
+
+    def test_removed_song_forgotten(self):
+        self.watcher.scan(0.0)
+        self.run_ready(1.0)
+        os.remove(self.song_path)
+        self.watcher.mark_removed('song.txt')
+        self.assertEqual((self.watcher.hashes, self.watcher.signatures), ({}, {}))
+        # Restored with the same content, it is transposed again.
+        self.write(SONG)
+        self.watcher.mark_changed('song.txt', 2.0)
+        self.assertEqual(self.run_ready(3.0), [True])
+        os.remove(self.song_path)
+        self.watcher.scan(4.0)
+        self.assertEqual(self.watcher.hashes, {})
+
+    def test_removed_while_processing(self):
+        self.watcher.scan(0.0)
+
+        def process(path, song_lines):
+            # The song is deleted while it is being transposed.
+            os.remove(path)
+            self.watcher.mark_removed(os.path.basename(path))
+        self.watcher.process = process
+        self.assertEqual(self.run_ready(1.0), [True])
+        self.assertEqual((self.watcher.hashes, self.watcher.removed, self.watcher.running), ({}, set(), set()))
+
+    def test_run_until_stopped(self):
+        stop_event = threading.Event()
+        self.watcher.debounce = 0
+
+        def process(path, song_lines):
+            self.processed.append(path)
+            stop_event.set()
+        self.watcher.process = process
+        runner = threading.Thread(target=self.watcher.run, args=(0.05, stop_event))
+        runner.start()
+        runner.join(5)
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(self.processed, [self.song_path])
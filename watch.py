@@ -0,0 +1,169 @@
+"""
+Watches a folder of chord sheets, re-transposing songs when they change. Changes are found with
+inotify when inotify_simple is installed, otherwise by polling file sizes and modification times.
+Bursts of saves are debounced, changed files are transposed on a small thread pool, and files whose
+content hash hasn't changed since they were last transposed are skipped.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import chordpro
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+WATCH_EXTENSIONS = ('.txt',) + chordpro.CHORDPRO_EXTENSIONS
+# Files written by ctransposer, eg: song[+2].txt and song[keys].json, which must not be transposed again.
+OUTPUT_PATTERN = re.compile(r'\[(?:[+-]\d+|keys)\]\.[^.]*$')
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_WORKERS = 2
+
+
+def is_song_file(filename):
+    """Returns True if the file name is a song to watch, rather than another file or an output."""
+    return os.path.splitext(filename)[1].lower() in WATCH_EXTENSIONS and not OUTPUT_PATTERN.search(filename)
+
+
+class SongWatcher(object):
+    """
+    Finds changed songs in a directory and passes each to process(path, song_lines) on a thread pool,
+    once it has been unchanged for the debounce time (in seconds).
+    """
+
+    def __init__(self, directory, process, debounce=DEFAULT_DEBOUNCE, workers=DEFAULT_WORKERS):
+        self.directory = directory
+        self.process = process
+        self.debounce = debounce
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # By path: (size, mtime_ns) when last scanned, content hash when last processed, and the time
+        # of the latest change not yet processed.
+        self.signatures = {}
+        self.hashes = {}
+        self.pending = {}
+        self.running = set()
+        # Songs removed while being processed, whose hashes mustn't be stored when they finish.
+        self.removed = set()
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.skipped = 0
+
+    def close(self):
+        """Waits for any files being processed and stops the thread pool."""
+        self.executor.shutdown(wait=True)
+
+    def scan(self, now):
+        """Marks songs whose size or modification time has changed since the last scan as changed at now."""
+        seen = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not is_song_file(entry.name):
+                    continue
+                file_stat = entry.stat()
+                seen.add(entry.path)
+                signature = (file_stat.st_size, file_stat.st_mtime_ns)
+                if self.signatures.get(entry.path) != signature:
+                    self.signatures[entry.path] = signature
+                    self.pending[entry.path] = now
+        with self.lock:
+            known = set(self.signatures).union(self.hashes)
+        for path in known - seen:
+            self._forget(path)
+
+    def _forget(self, path):
+        """Drops everything known about a song which has been removed from the directory."""
+        self.signatures.pop(path, None)
+        self.pending.pop(path, None)
+        with self.lock:
+            self.hashes.pop(path, None)
+            if path in self.running:
+                self.removed.add(path)
+
+    def mark_changed(self, filename, now):
+        """Marks a song in the directory as changed at now, eg: from an inotify event."""
+        if is_song_file(filename):
+            self.pending[os.path.join(self.directory, filename)] = now
+
+    def mark_removed(self, filename):
+        """Forgets a song deleted or moved out of the directory, eg: from an inotify event."""
+        if is_song_file(filename):
+            self._forget(os.path.join(self.directory, filename))
+
+    def submit_ready(self, now):
+        """
+        Submits the songs which haven't changed for the debounce time to the thread pool, returning
+        the list of futures. Songs still being processed wait for the next call.
+        """
+        futures = []
+        for path, changed in list(self.pending.items()):
+            if now - changed < self.debounce:
+                continue
+            with self.lock:
+                if path in self.running:
+                    continue
+                self.running.add(path)
+            del self.pending[path]
+            futures.append(self.executor.submit(self._process_path, path))
+        return futures
+
+    def _process_path(self, path):
+        """Processes a song unless its content is unchanged. Returns True if it was processed."""
+        try:
+            with open(path, mode='rb') as song_file:
+                data = song_file.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+            with self.lock:
+                if self.hashes.get(path) == content_hash:
+                    self.skipped += 1
+                    return False
+            self.process(path, data.decode('utf-8').splitlines(True))
+            with self.lock:
+                if path not in self.removed:
+                    self.hashes[path] = content_hash
+                self.processed += 1
+            return True
+        except Exception as err:
+            logging.warning("Failed to transpose %s: %s", path, err)
+            return False
+        finally:
+            with self.lock:
+                self.running.discard(path)
+                self.removed.discard(path)
+
+    def run(self, interval=DEFAULT_INTERVAL, stop_event=None):
+        """
+        Watches until stop_event (a threading.Event) is set, or forever. Uses inotify if available,
+        otherwise scans the directory every interval seconds.
+        """
+        stop_event = stop_event or threading.Event()
+        self.scan(time.monotonic())
+        if inotify_simple is not None:
+            self._run_inotify(interval, stop_event)
+        else:
+            while not stop_event.is_set():
+                self.scan(time.monotonic())
+                self.submit_ready(time.monotonic())
+                stop_event.wait(min(interval, self.debounce) if self.pending else interval)
+
+    def _run_inotify(self, interval, stop_event):
+        """Watches with inotify, waking only for events or while changes are waiting to be debounced."""
+        flags = inotify_simple.flags
+        removed = flags.DELETE | flags.MOVED_FROM
+        with inotify_simple.INotify() as notifier:
+            notifier.add_watch(self.directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | removed)
+            while not stop_event.is_set():
+                self.submit_ready(time.monotonic())
+                timeout = min(interval, self.debounce) if self.pending else interval
+                for event in notifier.read(timeout=int(timeout * 1000)):
+                    if event.mask & removed:
+                        self.mark_removed(event.name)
+                    else:
+                        self.mark_changed(event.name, time.monotonic())